@@ -0,0 +1,284 @@
+"""Admission control for /ask: per-client rate limits and a global concurrency limit.
+
+Every question costs stemming, scoring and an admin backend log record, so
+one noisy client can keep every worker busy. AdmissionController.admit()
+turns such load away before any of that work starts:
+
+- a token bucket per client IP and one per widget sessionId (429 with
+  Retry-After when empty),
+- at most max_concurrent questions answered at once; a few more may wait
+  up to max_wait seconds for a slot, the rest get 503 with Retry-After.
+
+Buckets live in a LocalBucketStore (this process only, sharded dicts with
+one lock per shard) unless a shared store is configured: RedisBucketStore
+keeps them in Redis so that every worker and host shares one limit. Both
+have the same take() method, so the local store stands in for Redis in
+development. When the shared store fails, requests are admitted (and
+counted as store_errors) rather than rejected.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import redis
+except ImportError:  # optional; only needed for RATE_LIMIT_BACKEND=redis://...
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class Rejected(Exception):
+    """A request turned away: HTTP status, reason (counter name) and seconds to wait before retrying"""
+
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self):
+        """Retry-After value: whole seconds, at least 1"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+def client_ip(remote_addr, forwarded_for=None, trusted_proxies=0):
+    """Address of the client behind trusted_proxies reverse proxies.
+
+    Each proxy appends the address it received the request from to
+    X-Forwarded-For, so the client is the trusted_proxies-th entry from the
+    right; entries further left are set by the client and can be forged.
+    """
+    if trusted_proxies <= 0 or not forwarded_for:
+        return remote_addr or ''
+    hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+    if not hops:
+        return remote_addr or ''
+    return hops[-min(trusted_proxies, len(hops))]
+
+
+class LocalBucketStore:
+    """Token buckets of this process.
+
+    Keys are spread over shards, each an LRU dict with its own lock, so
+    concurrent requests rarely wait for each other. A shard keeps at most
+    max_keys / shards buckets; the least recently used one is dropped
+    first, which at worst gives an idle client a full bucket again.
+    """
+
+    def __init__(self, max_keys=100000, shards=16):
+        self.shards = max(1, int(shards))
+        self.max_keys_per_shard = max(1, int(max_keys) // self.shards)
+        self._buckets = [OrderedDict() for _ in range(self.shards)]
+        self._locks = [threading.Lock() for _ in range(self.shards)]
+
+    def take(self, key, rate, burst, cost=1.0):
+        """Take cost tokens from key's bucket; 0.0 when taken, else seconds until enough have refilled"""
+        shard = hash(key) % self.shards
+        buckets = self._buckets[shard]
+        now = time.monotonic()
+        with self._locks[shard]:
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = [float(burst), now]
+                buckets[key] = bucket
+                if len(buckets) > self.max_keys_per_shard:
+                    buckets.popitem(last=False)
+            else:
+                buckets.move_to_end(key)
+                bucket[0] = min(float(burst), bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return 0.0
+            return (cost - bucket[0]) / rate
+
+    def __len__(self):
+        return sum(len(buckets) for buckets in self._buckets)
+
+
+# KEYS[1] = bucket; ARGV = rate (tokens/s), burst, cost. Uses the Redis
+# server's clock so that hosts with skewed clocks share one timeline.
+_TAKE_SCRIPT = """
+redis.replicate_commands()
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+local tokens = tonumber(state[1]) or burst
+local stamp = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - stamp) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'stamp', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisBucketStore:
+    """Token buckets shared through Redis (one atomic script call per take)"""
+
+    def __init__(self, url, prefix='chatbot:bucket:', timeout=0.05):
+        """
+        Parameters:
+        - url: redis://host:port/db
+        - prefix: prepended to every bucket key
+        - timeout: socket timeout in seconds; a slow Redis must not slow /ask down
+        """
+        if redis is None:
+            raise RuntimeError("RedisBucketStore needs the redis package (pip install redis)")
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+
+    def take(self, key, rate, burst, cost=1.0):
+        return float(self._take(keys=[self.prefix + key], args=[rate, burst, cost]))
+
+
+def bucket_store(url=None):
+    """The store for RATE_LIMIT_BACKEND url: Redis for redis:// URLs, else this process"""
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        try:
+            return RedisBucketStore(url)
+        except Exception as e:
+            logger.warning(f"Rate limit backend {url} unavailable ({e}), using in-process buckets")
+    elif url:
+        logger.warning(f"Unknown rate limit backend '{url}', using in-process buckets")
+    return LocalBucketStore()
+
+
+class ConcurrencyLimiter:
+    """At most limit holders at once; up to max_queue callers wait up to max_wait seconds for a slot"""
+
+    def __init__(self, limit, max_queue=16, max_wait=2.0):
+        self.limit = int(limit)
+        self.max_queue = max(0, int(max_queue))
+        self.max_wait = float(max_wait)
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+
+    def acquire(self):
+        """Take a slot (True if it had to wait); raises Rejected (503) when the queue is full or the wait times out"""
+        with self._cond:
+            if self.active < self.limit:
+                self.active += 1
+                return False
+            if self.waiting >= self.max_queue:
+                raise Rejected(503, 'queue_full', self.max_wait or 1.0)
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.max_wait
+                while self.active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Rejected(503, 'queue_timeout', self.max_wait or 1.0)
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+
+class AdmissionController:
+    """Rate limits per IP and per session plus a ConcurrencyLimiter, with counters of shed load"""
+
+    def __init__(self, ip_rate=2.0, ip_burst=30, session_rate=0.5, session_burst=10,
+                 max_concurrent=8, max_queue=16, max_wait=2.0, store=None):
+        """
+        Parameters:
+        - ip_rate, ip_burst: requests per second and bucket size per client IP (rate 0 = no limit)
+        - session_rate, session_burst: the same per sessionId
+        - max_concurrent: questions answered at once in this process (0 = no limit)
+        - max_queue, max_wait: callers allowed to wait for a slot, and for how long (seconds)
+        - store: bucket store (default: LocalBucketStore)
+        """
+        self.ip_rate = float(ip_rate)
+        self.ip_burst = float(ip_burst)
+        self.session_rate = float(session_rate)
+        self.session_burst = float(session_burst)
+        self.store = store or LocalBucketStore()
+        self.concurrency = ConcurrencyLimiter(max_concurrent, max_queue, max_wait) if max_concurrent > 0 else None
+        self._counter_lock = threading.Lock()
+        self._last_store_warning = 0.0
+        self.counters = {
+            'admitted': 0,
+            'queued': 0,
+            'rejected_ip_rate': 0,
+            'rejected_session_rate': 0,
+            'rejected_queue_full': 0,
+            'rejected_queue_timeout': 0,
+            'store_errors': 0
+        }
+
+    def _count(self, name):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def _take(self, key, rate, burst, cost):
+        try:
+            return self.store.take(key, rate, burst, min(cost, burst))
+        except Exception as e:
+            # fail open: a broken shared store must not take /ask down with it
+            self._count('store_errors')
+            now = time.monotonic()
+            if now - self._last_store_warning > 60:
+                self._last_store_warning = now
+                logger.warning(f"Rate limit store failed, admitting requests: {e}")
+            return 0.0
+
+    def check_rate(self, ip_address, session_id=None, cost=1.0):
+        """Raise Rejected (429) when the client's IP or session bucket holds fewer than cost tokens"""
+        if self.ip_rate > 0 and ip_address:
+            wait = self._take(f'ip:{ip_address}', self.ip_rate, self.ip_burst, cost)
+            if wait > 0:
+                self._count('rejected_ip_rate')
+                raise Rejected(429, 'ip_rate', wait)
+        if self.session_rate > 0 and session_id:
+            wait = self._take(f'session:{session_id}', self.session_rate, self.session_burst, cost)
+            if wait > 0:
+                self._count('rejected_session_rate')
+                raise Rejected(429, 'session_rate', wait)
+
+    @contextmanager
+    def admit(self, ip_address, session_id=None, cost=1.0):
+        """Hold a slot for one question costing cost tokens; raises Rejected before the body runs when it must not"""
+        self.check_rate(ip_address, session_id, cost)
+        if self.concurrency is not None:
+            try:
+                if self.concurrency.acquire():
+                    self._count('queued')
+            except Rejected as e:
+                self._count(f'rejected_{e.reason}')
+                raise
+        self._count('admitted')
+        try:
+            yield
+        finally:
+            if self.concurrency is not None:
+                self.concurrency.release()
+
+    def stats(self):
+        """Counters plus questions in progress and waiting"""
+        with self._counter_lock:
+            stats = dict(self.counters)
+        stats['rejected'] = sum(v for k, v in stats.items() if k.startswith('rejected_'))
+        stats['active'] = self.concurrency.active if self.concurrency else 0
+        stats['waiting'] = self.concurrency.waiting if self.concurrency else 0
+        return stats
@@ -1,11 +1,27 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
+import atexit
+import hmac
+import ipaddress
 import logging
-import requests
 import uuid
 import os
+from time import perf_counter
 from datetime import datetime
-from nlp_processor import NLPProcessor
+from faq_registry import FAQRegistry
+from nlp_processor import get_text_cache_stats
+from caching import ResponseCache
+from log_shipper import LogShipper
+from log_spool import LogSpool, SpoolReplayer
+from metrics import REGISTRY, STAGE_SECONDS
+from log_setup import configure_logging, bind_request
+from static_responses import faq_stats
+from scoring_pool import ScoringPool, PooledProcessor
+from scorers import SCORERS, DEFAULT_SCORER
+from admission import AdmissionController, Rejected, bucket_store, client_ip
+import startup
+
+startup.record('imports', startup.since_process_start())
 
 
 app = Flask(__name__)
@@ -27,38 +43,302 @@ if single_origin == '*' or not single_origin:
 CORS(app, resources={r"/*": {"origins": single_origin}})
 
 # Admin backend configuration
-ADMIN_BACKEND_URL = "http://localhost:3001"
-
-# Configure logging: prefer stdout so container runtime captures logs.
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-root_logger = logging.getLogger()
-root_logger.setLevel(logging.ERROR)
+ADMIN_BACKEND_URL = os.environ.get('ADMIN_BACKEND_URL', 'http://localhost:3001')
 
-# Always log to stdout/stderr only in production container
-stream_handler = logging.StreamHandler()
-stream_handler.setLevel(logging.ERROR)
-stream_handler.setFormatter(formatter)
-root_logger.handlers = []
-root_logger.addHandler(stream_handler)
+# Configure logging: stdout through a non-blocking queue (see log_setup.py).
+# Per-request traces are DEBUG; LOG_SAMPLE_RATE keeps the DEBUG/INFO records of only a share of requests.
+log_handler = configure_logging(
+    level=os.environ.get('LOG_LEVEL', 'INFO'),
+    fmt=os.environ.get('LOG_FORMAT', 'text'),
+    queue_size=int(os.environ.get('LOGGING_QUEUE_SIZE', 10000))
+)
+atexit.register(log_handler.stop)
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))
 
 logger = logging.getLogger(__name__)
 
+# Environments are discovered from data/faq_<env>.json (e.g. faq_ppid.json serves env=ppid);
+# the registry's file watcher picks up added and removed files.
+DEFAULT_ENV = 'stunting'
+
+def parse_env_list(text):
+    """ENV_PRELOAD value -> list of env names, or None for '*' (every env)"""
+    if text.strip() == '*':
+        return None
+    return [env.strip().lower() for env in text.split(',') if env.strip()]
+
+def parse_env_scorers(text):
+    """SCORER_ENGINES value -> (default engine, {env: engine}).
+
+    'bm25' uses BM25 for every env, 'tfidf,ppid=bm25' only for ppid (see scorers.py).
+    """
+    default = DEFAULT_SCORER
+    scorers = {}
+    for part in (text or '').split(','):
+        env, _, engine = part.strip().rpartition('=')
+        engine = engine.strip().lower()
+        if not engine:
+            continue
+        if engine not in SCORERS:
+            logger.warning(f"Unknown scorer '{engine}' in SCORER_ENGINES, using '{DEFAULT_SCORER}'")
+            engine = DEFAULT_SCORER
+        if env:
+            scorers[env.strip().lower()] = engine
+        else:
+            default = engine
+    return default, scorers
+
+# Retrieval engine per environment, e.g. SCORER_ENGINES='tfidf,ppid=bm25'
+SCORER_ENGINE, ENV_SCORERS = parse_env_scorers(os.environ.get('SCORER_ENGINES', DEFAULT_SCORER))
+# Correct misspelled words against each FAQ file's vocabulary before matching (see spelling.py)
+SPELLING_CORRECTION = os.environ.get('SPELLING_CORRECTION', '1').lower() not in ('0', 'false', 'no')
+
+# Envs in ENV_PRELOAD ('*' = every env in data/ at startup) are built at startup (in the gunicorn
+# master, shared by the workers) and never evicted; the others, including FAQ files added
+# later, are built on their first request. Loaded envs are
+# evicted least recently used first when their estimated size exceeds ENV_MEMORY_BUDGET_MB
+# (per process, 0 = no limit) and rebuilt from their index artifact when asked for again.
+REGISTRY_KWARGS = {
+    'env_scorers': ENV_SCORERS,
+    'scorer': SCORER_ENGINE,
+    'spelling_correction': SPELLING_CORRECTION,
+    'preload': parse_env_list(os.environ.get('ENV_PRELOAD', '*')),
+    'memory_budget': float(os.environ.get('ENV_MEMORY_BUDGET_MB', 512)) * 2**20,
+    'save_artifacts': os.environ.get('INDEX_AUTOSAVE', '1').lower() not in ('0', 'false', 'no')
+}
+
 try:
     logger.info("Starting NLP Processor initialization...")
-    nlp_processor = NLPProcessor()
+    with startup.phase('index_load'):
+        faq_registry = FAQRegistry(default_env=DEFAULT_ENV, **REGISTRY_KWARGS)
     logger.info("NLP Processor initialized successfully")
 except Exception as e:
     logger.error(f"Failed to initialize NLP Processor: {e}")
-    nlp_processor = None
+    faq_registry = None
+
+startup.mark_ready()
+logger.info(f"Startup breakdown: {startup.report()}")
+
+# FAQ files are polled for changes and hot-reloaded (0 disables the watcher).
+# POST /reload triggers a reload explicitly; it is only enabled when RELOAD_TOKEN is set.
+FAQ_WATCH_INTERVAL = float(os.environ.get('FAQ_WATCH_INTERVAL', 5))
+RELOAD_TOKEN = os.environ.get('RELOAD_TOKEN', '')
+
+
+# Final /ask responses, keyed on (env, index generation, normalized question).
+# RESPONSE_CACHE_SIZE=0 disables caching. Identical questions asked while one of
+# them is being answered wait for that answer (RESPONSE_COALESCING=0 disables it), for at
+# most RESPONSE_COALESCING_TIMEOUT seconds before answering it themselves.
+response_cache = ResponseCache(
+    maxsize=int(os.environ.get('RESPONSE_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('RESPONSE_CACHE_TTL', 3600)),
+    coalesce=os.environ.get('RESPONSE_COALESCING', '1').lower() not in ('0', 'false', 'no'),
+    coalesce_timeout=float(os.environ.get('RESPONSE_COALESCING_TIMEOUT', 5)) or None
+)
+
+
+# Answer questions in SCORING_PROCESSES worker processes with their own warm indexes
+# (see scoring_pool.py); 0 answers them in the web process itself.
+SCORING_PROCESSES = int(os.environ.get('SCORING_PROCESSES', 0))
+scoring_pool = None
+if SCORING_PROCESSES > 0 and faq_registry is not None:
+    scoring_pool = ScoringPool(
+        None,
+        default_env=DEFAULT_ENV,
+        processes=SCORING_PROCESSES,
+        timeout=float(os.environ.get('SCORING_TIMEOUT', 10)),
+        health_interval=float(os.environ.get('SCORING_HEALTH_INTERVAL', 5)),
+        **REGISTRY_KWARGS
+    )
+
+
+# Admission control for /ask (see admission.py): token buckets per client IP and per
+# sessionId (tokens per minute, 0 disables; a question takes one token per started 100
+# characters), and at most ASK_MAX_CONCURRENT questions answered at once per process
+# with a short wait queue. RATE_LIMIT_BACKEND=redis://... shares the buckets between
+# workers and hosts; TRUSTED_PROXIES is the number of reverse proxies whose
+# X-Forwarded-For entries identify the client. Without TRUSTED_PROXIES every client
+# behind a proxy shares the proxy's address, so the per-IP limit is then off unless
+# RATE_LIMIT_IP_PER_MIN is set explicitly.
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+admission = AdmissionController(
+    ip_rate=float(os.environ.get('RATE_LIMIT_IP_PER_MIN', 120 if TRUSTED_PROXIES > 0 else 0)) / 60,
+    ip_burst=float(os.environ.get('RATE_LIMIT_IP_BURST', 30)),
+    session_rate=float(os.environ.get('RATE_LIMIT_SESSION_PER_MIN', 30)) / 60,
+    session_burst=float(os.environ.get('RATE_LIMIT_SESSION_BURST', 10)),
+    max_concurrent=int(os.environ.get('ASK_MAX_CONCURRENT', 2 * (SCORING_PROCESSES or os.cpu_count() or 1))),
+    max_queue=int(os.environ.get('ASK_QUEUE_SIZE', 16)),
+    max_wait=float(os.environ.get('ASK_QUEUE_TIMEOUT', 2)),
+    store=bucket_store(os.environ.get('RATE_LIMIT_BACKEND'))
+)
+
+_proxy_warning_logged = False
+
+
+def request_client_ip(remote_addr, forwarded_for):
+    """client_ip() of a request, warning once when it looks proxied but TRUSTED_PROXIES is 0"""
+    global _proxy_warning_logged
+    if forwarded_for and TRUSTED_PROXIES <= 0 and not _proxy_warning_logged:
+        try:
+            loopback = ipaddress.ip_address(remote_addr).is_loopback
+        except ValueError:
+            loopback = False
+        if loopback:
+            _proxy_warning_logged = True
+            logger.warning(f"Requests from {remote_addr} carry X-Forwarded-For but TRUSTED_PROXIES=0: "
+                           "all clients behind this proxy share one address for rate limiting and logs; "
+                           "set TRUSTED_PROXIES=1 behind a single reverse proxy")
+    return client_ip(remote_addr, forwarded_for, TRUSTED_PROXIES)
+
+
+def get_processor(env):
+    """Return the NLP processor serving env (None if unavailable)"""
+    if not faq_registry:
+        return None
+    return faq_registry.get(env)
+
+def scoring_backend(processor):
+    """What answers questions for processor: the scoring pool when enabled, else processor itself"""
+    return PooledProcessor(scoring_pool, processor) if scoring_pool is not None else processor
+
+# Logs that cannot be delivered (backend down, queue full) are kept on disk and replayed later.
+# Set LOG_SPOOL_DIR to an empty string to disable the spool.
+LOG_SPOOL_DIR = os.environ.get('LOG_SPOOL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'spool'))
+log_spool = LogSpool(LOG_SPOOL_DIR) if LOG_SPOOL_DIR else None
+
+# Chat logs are shipped to the admin backend in the background so /ask never waits on it
+log_shipper = LogShipper(
+    ADMIN_BACKEND_URL,
+    batch_path=os.environ.get('ADMIN_LOG_BATCH_PATH') or None,
+    batch_size=int(os.environ.get('LOG_FLUSH_SIZE', 20)),
+    flush_interval=float(os.environ.get('LOG_FLUSH_INTERVAL', 1.0)),
+    max_queue=int(os.environ.get('LOG_QUEUE_SIZE', 10000)),
+    spool=log_spool
+)
+atexit.register(log_shipper.stop)
+
+log_replayer = None
+if log_spool is not None:
+    log_replayer = SpoolReplayer(
+        log_spool,
+        log_shipper.send_batch,
+        max_rate=float(os.environ.get('LOG_REPLAY_RATE', 20))
+    )
+    atexit.register(log_replayer.stop)
+
+
+@app.before_request
+def start_background_workers():
+    """Start per-process background threads on the first request.
+
+    Not done at import time: with gunicorn's preload_app the module is
+    imported in the master, and threads running there at fork time can
+    leave locks held in the workers.
+    """
+    if log_replayer is not None:
+        log_replayer.start()
+    if faq_registry is not None:
+        faq_registry.start_watching(FAQ_WATCH_INTERVAL)
+    if scoring_pool is not None:
+        scoring_pool.start()
+
+
+@app.before_request
+def bind_log_context():
+    """Fresh log correlation id and sampling decision for every request"""
+    bind_request(None, LOG_SAMPLE_RATE)
+
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'chatbot_request_seconds', 'Time to handle a question request', ['endpoint', 'env'])
+RESPONSES = REGISTRY.counter(
+    'chatbot_responses_total', 'Answers given, by environment and status', ['env', 'status'])
+
+
+def metric_env(env):
+    """Env label for metrics: unknown envs count as the env that served them"""
+    return faq_registry.resolve_env(env) if faq_registry else (env or 'unknown')
+
+
+def _cache_gauges():
+    values = {}
+    for cache_name, stats in [('response', response_cache.stats())] + list(get_text_cache_stats().items()):
+        for key in ('size', 'hits', 'misses', 'evictions'):
+            values[(cache_name, key)] = stats[key]
+    return values
+
+
+def _log_shipper_gauges():
+    values = {('shipper', k): v for k, v in log_shipper.stats().items()}
+    if log_spool is not None:
+        values.update((('spool', k), v) for k, v in log_spool.stats().items())
+    if log_replayer is not None:
+        values.update((('replayer', k), v) for k, v in log_replayer.stats().items())
+    return values
+
+
+def _startup_gauges():
+    report = startup.report()
+    values = {(name,): seconds for name, seconds in report['phases'].items()}
+    values[('ready',)] = report['ready_seconds']
+    return values
+
+
+def _scoring_pool_gauges():
+    if scoring_pool is None:
+        return {}
+    return {(k,): v for k, v in scoring_pool.stats().items() if k != 'workers'}
+
+
+def _coalescing_gauges():
+    stats = response_cache.stats()
+    return {(k,): stats[k] for k in ('computed', 'coalesced', 'in_flight', 'coalesce_timeouts', 'max_waiters')}
+
+
+def _index_gauges():
+    if not faq_registry:
+        return {}
+    values = {}
+    for env, info in faq_registry.status()['envs'].items():
+        values[(env, 'generation')] = info['generation']
+        values[(env, 'faqs')] = info['faq_count']
+        values[(env, 'loaded')] = int(info['loaded'])
+        values[(env, 'memory_bytes')] = info['memory_bytes'] if info['loaded'] else 0
+        values[(env, 'build_seconds')] = info['build_seconds'] or 0.0
+        values[(env, 'loads')] = info['loads']
+        values[(env, 'evictions')] = info['evictions']
+    return values
+
+
+def _registry_gauges():
+    if not faq_registry:
+        return {}
+    status = faq_registry.status()
+    return {(k,): status[k] for k in ('loaded', 'known', 'memory_bytes', 'memory_budget', 'evictions')}
+
+
+REGISTRY.gauge_callback('chatbot_cache', 'Response and text cache counters', ['cache', 'stat'], _cache_gauges)
+REGISTRY.gauge_callback('chatbot_chat_log', 'Chat log shipping counters', ['component', 'stat'], _log_shipper_gauges)
+REGISTRY.gauge_callback('chatbot_log_records', 'Application log records queued/dropped by the log handler', ['stat'],
+                        lambda: {(k,): v for k, v in log_handler.stats().items()})
+REGISTRY.gauge_callback('chatbot_startup_seconds', 'Process startup time by phase (ready = process start to ready)',
+                        ['phase'], _startup_gauges)
+REGISTRY.gauge_callback('chatbot_index', 'Loaded FAQ index per environment', ['env', 'stat'], _index_gauges)
+REGISTRY.gauge_callback('chatbot_index_registry', 'Loaded and known environments, estimated index memory and '
+                        'evictions', ['stat'], _registry_gauges)
+REGISTRY.gauge_callback('chatbot_scoring_pool', 'Scoring worker processes and dispatched requests', ['stat'],
+                        _scoring_pool_gauges)
+REGISTRY.gauge_callback('chatbot_admission', 'Admitted, queued and shed /ask requests', ['stat'],
+                        lambda: {(k,): v for k, v in admission.stats().items()})
+REGISTRY.gauge_callback('chatbot_response_coalescing', 'Answers computed and /ask requests coalesced onto one '
+                        'in flight', ['stat'], _coalescing_gauges)
+REGISTRY.gauge_callback('chatbot_response_cache_saved_seconds',
+                        'Answer time saved by response cache hits and coalesced requests', [],
+                        lambda: {(): response_cache.stats()['saved_seconds']})
 
-# Mapping environment to FAQ file
-ENV_FAQ_MAP = {
-    'stunting': 'faq_stunting.json',
-    'ppid': 'faq_ppid.json'
-}
 
 def log_to_admin_backend(session_id, question, answer, confidence, category, environment, user_agent="", ip_address=""):
-    """Send chat log to admin backend"""
+    """Queue chat log for the admin backend (sent asynchronously by log_shipper)"""
     try:
         payload = {
             "sessionId": session_id,
@@ -71,78 +351,124 @@ def log_to_admin_backend(session_id, question, answer, confidence, category, env
             "ipAddress": ip_address
         }
         
-        response = requests.post(
-            f"{ADMIN_BACKEND_URL}/api/chatbot/log",
-            json=payload,
-            timeout=5
-        )
-        
-        if response.status_code == 200:
-            logger.info(f"Successfully logged to admin backend: {session_id}")
-        else:
-            logger.warning(f"Failed to log to admin backend: {response.status_code}")
+        started = perf_counter()
+        submitted = log_shipper.submit(payload)
+        STAGE_SECONDS.observe(perf_counter() - started, 'admin_log')
+        if not submitted:
+            logger.warning(f"Chat log queue full, dropped log for session: {session_id}")
             
     except Exception as e:
         logger.error(f"Error logging to admin backend: {e}")
 
-@app.route('/', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    return jsonify({
+def health_payload():
+    """Body of GET /"""
+    return {
         'status': 'healthy',
         'message': 'FAQ Chatbot is running',
-        'nlp_ready': nlp_processor is not None,
+        'nlp_ready': bool(faq_registry and faq_registry.is_ready()),
         'timestamp': datetime.now().isoformat(),
         'version': '1.0.0',
-        'supported_envs': list(ENV_FAQ_MAP.keys())
-    })
+        'supported_envs': faq_registry.envs() if faq_registry else [],
+        'index': faq_registry.status() if faq_registry else None,
+        'text_cache': get_text_cache_stats(),
+        'response_cache': response_cache.stats(),
+        'log_shipper': log_shipper.stats(),
+        'log_spool': log_spool.stats() if log_spool else None,
+        'log_replayer': log_replayer.stats() if log_replayer else None,
+        'scoring_pool': scoring_pool.stats() if scoring_pool else None,
+        'admission': admission.stats(),
+        'logging': log_handler.stats(),
+        'startup': startup.report()
+    }
 
-@app.route('/ask', methods=['POST'])
-def ask_question():
-    """Handle FAQ questions for multiple environments"""
+@app.route('/', methods=['GET'])
+def health_check():
+    """Health check endpoint"""
+    return jsonify(health_payload())
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus metrics of this worker process"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+def ask_error(e):
+    """(body, status) of an /ask request that failed unexpectedly"""
+    logger.error(f"Error processing question: {e}")
+    RESPONSES.inc('unknown', 'error')
+    return {
+        'answer': 'Maaf, terjadi kesalahan sistem. Silakan coba lagi nanti.',
+        'confidence': 0.0,
+        'category': 'system_error',
+        'status': 'error'
+    }, 500
+
+def ask_rejected(e, env):
+    """(body, status, headers) of an /ask request turned away by admission control"""
+    RESPONSES.inc(metric_env(env), 'rejected')
+    logger.debug("Rejected question (%s), retry after %.1f s", e.reason, e.retry_after)
+    if e.status == 429:
+        answer = 'Maaf, terlalu banyak pertanyaan dalam waktu singkat. Silakan coba lagi dalam beberapa detik.'
+    else:
+        answer = 'Maaf, server sedang sibuk. Silakan coba lagi sebentar lagi.'
+    return {
+        'answer': answer,
+        'confidence': 0.0,
+        'category': 'system_error',
+        'status': 'error'
+    }, e.status, {'Retry-After': e.retry_after_header}
+
+def answer_question(data, user_agent='', ip_address='', started=None):
+    """(body, status, headers) of POST /ask for the decoded JSON body data.
+
+    Shared by the Flask view and the ASGI app (asgi_app.py); started is
+    when the request arrived, for the latency histogram. Questions pass
+    admission control (rate limits per ip_address and sessionId, global
+    concurrency limit) before any work is done for them.
+    """
+    started = started or perf_counter()
     try:
-        data = request.get_json()
         if not data or 'question' not in data:
-            return jsonify({
+            return {
                 'error': 'Question is required',
                 'status': 'error'
-            }), 400
+            }, 400, {}
         question = data['question'].strip()
         if not question:
-            return jsonify({
+            return {
                 'error': 'Question cannot be empty',
                 'status': 'error'
-            }), 400
+            }, 400, {}
         if len(question) > 500:
-            return jsonify({
+            return {
                 'error': 'Question too long (max 500 characters)',
                 'status': 'error'
-            }), 400
-        if not nlp_processor:
-            return jsonify({
-                'answer': 'Maaf, sistem FAQ sedang tidak tersedia. Silakan coba lagi nanti.',
-                'confidence': 0.0,
-                'category': 'system_error',
-                'status': 'error'
-            }), 503
+            }, 400, {}
         # Ambil parameter lingkungan (env), default ke 'stunting' jika tidak ada
         env = data.get('env', 'stunting').lower()
-        faq_file = ENV_FAQ_MAP.get(env, 'faq_stunting.json')
-        # Ganti FAQ jika berbeda
-        if nlp_processor.faq_file != faq_file:
-            nlp_processor.switch_faq(faq_file)
-        
-        response = nlp_processor.get_response(question, env=env)
-        
-        # Generate session ID if not provided
+        # Generate session ID if not provided (a generated one is not rate limited)
+        client_session = data.get('sessionId')
         session_id = data.get('sessionId', str(uuid.uuid4()))
-        
-        # Log to file
-        logger.info(f"Question: {question}")
-        logger.info(f"Env: {env} | FAQ file: {faq_file}")
-        logger.info(f"Category: {response['category']}")
-        logger.info(f"Confidence: {response['confidence']:.3f}")
-        logger.info(f"Status: {response['status']}")
+        bind_request(session_id)
+        try:
+            # long questions cost more to answer: one token per started 100 characters
+            with admission.admit(ip_address, client_session, cost=1 + (len(question) - 1) // 100):
+                nlp_processor = get_processor(env)
+                if not nlp_processor:
+                    return {
+                        'answer': 'Maaf, sistem FAQ sedang tidak tersedia. Silakan coba lagi nanti.',
+                        'confidence': 0.0,
+                        'category': 'system_error',
+                        'status': 'error'
+                    }, 503, {}
+
+                response = response_cache.get_response(scoring_backend(nlp_processor), question, env=env)
+        except Rejected as e:
+            return ask_rejected(e, env)
+
+        logger.debug("Question: %s", question)
+        logger.debug("Env: %s | FAQ file: %s", env, nlp_processor.faq_file)
+        logger.debug("Category: %s | Confidence: %.3f | Status: %s",
+                     response['category'], response['confidence'], response['status'])
         
         # Prepare answer to send: prefer formatted_answer when available
         answer_to_send = response.get('formatted_answer') or response.get('answer')
@@ -155,59 +481,158 @@ def ask_question():
             confidence=response['confidence'],
             category=response['category'],
             environment=env,
-            user_agent=request.headers.get('User-Agent', ''),
-            ip_address=request.remote_addr or ''
+            user_agent=user_agent,
+            ip_address=ip_address
         )
         
         # Don't add sessionId to response - widget doesn't need it
         
-        return jsonify(response)
+        RESPONSES.inc(metric_env(env), response['status'])
+        REQUEST_SECONDS.observe(perf_counter() - started, 'ask', metric_env(env))
+        return response, 200, {}
     except Exception as e:
-        logger.error(f"Error processing question: {e}")
-        return jsonify({
-            'answer': 'Maaf, terjadi kesalahan sistem. Silakan coba lagi nanti.',
-            'confidence': 0.0,
-            'category': 'system_error',
-            'status': 'error'
-        }), 500
+        return ask_error(e) + ({},)
+
+@app.route('/ask', methods=['POST'])
+def ask_question():
+    """Handle FAQ questions for multiple environments"""
+    started = perf_counter()
+    headers = {}
+    try:
+        data = request.get_json()
+    except Exception as e:
+        body, status = ask_error(e)
+    else:
+        body, status, headers = answer_question(
+            data,
+            user_agent=request.headers.get('User-Agent', ''),
+            ip_address=request_client_ip(request.remote_addr, request.headers.get('X-Forwarded-For')),
+            started=started
+        )
+    return jsonify(body), status, headers
+
+# Maximum number of questions accepted by /ask/batch
+ASK_BATCH_MAX = int(os.environ.get('ASK_BATCH_MAX', 200))
+
+def ask_batch_error(e):
+    """(body, status) of an /ask/batch request that failed unexpectedly"""
+    logger.error(f"Error processing question batch: {e}")
+    return {
+        'error': 'Maaf, terjadi kesalahan sistem. Silakan coba lagi nanti.',
+        'status': 'error'
+    }, 500
+
+def answer_batch(data, started=None):
+    """(body, status) of POST /ask/batch for the decoded JSON body data"""
+    started = started or perf_counter()
+    try:
+        questions = data.get('questions') if isinstance(data, dict) else None
+        if not isinstance(questions, list) or not questions:
+            return {
+                'error': 'Questions (non-empty list) are required',
+                'status': 'error'
+            }, 400
+        if len(questions) > ASK_BATCH_MAX:
+            return {
+                'error': f'Too many questions (max {ASK_BATCH_MAX})',
+                'status': 'error'
+            }, 400
+        env = data.get('env', 'stunting').lower()
+        nlp_processor = get_processor(env)
+        if not nlp_processor:
+            return {
+                'error': 'Maaf, sistem FAQ sedang tidak tersedia. Silakan coba lagi nanti.',
+                'status': 'error'
+            }, 503
+
+        results = [None] * len(questions)
+        valid_idx = []
+        for i, question in enumerate(questions):
+            question = question.strip() if isinstance(question, str) else ''
+            if not question:
+                results[i] = {'error': 'Question cannot be empty', 'status': 'error'}
+            elif len(question) > 500:
+                results[i] = {'error': 'Question too long (max 500 characters)', 'status': 'error'}
+            else:
+                questions[i] = question
+                valid_idx.append(i)
+
+        responses = response_cache.get_responses(scoring_backend(nlp_processor), [questions[i] for i in valid_idx],
+                                                 env=env)
+        for i, response in zip(valid_idx, responses):
+            results[i] = response
+
+        REQUEST_SECONDS.observe(perf_counter() - started, 'ask_batch', metric_env(env))
+        return {'results': results, 'env': env, 'count': len(results)}, 200
+    except Exception as e:
+        return ask_batch_error(e)
+
+@app.route('/ask/batch', methods=['POST'])
+def ask_batch():
+    """Answer many questions for one environment in a single call.
+
+    Intended for regression checks and bulk imports, so the questions are
+    not logged to the admin backend. Each result has the same shape as an
+    /ask response; invalid questions get an error entry in their slot.
+    """
+    started = perf_counter()
+    try:
+        data = request.get_json()
+    except Exception as e:
+        body, status = ask_batch_error(e)
+    else:
+        body, status = answer_batch(data, started=started)
+    return jsonify(body), status
+
+def admin_authorized():
+    """True when the request carries RELOAD_TOKEN (admin endpoints are off without it)"""
+    token = request.headers.get('X-Reload-Token', '')
+    return bool(RELOAD_TOKEN) and hmac.compare_digest(token, RELOAD_TOKEN)
+
+@app.route('/reload', methods=['POST'])
+def reload_faqs():
+    """Rebuild the FAQ index of one env (or all) in the background and swap it in"""
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden', 'status': 'error'}), 403
+    if not faq_registry:
+        return jsonify({'error': 'FAQ registry unavailable', 'status': 'error'}), 503
+    data = request.get_json(silent=True) or {}
+    env = data.get('env')
+    faq_registry.reload_async(env)
+    return jsonify({
+        'status': 'reloading',
+        'envs': [faq_registry.resolve_env(env)] if env else list(faq_registry.loaded()),
+        'generation': faq_registry.generation
+    }), 202
+
+def prepared_response(env, name):
+    """PreparedResponse of read endpoint name for env (see static_responses.py), or None"""
+    return getattr(get_processor(env), 'static_responses', {}).get(name)
+
+def static_response(env, name):
+    """Pre-serialized body of a read endpoint for env, or None if not available.
+
+    A 304 is returned when If-None-Match matches; otherwise the variant
+    (br, gzip, identity) the client accepts, with its strong ETag.
+    """
+    prepared = prepared_response(env, name)
+    if prepared is None:
+        return None
+    accepted = {e for e in ('br', 'gzip') if request.accept_encodings.quality(e) > 0}
+    encoding, body, etag = prepared.select(accepted)
+    headers = {'ETag': f'"{etag}"', 'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+    if any(request.if_none_match.contains_weak(tag) for tag in prepared.etags):
+        return Response(status=304, headers=headers)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return Response(body, mimetype='application/json', headers=headers)
 
 @app.route('/categories', methods=['GET'])
 def get_categories():
     """Get available FAQ categories for selected environment"""
     try:
         env = request.args.get('env', 'stunting').lower()
-        faq_file = ENV_FAQ_MAP.get(env, 'faq_stunting.json')
-        if nlp_processor.faq_file != faq_file:
-            nlp_processor.switch_faq(faq_file)
-        if not nlp_processor or not nlp_processor.faqs:
-            return jsonify({'categories': []})
-        categories = nlp_processor.get_all_categories()
-        # Deskripsi kategori generik
-        generic_desc = {
-            'umum': 'Informasi umum',
-            'prosedur': 'Prosedur permohonan dan keberatan',
-            'informasi': 'Jenis informasi publik',
-            'kontak': 'Informasi kontak',
-            'layanan': 'Layanan website',
-            # kategori stunting
-            'definisi': 'Pengertian dan definisi stunting',
-            'penyebab': 'Faktor penyebab terjadinya stunting',
-            'gejala': 'Ciri-ciri dan tanda-tanda stunting',
-            'pencegahan': 'Cara mencegah stunting',
-            'dampak': 'Akibat dan dampak stunting',
-            'asi': 'ASI eksklusif dan menyusui',
-            'mpasi': 'Makanan pendamping ASI',
-            'gizi_ibu': 'Gizi dan nutrisi ibu hamil',
-            'posyandu': 'Posyandu dan pemantauan',
-            'periode_emas': '1000 hari pertama kehidupan'
-        }
-        result = []
-        for cat in categories:
-            result.append({
-                'category': cat,
-                'description': generic_desc.get(cat, cat.replace('_', ' ').title())
-            })
-        return jsonify({'categories': result})
+        return static_response(env, 'categories') or jsonify({'categories': []})
     except Exception as e:
         logger.error(f"Error getting categories: {e}")
         return jsonify({'categories': []})
@@ -217,24 +642,47 @@ def get_all_faqs():
     """Get all FAQ data for selected environment"""
     try:
         env = request.args.get('env', 'stunting').lower()
-        faq_file = ENV_FAQ_MAP.get(env, 'faq_stunting.json')
-        if nlp_processor.faq_file != faq_file:
-            nlp_processor.switch_faq(faq_file)
-        if not nlp_processor:
-            return jsonify({'faqs': []})
-        return jsonify({'faqs': nlp_processor.faqs})
+        return static_response(env, 'faqs') or jsonify({'faqs': []})
     except Exception as e:
         logger.error(f"Error getting FAQs: {e}")
         return jsonify({'faqs': []})
 
+@app.route('/faqs/<faq_id>', methods=['PUT', 'DELETE'])
+def update_faq(faq_id):
+    """Add/replace (PUT) or remove (DELETE) one FAQ of an environment without a full rebuild"""
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden', 'status': 'error'}), 403
+    if not faq_registry:
+        return jsonify({'error': 'FAQ registry unavailable', 'status': 'error'}), 503
+    env = request.args.get('env', 'stunting').lower()
+    faq_key = int(faq_id) if faq_id.isdigit() else faq_id
+    try:
+        if request.method == 'DELETE':
+            summary = faq_registry.update_faqs(env, deletes=[faq_key])
+        else:
+            faq = request.get_json(silent=True)
+            if not isinstance(faq, dict):
+                return jsonify({'error': 'FAQ object is required', 'status': 'error'}), 400
+            faq = dict(faq, id=faq_key)
+            summary = faq_registry.update_faqs(env, upserts=[faq])
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 503
+    except Exception as e:
+        logger.error(f"Error updating FAQ {faq_id}: {e}")
+        return jsonify({'error': 'Failed to update FAQ', 'status': 'error'}), 500
+    if request.method == 'DELETE' and not summary['deleted']:
+        return jsonify({'error': 'FAQ not found', 'status': 'error', **summary}), 404
+    summary.update(status='ok', env=faq_registry.resolve_env(env))
+    return jsonify(summary)
+
 @app.route('/stats', methods=['GET'])
 def get_stats():
     """Get bot statistics for selected environment"""
     try:
         env = request.args.get('env', 'stunting').lower()
-        faq_file = ENV_FAQ_MAP.get(env, 'faq_stunting.json')
-        if nlp_processor.faq_file != faq_file:
-            nlp_processor.switch_faq(faq_file)
+        nlp_processor = get_processor(env)
         if not nlp_processor:
             return jsonify({
                 'total_faqs': 0,
@@ -243,14 +691,12 @@ def get_stats():
                 'env': env,
                 'status': 'error'
             })
-        total_questions = sum(len(faq['questions']) for faq in nlp_processor.faqs)
-        return jsonify({
-            'total_faqs': len(nlp_processor.faqs),
-            'total_questions': total_questions,
-            'categories': len(nlp_processor.get_all_categories()),
-            'env': env,
-            'status': 'active'
-        })
+        # the prepared body names the env it was built for; unknown envs echo their own name
+        if faq_registry.resolve_env(env) == env:
+            response = static_response(env, 'stats')
+            if response is not None:
+                return response
+        return jsonify(faq_stats(nlp_processor, env))
     except Exception as e:
         logger.error(f"Error getting stats: {e}")
         return jsonify({
@@ -0,0 +1,419 @@
+"""ASGI entry point: the public API of app.py on an asyncio event loop.
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000 --workers 2
+
+Connections, request bodies and responses are handled on the event loop,
+so thousands of open (keep-alive, slow or idle) widget connections cost a
+socket each instead of a worker thread each. Answering a question is CPU
+work: /ask and /ask/batch run app.answer_question / app.answer_batch in a
+bounded thread pool (ASYNC_WORKER_THREADS threads, at most
+ASYNC_MAX_PENDING requests queued or running; further requests wait on
+the loop without holding a thread). Chat logs go through app.py's
+LogShipper, which posts them to the admin backend from its own thread, so
+no request waits on that network call. The pre-serialized bodies of /faqs,
+/categories and /stats are sent straight from the loop; an env that is not
+loaded yet (or was evicted) is built in the thread pool first.
+
+GET /, /metrics, /faqs, /categories, /stats and POST /ask, /ask/batch
+answer with the same bodies, status codes, ETags and CORS headers as the
+Flask app; the admin endpoints (/reload, PUT/DELETE /faqs/<id>) are only
+served by app.py. Serving it needs an ASGI server (`pip install uvicorn`);
+the module itself only uses the standard library.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from time import perf_counter
+from urllib.parse import parse_qsl
+
+import app as flask_app
+import startup
+from log_setup import bind_request
+from metrics import REGISTRY
+from static_responses import faq_stats, json_bytes
+
+logger = logging.getLogger(__name__)
+
+# with a scoring pool the threads mostly wait for worker processes, so keep every worker busy
+ASYNC_WORKER_THREADS = int(os.environ.get('ASYNC_WORKER_THREADS', 2 * flask_app.SCORING_PROCESSES
+                                          if flask_app.scoring_pool else min(4, os.cpu_count() or 1)))
+ASYNC_MAX_PENDING = int(os.environ.get('ASYNC_MAX_PENDING', 256))
+# Largest request body accepted (413 beyond); a full /ask/batch is well under 200 KB
+ASYNC_MAX_BODY = int(os.environ.get('ASYNC_MAX_BODY', 1024 * 1024))
+
+# flask-cors' defaults for preflight responses
+CORS_METHODS = 'DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT'
+
+
+class BoundedExecutor:
+    """Thread pool for the CPU-bound part of a request, with at most max_pending calls admitted.
+
+    Calls beyond that wait on an asyncio.Semaphore, i.e. on the event loop,
+    instead of piling up in the pool's unbounded queue. Each call runs in a
+    copy of the caller's contextvars, so log correlation ids follow it.
+    """
+
+    def __init__(self, threads, max_pending):
+        self.threads = threads
+        self.max_pending = max(max_pending, threads)
+        self._pool = ThreadPoolExecutor(threads, thread_name_prefix='answer')
+        self._slots = None
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+
+    async def run(self, fn, *args, **kwargs):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            call = partial(contextvars.copy_context().run, fn, *args, **kwargs)
+            return await asyncio.get_running_loop().run_in_executor(self._pool, call)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            'threads': self.threads,
+            'max_pending': self.max_pending,
+            'running': self.running,
+            'waiting': self.waiting,
+            'completed': self.completed
+        }
+
+
+class LoopFlights:
+    """Identical /ask questions in flight, coalesced on the event loop.
+
+    The first request for a key runs; identical requests arriving while it
+    runs await an asyncio future instead of taking an executor thread that
+    would only block in SingleFlight. When it is done (or after timeout
+    seconds) they run too and find the answer in the response cache, so
+    each of them still passes admission control and is logged on its own.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self._flights = {}
+        self.coalesced = 0
+        self.timeouts = 0
+
+    async def run(self, key, fn, *args, **kwargs):
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            done, _ = await asyncio.wait({flight}, timeout=self.timeout)
+            if not done:
+                self.timeouts += 1
+            return await fn(*args, **kwargs)
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            del self._flights[key]
+            flight.set_result(None)
+
+    def stats(self):
+        return {'in_flight': len(self._flights), 'coalesced': self.coalesced, 'timeouts': self.timeouts}
+
+
+executor = BoundedExecutor(ASYNC_WORKER_THREADS, ASYNC_MAX_PENDING)
+# waiting on the loop only helps when the leader's answer is cached for the others
+loop_flights = (LoopFlights(flask_app.response_cache.coalesce_timeout)
+                if flask_app.response_cache.coalesces and flask_app.response_cache.maxsize else None)
+
+REGISTRY.gauge_callback('chatbot_async_executor', 'Requests in the ASGI answer thread pool', ['stat'],
+                        lambda: {(k,): v for k, v in executor.stats().items()})
+
+
+class Request:
+    """The parts of an ASGI HTTP scope the handlers need"""
+
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = dict(reversed(parse_qsl(scope.get('query_string', b'').decode('latin-1'))))
+        self.headers = {}
+        for name, value in scope.get('headers', ()):
+            name = name.decode('latin-1').lower()
+            value = value.decode('latin-1')
+            self.headers[name] = f'{self.headers[name]}, {value}' if name in self.headers else value
+        client = scope.get('client')
+        self.remote_addr = client[0] if client else ''
+        self.body = body
+
+    def get_json(self):
+        """Decoded JSON body; raises ValueError where Flask's request.get_json() raises"""
+        content_type = self.headers.get('content-type', '').split(';')[0].strip().lower()
+        if content_type != 'application/json' and not (content_type.startswith('application/')
+                                                       and content_type.endswith('+json')):
+            raise ValueError("Did not attempt to load JSON data because the request "
+                             "Content-Type was not 'application/json'.")
+        return json.loads(self.body)
+
+    def accepts(self, encoding):
+        """True when Accept-Encoding allows encoding (q > 0, directly or through *)"""
+        qualities = {}
+        for part in self.headers.get('accept-encoding', '').split(','):
+            name, _, params = part.strip().partition(';')
+            q = 1.0
+            for param in params.split(';'):
+                key, _, value = param.strip().partition('=')
+                if key == 'q':
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        q = 0.0
+            if name:
+                qualities[name.strip().lower()] = q
+        return qualities.get(encoding, qualities.get('*', 0.0)) > 0
+
+    def if_none_match(self, etags):
+        """True when If-None-Match names one of etags (weak comparison)"""
+        header = self.headers.get('if-none-match')
+        if not header:
+            return False
+        if header.strip() == '*':
+            return True
+        tags = {tag.strip().removeprefix('W/').strip('"') for tag in header.split(',')}
+        return not tags.isdisjoint(etags)
+
+
+def json_response(payload, status=200):
+    return status, [('content-type', 'application/json')], json_bytes(payload)
+
+
+def prepared_body(request, prepared):
+    """The variant of a PreparedResponse the client accepts, or 304 when its ETag matches"""
+    encoding, body, etag = prepared.select({e for e in ('br', 'gzip') if request.accepts(e)})
+    headers = [('etag', f'"{etag}"'), ('vary', 'Accept-Encoding'), ('cache-control', 'no-cache')]
+    if request.if_none_match(prepared.etags):
+        return 304, headers, b''
+    if encoding:
+        headers.append(('content-encoding', encoding))
+    headers.append(('content-type', 'application/json'))
+    return 200, headers, body
+
+
+async def health_check(request):
+    payload = flask_app.health_payload()
+    payload['async_executor'] = executor.stats()
+    if loop_flights is not None:
+        payload['async_coalescing'] = loop_flights.stats()
+    return json_response(payload)
+
+
+async def prometheus_metrics(request):
+    return 200, [('content-type', 'text/plain; version=0.0.4; charset=utf-8')], REGISTRY.render().encode('utf-8')
+
+
+def question_key(data):
+    """(env, normalized question) of an /ask body, or None when it is not a valid question"""
+    if not isinstance(data, dict):
+        return None
+    question, env = data.get('question'), data.get('env', 'stunting')
+    if not isinstance(question, str) or not isinstance(env, str) or not question.strip():
+        return None
+    return env.lower(), flask_app.response_cache.normalize(question)
+
+
+async def ask_question(request, started):
+    headers = {}
+    try:
+        data = request.get_json()
+    except Exception as e:
+        body, status = flask_app.ask_error(e)
+    else:
+        answer = partial(
+            executor.run,
+            flask_app.answer_question,
+            data,
+            user_agent=request.headers.get('user-agent', ''),
+            ip_address=flask_app.request_client_ip(request.remote_addr, request.headers.get('x-forwarded-for')),
+            started=started
+        )
+        key = question_key(data)
+        if loop_flights is not None and key is not None:
+            body, status, headers = await loop_flights.run(key, answer)
+        else:
+            body, status, headers = await answer()
+    status, response_headers, body = json_response(body, status)
+    return status, response_headers + [(name.lower(), value) for name, value in headers.items()], body
+
+
+async def ask_batch(request, started):
+    try:
+        data = request.get_json()
+    except Exception as e:
+        body, status = flask_app.ask_batch_error(e)
+    else:
+        body, status = await executor.run(flask_app.answer_batch, data, started=started)
+    return json_response(body, status)
+
+
+async def loaded_processor(env):
+    """app.get_processor(env), with a cold or evicted env built in the executor instead of on the loop"""
+    registry = flask_app.faq_registry
+    if not registry:
+        return None
+    processor = registry.get(env, load=False)
+    if processor is None:
+        processor = await executor.run(registry.get, env)
+    return processor
+
+
+def read_endpoint(name):
+    async def handler(request):
+        env = request.args.get('env', 'stunting').lower()
+        prepared = getattr(await loaded_processor(env), 'static_responses', {}).get(name)
+        if prepared is None:
+            return json_response({name: []})
+        return prepared_body(request, prepared)
+    return handler
+
+
+async def get_stats(request):
+    env = request.args.get('env', 'stunting').lower()
+    nlp_processor = await loaded_processor(env)
+    if not nlp_processor:
+        return json_response({
+            'total_faqs': 0,
+            'total_questions': 0,
+            'categories': 0,
+            'env': env,
+            'status': 'error'
+        })
+    # the prepared body names the env it was built for; unknown envs echo their own name
+    if flask_app.faq_registry.resolve_env(env) == env:
+        prepared = getattr(nlp_processor, 'static_responses', {}).get('stats')
+        if prepared is not None:
+            return prepared_body(request, prepared)
+    return json_response(faq_stats(nlp_processor, env))
+
+
+ROUTES = {
+    '/': {'GET': health_check},
+    '/metrics': {'GET': prometheus_metrics},
+    '/ask': {'POST': ask_question},
+    '/ask/batch': {'POST': ask_batch},
+    '/categories': {'GET': read_endpoint('categories')},
+    '/faqs': {'GET': read_endpoint('faqs')},
+    '/stats': {'GET': get_stats},
+}
+TIMED_HANDLERS = (ask_question, ask_batch)
+
+
+def cors_headers(request, preflight):
+    """The headers flask-cors adds for CORS(app, resources={r"/*": {"origins": single_origin}})"""
+    allowed = flask_app.single_origin or '*'
+    origin = request.headers.get('origin')
+    headers = []
+    if allowed == '*':
+        headers.append(('access-control-allow-origin', origin or '*'))
+    elif origin is None or origin == allowed:
+        headers.append(('access-control-allow-origin', allowed))
+    else:
+        return headers
+    if preflight:
+        if 'access-control-request-headers' in request.headers:
+            headers.append(('access-control-allow-headers', request.headers['access-control-request-headers']))
+        headers.append(('access-control-allow-methods', CORS_METHODS))
+    if allowed == '*' and origin:
+        headers.append(('vary', 'Origin'))
+    return headers
+
+
+async def dispatch(request, started):
+    """(status, headers, body) for request"""
+    methods = ROUTES.get(request.path)
+    if methods is None:
+        return json_response({'error': 'Endpoint not found', 'status': 'error'}, 404)
+    allow = ', '.join(sorted(set(methods) | {'OPTIONS'} | ({'HEAD'} if 'GET' in methods else set())))
+    method = 'GET' if request.method == 'HEAD' else request.method
+    if method == 'OPTIONS':
+        return 200, [('allow', allow), ('content-type', 'text/html; charset=utf-8')], b''
+    handler = methods.get(method)
+    if handler is None:
+        status, headers, body = json_response({'error': 'Method not allowed', 'status': 'error'}, 405)
+        return status, headers + [('allow', allow)], body
+    try:
+        if handler in TIMED_HANDLERS:
+            return await handler(request, started)
+        return await handler(request)
+    except Exception as e:
+        logger.error(f"Error handling {request.method} {request.path}: {e}")
+        return json_response({'error': 'Internal server error', 'status': 'error'}, 500)
+
+
+async def read_body(receive):
+    """Request body, or None when it exceeds ASYNC_MAX_BODY"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > ASYNC_MAX_BODY:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # what gunicorn.conf.py's when_ready does once in the master, here once per worker
+            if flask_app.faq_registry is not None:
+                with startup.phase('warm_up'):
+                    await executor.run(flask_app.faq_registry.warm_up)
+            startup.mark_ready()
+            flask_app.start_background_workers()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    started = perf_counter()
+    bind_request(None, flask_app.LOG_SAMPLE_RATE)
+    body = await read_body(receive)
+    request = Request(scope, body or b'')
+    if body is None:
+        status, headers, payload = json_response({'error': 'Request body too large', 'status': 'error'}, 413)
+    else:
+        status, headers, payload = await dispatch(request, started)
+    preflight = request.method == 'OPTIONS' and 'access-control-request-method' in request.headers
+    headers = headers + cors_headers(request, preflight)
+    headers.append(('content-length', str(len(payload))))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+    })
+    await send({'type': 'http.response.body', 'body': b'' if request.method == 'HEAD' else payload})
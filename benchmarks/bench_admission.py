@@ -0,0 +1,140 @@
+"""One noisy client against well-behaved widget users, with and without admission control.
+
+The app is started under gunicorn (--workers processes with --threads
+threads, response cache off, TRUSTED_PROXIES=1 so that X-Forwarded-For
+names the client) against a stub admin backend, once with admission
+control off (no rate limits, no concurrency limit) and once with the
+settings of this process's environment (the app defaults unless
+RATE_LIMIT_* / ASK_* are set). In each run:
+
+- the noisy client sends 500-character questions of random corpus words
+  from --noisy threads as fast as it can, all from one IP, and ignores
+  Retry-After;
+- --users users, each with their own IP and sessionId, ask a question
+  from data/faq_*.json and then wait --think seconds (exponentially
+  distributed) before the next one.
+
+Reports the users' p50/p95/p99 latency, share and rate of answered questions,
+the noisy client's requests per second by status, and the admission
+counters of the server. --json writes the results in the format of
+results.py.
+
+    python benchmarks/bench_admission.py --users 20 --noisy 16 --duration 20 --json admission.json
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_load import AdminStub, load_queries, start_server  # noqa: E402
+from bench_memory import free_port, wait_ready  # noqa: E402
+from results import percentiles, write_results  # noqa: E402
+
+ADMISSION_OFF = {'RATE_LIMIT_IP_PER_MIN': '0', 'RATE_LIMIT_SESSION_PER_MIN': '0', 'ASK_MAX_CONCURRENT': '0'}
+# bench_load.start_server turns the rate limits off unless they are set; these are app.py's defaults
+ADMISSION_ON = {'RATE_LIMIT_IP_PER_MIN': os.environ.get('RATE_LIMIT_IP_PER_MIN', '120'),
+                'RATE_LIMIT_SESSION_PER_MIN': os.environ.get('RATE_LIMIT_SESSION_PER_MIN', '30')}
+
+
+def noisy_client(base_url, words, deadline, seed, statuses):
+    rng = random.Random(seed)
+    session = requests.Session()
+    headers = {'X-Forwarded-For': '203.0.113.66'}
+    while time.monotonic() < deadline:
+        question = ' '.join(rng.choice(words) for _ in range(120))[:500]
+        try:
+            status = session.post(base_url + '/ask', json={'question': question, 'sessionId': 'noisy'},
+                                  headers=headers, timeout=30).status_code
+        except requests.RequestException:
+            status = 0
+        statuses.append(status)
+
+
+def user(base_url, queries, think, deadline, seed, samples):
+    rng = random.Random(seed)
+    session = requests.Session()
+    headers = {'X-Forwarded-For': f'198.51.{seed // 250}.{seed % 250 + 1}'}
+    env = rng.choice(list(queries))
+    while time.monotonic() < deadline:
+        time.sleep(rng.expovariate(1.0 / think))
+        body = {'question': rng.choice(queries[env]), 'env': env, 'sessionId': f'user-{seed}'}
+        started = time.perf_counter()
+        try:
+            status = session.post(base_url + '/ask', json=body, headers=headers, timeout=30).status_code
+        except requests.RequestException:
+            status = 0
+        samples.append((status, time.perf_counter() - started))
+
+
+def run(args, queries, words, extra_env):
+    stub = AdminStub()
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    port = free_port()
+    extra_env = dict(extra_env, TRUSTED_PROXIES='1')
+    proc = start_server('gunicorn', port, args.workers, args.threads, stub.url, False, extra_env)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        wait_ready(base_url + '/', proc)
+        samples = []
+        statuses = []
+        deadline = time.monotonic() + args.duration
+        threads = [threading.Thread(target=noisy_client, args=(base_url, words, deadline, i, statuses))
+                   for i in range(args.noisy)]
+        threads += [threading.Thread(target=user, args=(base_url, queries, args.think, deadline, i, samples))
+                    for i in range(args.users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        admission = requests.get(base_url + '/', timeout=10).json()['admission']
+    finally:
+        proc.terminate()
+        proc.wait()
+        stub.shutdown()
+    metrics = percentiles([seconds for status, seconds in samples if status == 200])
+    answered = sum(1 for status, _ in samples if status == 200)
+    metrics['answered'] = answered / max(1, len(samples))
+    metrics['answered_per_s'] = answered / args.duration
+    for status in (200, 429, 503):
+        metrics[f'noisy_{status}_per_s'] = statuses.count(status) / args.duration
+    return metrics, admission
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker')
+    parser.add_argument('--users', type=int, default=20, help='well-behaved users')
+    parser.add_argument('--think', type=float, default=5.0, help="users' mean seconds between questions")
+    parser.add_argument('--noisy', type=int, default=16, help='threads of the noisy client')
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    queries = load_queries(1000)
+    words = sorted({word for qs in queries.values() for q in qs for word in q.split()})
+    records = []
+    print(f"{'admission':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'answered':>9} {'per s':>6} "
+          f"{'noisy 200/s':>11} {'429/s':>7} {'503/s':>7}")
+    for mode, extra_env in (('off', ADMISSION_OFF), ('on', ADMISSION_ON)):
+        m, stats = run(args, queries, words, extra_env)
+        print(f"{mode:>9} {m['p50'] * 1000:>8.1f} {m['p95'] * 1000:>8.1f} {m['p99'] * 1000:>8.1f} "
+              f"{m['answered']:>9.3f} {m['answered_per_s']:>6.2f} {m['noisy_200_per_s']:>11.1f} {m['noisy_429_per_s']:>7.1f} "
+              f"{m['noisy_503_per_s']:>7.1f}")
+        print(f"{'':>9} admission counters (one worker): {stats}")
+        records.append({'name': 'ask_with_noisy_client', 'params': {'admission': mode, 'users': args.users,
+                                                                     'noisy': args.noisy}, 'metrics': m})
+
+    if args.json:
+        write_results(args.json, 'admission', vars(args), records)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""Many concurrent widget users: Flask under gunicorn vs the ASGI app under uvicorn.
+
+Each simulated user keeps one HTTP/1.1 connection open, asks a question
+(see bench_load.py for how questions and envs are drawn), waits for the
+answer and then "reads" it for an exponentially distributed think time
+(--think seconds on average) before asking the next one. This is how the
+chat widget loads the server: many mostly idle connections rather than a
+few busy ones. Users are simulated with asyncio in this process, so
+thousands of them are cheap on the client side.
+
+For every --servers entry the app is started (--workers processes, and
+--threads threads each: gunicorn threads or ASYNC_WORKER_THREADS) against
+a stub admin backend, and every --users level is run for --duration
+seconds. Reports requests per second, p50/p95/p99 latency and failed
+requests (timeouts, refused or reset connections). --json writes the
+results in the format of results.py.
+
+    python benchmarks/bench_async.py --users 100,250,500,1000 --duration 20 --json async.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_load import AdminStub, load_queries, parse_mix, start_server  # noqa: E402
+from bench_memory import free_port, wait_ready  # noqa: E402
+from results import percentiles, write_results  # noqa: E402
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 client connection (reopened when the server closes it)"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def post(self, path, payload):
+        """POST payload as JSON; returns the response status"""
+        body = json.dumps(payload).encode('utf-8')
+        request = (f'POST {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n'
+                   f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n').encode('ascii') + body
+        reused = self.writer is not None
+        try:
+            return await self._exchange(request)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            if not reused:
+                raise
+            # the server closed an idle keep-alive connection; retry once on a new one
+            return await self._exchange(request)
+
+    async def _exchange(self, request):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(request)
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('connection closed by server')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status
+
+
+async def user(port, queries, mix, think, deadline, timeout, seed, samples):
+    rng = random.Random(seed)
+    envs = [env for env, _ in mix]
+    weights = [weight for _, weight in mix]
+    connection = Connection('127.0.0.1', port)
+    # users arrive spread over one think time, not all at once
+    await asyncio.sleep(rng.uniform(0, think))
+    try:
+        while time.monotonic() < deadline:
+            env = rng.choices(envs, weights)[0]
+            question = rng.choice(queries.get(env) or queries['stunting'])
+            body = {'question': question, 'env': env, 'sessionId': f'user-{seed}'}
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(connection.post('/ask', body), timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError):
+                connection.close()
+                status = 0
+            samples.append((status, time.perf_counter() - started))
+            if think:
+                await asyncio.sleep(rng.expovariate(1 / think))
+    finally:
+        connection.close()
+
+
+async def run_users(port, queries, mix, users, think, duration, timeout):
+    """[(http status, seconds)] of every request made by users in duration seconds; (samples, elapsed)"""
+    samples = []
+    started = time.monotonic()
+    deadline = started + duration
+    await asyncio.gather(*(user(port, queries, mix, think, deadline, timeout, i, samples) for i in range(users)))
+    return samples, time.monotonic() - started
+
+
+def summarize(samples, elapsed):
+    latencies = [seconds for status, seconds in samples if status == 200]
+    metrics = percentiles(latencies)
+    metrics['rps'] = len(latencies) / elapsed
+    metrics['errors'] = sum(1 for status, _ in samples if status != 200)
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', default='gunicorn,uvicorn', help='comma separated: gunicorn, uvicorn')
+    parser.add_argument('--users', default='100,250,500,1000', help='comma separated concurrent user counts')
+    parser.add_argument('--workers', type=int, default=2, help='worker processes per server')
+    parser.add_argument('--threads', type=int, default=1, help='threads per worker')
+    parser.add_argument('--think', type=float, default=1.0, help='mean seconds between a user\'s questions')
+    parser.add_argument('--duration', type=float, default=15.0, help='seconds of measured load per level')
+    parser.add_argument('--timeout', type=float, default=30.0, help='seconds before a request counts as failed')
+    parser.add_argument('--env-mix', default='stunting=0.45,ppid=0.45,other=0.1')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.env_mix)
+    queries = load_queries(2000)
+    levels = [int(n) for n in args.users.split(',')]
+    stub = AdminStub()
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    records = []
+    print(f"{'server':>9} {'users':>6} {'requests':>9} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>9} {'errors':>7}")
+    try:
+        for server in args.servers.split(','):
+            port = free_port()
+            proc = start_server(server, port, args.workers, args.threads, stub.url, True)
+            try:
+                wait_ready(f'http://127.0.0.1:{port}/', proc)
+                # warm caches and lazily built state before the first measured level
+                asyncio.run(run_users(port, queries, mix, 20, 0.0, 2.0, args.timeout))
+                for users in levels:
+                    samples, elapsed = asyncio.run(
+                        run_users(port, queries, mix, users, args.think, args.duration, args.timeout))
+                    m = summarize(samples, elapsed)
+                    records.append({'name': 'ask', 'params': {'server': server, 'users': users}, 'metrics': m})
+                    print(f"{server:>9} {users:>6} {len(samples):>9} {m['rps']:>8.1f} "
+                          f"{m.get('p50', 0) * 1000:>8.1f} {m.get('p95', 0) * 1000:>8.1f} "
+                          f"{m.get('p99', 0) * 1000:>9.1f} {m['errors']:>7}")
+            finally:
+                proc.terminate()
+                proc.wait(30)
+    finally:
+        stub.shutdown()
+
+    if args.json:
+        write_results(args.json, 'async', vars(args), records)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Throughput of NLPProcessor.get_responses vs. N separate get_response calls.
+
+Uses a synthetic corpus (or a real data file with --faq-file). An untimed
+pass warms the stemming cache first, since batching does not change how
+many words Sastrawi has to stem. Two comparisons are printed: end to end
+(keyword categories + TF-IDF) and the TF-IDF/fuzzy scoring stage alone.
+
+    python benchmarks/bench_batch.py --faqs 2000 --queries 500
+    python benchmarks/bench_batch.py --faq-file faq_ppid.json --queries 500
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nlp_processor  # noqa: E402
+from nlp_processor import NLPProcessor  # noqa: E402
+from synthetic_faq import make_faqs, make_queries, write_faq_file  # noqa: E402
+
+
+def load_processor(faq_file, n_faqs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        if faq_file:
+            return NLPProcessor(faq_file=faq_file)
+        data_dir = os.path.join(os.path.dirname(nlp_processor.__file__), 'data')
+        with tempfile.NamedTemporaryFile('w', suffix='.json', dir=data_dir, delete=False) as f:
+            path = f.name
+        try:
+            write_faq_file(path, make_faqs(n_faqs))
+            return NLPProcessor(faq_file=os.path.basename(path))
+        finally:
+            os.remove(path)
+
+
+def timed(fn, repeat=3):
+    """Best wall time of fn over repeat runs (stdout suppressed)"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        nlp_processor.preprocess_cache.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def report(label, n, t_single, t_batch, same):
+    print(f"{label}: single {n / t_single:8.0f} q/s | batch {n / t_batch:8.0f} q/s | "
+          f"speedup {t_single / t_batch:5.2f}x | identical: {same}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--faq-file', help='file under ./data instead of a synthetic corpus')
+    parser.add_argument('--faqs', type=int, default=2000, help='synthetic corpus size')
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    processor = load_processor(args.faq_file, args.faqs)
+    queries = make_queries(processor.faqs, args.queries)
+    print(f"corpus: {len(processor.processed_questions)} questions, batch: {len(queries)} queries")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for q in queries:
+            processor.preprocess_text(q)
+
+    singles, t_single = timed(lambda: [processor.get_response(q) for q in queries])
+    batch, t_batch = timed(lambda: processor.get_responses(queries))
+    report('end to end', len(queries), t_single, t_batch, singles == batch)
+
+    singles, t_single = timed(lambda: [processor.find_best_answer(q) for q in queries])
+    batch, t_batch = timed(lambda: processor.find_best_answers(queries))
+    report('scoring   ', len(queries), t_single, t_batch, singles == batch)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Build-time benchmark for NLPProcessor._init_ppid_categories.
+
+Builds the category/keyword maps (and the compiled KeywordMatcher) for
+synthetic FAQ sets of increasing size. Time per FAQ should stay flat if the
+build is linear.
+
+    python benchmarks/bench_category_index.py --sizes 1000 10000 50000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlp_processor import NLPProcessor  # noqa: E402
+from synthetic_faq import make_faqs  # noqa: E402
+
+
+def build_categories(faqs):
+    """Run only the category build on a bare processor (no corpus/TF-IDF)"""
+    processor = NLPProcessor.__new__(NLPProcessor)
+    processor.faqs = faqs
+    processor.fuzzy_threshold = 85
+    processor.fuzzy_short_threshold = 90
+    processor._init_ppid_categories()
+    return processor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 10000, 20000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'faqs':>8} {'keywords':>10} {'best_s':>9} {'us/faq':>8}")
+    for size in args.sizes:
+        faqs = make_faqs(size)
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            processor = build_categories(faqs)
+            best = min(best, time.perf_counter() - start)
+        n_keywords = len(processor.keyword_matcher.entries)
+        print(f"{size:>8} {n_keywords:>10} {best:>9.3f} {best / size * 1e6:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Bursts of one identical question, with and without coalescing of in-flight answers.
+
+Mimics a campaign: --clients users send the same question at the same
+moment (a threading.Barrier releases them together), wait for all answers,
+and move on to the next question. Every round asks a question the server
+has not answered before, so the response cache cannot serve it and each
+burst hits a cold key, which is what happens in the first seconds of a
+campaign and after every FAQ reload.
+
+The app is started under gunicorn (threads) and under uvicorn (asgi_app.py,
+answers in its executor threads) against a stub admin backend, with
+RESPONSE_COALESCING off and on, rate limits and the concurrency limit off.
+Reports the clients' p50/p95 latency, the mean time until the whole burst
+was answered, and the answers the server computed per burst (from the
+response cache counters of GET /). --json writes the results in the
+format of results.py.
+
+    python benchmarks/bench_coalescing.py --clients 32 --rounds 40 --json coalescing.json
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_load import AdminStub, load_queries, start_server  # noqa: E402
+from bench_memory import free_port, wait_ready  # noqa: E402
+from results import percentiles, write_results  # noqa: E402
+
+
+def burst_questions(rounds, seed=7):
+    """rounds distinct questions: corpus questions and typos with a round number, so none is cached"""
+    rng = random.Random(seed)
+    queries = load_queries(rounds)
+    return [f"{rng.choice(queries[rng.choice(list(queries))])} {i}" for i in range(rounds)]
+
+
+def client(base_url, questions, barrier, index, samples):
+    session = requests.Session()
+    headers = {'X-Forwarded-For': f'198.51.100.{index % 250 + 1}'}
+    for question in questions:
+        barrier.wait()
+        started = time.perf_counter()
+        try:
+            status = session.post(base_url + '/ask', json={'question': question, 'sessionId': f'burst-{index}'},
+                                  headers=headers, timeout=60).status_code
+        except requests.RequestException:
+            status = 0
+        samples.append((status, time.perf_counter() - started))
+        barrier.wait()
+
+
+def run(args, kind, coalescing, questions):
+    stub = AdminStub()
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    port = free_port()
+    extra_env = {'RESPONSE_COALESCING': '1' if coalescing else '0', 'ASK_MAX_CONCURRENT': '0'}
+    proc = start_server(kind, port, 1, args.threads, stub.url, True, extra_env)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        wait_ready(base_url + '/', proc)
+        # warm up the stemmer and the connection path with a question outside the measured rounds
+        requests.post(base_url + '/ask', json={'question': 'apa itu stunting'}, timeout=60)
+        before = requests.get(base_url + '/', timeout=10).json()['response_cache']
+        samples = []
+        barrier = threading.Barrier(args.clients)
+        threads = [threading.Thread(target=client, args=(base_url, questions, barrier, i, samples))
+                   for i in range(args.clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        after = requests.get(base_url + '/', timeout=10).json()['response_cache']
+    finally:
+        proc.terminate()
+        proc.wait()
+        stub.shutdown()
+    metrics = percentiles([seconds for status, seconds in samples if status == 200])
+    metrics['errors'] = sum(1 for status, _ in samples if status != 200)
+    metrics['burst_seconds'] = elapsed / len(questions)
+    metrics['computed_per_burst'] = (after['computed'] - before['computed']) / len(questions)
+    metrics['coalesced'] = after['coalesced'] - before['coalesced']
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=32, help='users sending each question at once')
+    parser.add_argument('--rounds', type=int, default=40, help='bursts, each of a new question')
+    parser.add_argument('--threads', type=int, default=16, help='gunicorn threads / ASYNC_WORKER_THREADS')
+    parser.add_argument('--servers', default='gunicorn,uvicorn')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    questions = burst_questions(args.rounds)
+    records = []
+    print(f"{'server':>9} {'coalesce':>8} {'p50 ms':>8} {'p95 ms':>8} {'burst ms':>9} {'computed':>9} "
+          f"{'coalesced':>10} {'errors':>7}")
+    for kind in args.servers.split(','):
+        for coalescing in (False, True):
+            m = run(args, kind, coalescing, questions)
+            print(f"{kind:>9} {'on' if coalescing else 'off':>8} {m['p50'] * 1000:>8.1f} {m['p95'] * 1000:>8.1f} "
+                  f"{m['burst_seconds'] * 1000:>9.1f} {m['computed_per_burst']:>9.1f} {m['coalesced']:>10} "
+                  f"{m['errors']:>7}")
+            records.append({'name': 'identical_burst', 'params': {'server': kind, 'coalescing': coalescing,
+                                                                  'clients': args.clients}, 'metrics': m})
+
+    if args.json:
+        write_results(args.json, 'coalescing', vars(args), records)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
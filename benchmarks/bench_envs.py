@@ -0,0 +1,152 @@
+"""Many environments: eager vs lazy loading, and a memory budget with LRU eviction.
+
+Writes --envs synthetic FAQ files (faq_agency<i>.json, --faqs FAQs each)
+to a temporary data directory, builds their index artifacts, and then for
+each configuration starts a fresh process that creates a FAQRegistry over
+the directory and answers --requests questions. The env of each question is
+drawn from a Zipf distribution (a few busy agencies, a long tail of quiet
+ones), as with many agencies sharing one server. Configurations:
+
+- eager: every env built at startup, no budget (the old behaviour)
+- lazy: envs built on first request, no budget
+- budget: lazy, with --budget-mb of estimated index memory
+- budget_no_artifacts: the same without index artifacts, so every
+  reload after an eviction rebuilds from the FAQ file
+
+Reports the time to a ready registry, RSS after startup and at the end,
+the registry's estimated memory, loads, evictions and the latency of
+requests that found their env loaded (warm) or had to load it (cold).
+--json writes the results in the format of results.py.
+
+    python benchmarks/bench_envs.py --envs 40 --faqs 500 --requests 4000 --budget-mb 16 --json envs.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from results import percentiles, write_results  # noqa: E402
+from synthetic_faq import make_faqs, make_queries, write_faq_file  # noqa: E402
+
+CONFIGS = ('eager', 'lazy', 'budget', 'budget_no_artifacts')
+
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def child(config):
+    """Run one configuration in this process and print its metrics as JSON"""
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+    from faq_registry import FAQRegistry
+
+    kwargs = {'data_dir': config['data_dir'], 'default_env': 'agency0', 'save_artifacts': False,
+              'index_dir': config['index_dir'] if config['name'] != 'budget_no_artifacts' else None}
+    if config['name'] != 'eager':
+        kwargs['preload'] = ['agency0']
+    if config['name'].startswith('budget'):
+        kwargs['memory_budget'] = config['budget_mb'] * 2**20
+    started = time.perf_counter()
+    registry = FAQRegistry(**kwargs)
+    ready_seconds = time.perf_counter() - started
+    rss_ready = rss_mb()
+
+    rng = random.Random(1)
+    envs = registry.envs()
+    weights = [1.0 / (rank + 1) ** config['zipf'] for rank in range(len(envs))]
+    queries = {}
+    warm, cold = [], []
+    for _ in range(config['requests']):
+        env = rng.choices(envs, weights)[0]
+        loaded = env in registry.loaded()
+        started = time.perf_counter()
+        processor = registry.get(env)
+        seconds = time.perf_counter() - started
+        if env not in queries:
+            queries[env] = make_queries(processor.faqs, 20, seed=len(queries))
+        started = time.perf_counter()
+        processor.get_response(rng.choice(queries[env]), env=env)
+        (warm if loaded else cold).append(seconds + time.perf_counter() - started)
+    status = registry.status()
+    metrics = {
+        'ready_seconds': ready_seconds,
+        'rss_ready_mb': rss_ready,
+        'rss_end_mb': rss_mb(),
+        'estimated_mb': status['memory_bytes'] / 2**20,
+        'loaded_envs': status['loaded'],
+        'loads': sum(info['loads'] for info in status['envs'].values()),
+        'evictions': status['evictions'],
+        'cold_requests': len(cold)
+    }
+    metrics.update({f'warm_{k}': v for k, v in percentiles(warm).items()})
+    metrics.update({f'cold_{k}': v for k, v in percentiles(cold).items()})
+    print(json.dumps(metrics))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--envs', type=int, default=40, help='number of synthetic environments')
+    parser.add_argument('--faqs', type=int, default=500, help='FAQs per environment')
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--zipf', type=float, default=1.1, help='exponent of the env popularity distribution')
+    parser.add_argument('--budget-mb', type=float, default=16.0, help='memory budget of the budget configs')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(json.loads(args.child))
+        return
+
+    from index_artifact import build_all
+
+    workdir = tempfile.mkdtemp(prefix='bench_envs_')
+    data_dir = os.path.join(workdir, 'data')
+    index_dir = os.path.join(workdir, 'index')
+    os.makedirs(data_dir)
+    try:
+        for i in range(args.envs):
+            write_faq_file(os.path.join(data_dir, f'faq_agency{i}.json'), make_faqs(args.faqs, seed=i))
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_all(data_dir, index_dir)
+        print(f"Built {args.envs} artifacts in {time.perf_counter() - started:.1f} s")
+
+        records = []
+        print(f"{'config':>20} {'ready s':>8} {'rss0 MB':>8} {'rss MB':>7} {'est MB':>7} {'loaded':>7} "
+              f"{'loads':>6} {'evict':>6} {'cold':>5} {'warm p50':>9} {'warm p99':>9} {'cold p50':>9}")
+        for name in CONFIGS:
+            config = {'name': name, 'data_dir': data_dir, 'index_dir': index_dir, 'budget_mb': args.budget_mb,
+                      'requests': args.requests, 'zipf': args.zipf}
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', json.dumps(config)],
+                                 capture_output=True, text=True, check=True).stdout
+            m = json.loads(out.strip().splitlines()[-1])
+            print(f"{name:>20} {m['ready_seconds']:>8.2f} {m['rss_ready_mb']:>8.0f} {m['rss_end_mb']:>7.0f} "
+                  f"{m['estimated_mb']:>7.1f} {m['loaded_envs']:>7} {m['loads']:>6} {m['evictions']:>6} "
+                  f"{m['cold_requests']:>5} {m.get('warm_p50', 0) * 1000:>7.2f}ms {m.get('warm_p99', 0) * 1000:>7.2f}ms "
+                  f"{m.get('cold_p50', 0) * 1000:>7.1f}ms")
+            records.append({'name': 'registry', 'params': {'config': name, 'envs': args.envs, 'faqs': args.faqs},
+                            'metrics': m})
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        write_results(args.json, 'envs', vars(args), records)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Latency of NLPProcessor.apply_faq_changes vs. rebuilding the whole index.
+
+For each synthetic corpus size this times:
+- a full rebuild with cold text caches (what a restart pays) and with warm
+  ones (what a hot reload in the same process pays),
+- an answer-only edit (no questions to preprocess),
+- an edit that changes a FAQ's questions (rows patched, IDF kept),
+- the same edit with a forced IDF refit (max_idf_drift=0).
+
+    python benchmarks/bench_incremental.py --sizes 100 1000 10000
+"""
+import argparse
+import contextlib
+import copy
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nlp_processor  # noqa: E402
+from nlp_processor import NLPProcessor  # noqa: E402
+from synthetic_faq import make_faqs, write_faq_file  # noqa: E402
+
+
+def clear_text_caches():
+    nlp_processor.stem_cache.clear()
+    nlp_processor.preprocess_cache.clear()
+
+
+def timed(fn):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = fn()
+        return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    print(f"{'faqs':>7} {'cold build':>11} {'warm build':>11} {'answer edit':>12} "
+          f"{'question edit':>14} {'edit + refit':>13}   (ms)")
+    with tempfile.TemporaryDirectory() as data_dir:
+        for size in args.sizes:
+            write_faq_file(os.path.join(data_dir, 'faq_bench.json'), make_faqs(size))
+
+            def build(**kwargs):
+                return NLPProcessor(faq_file='faq_bench.json', index_dir=None, data_dir=data_dir, **kwargs)
+
+            clear_text_caches()
+            _, t_cold = timed(build)
+            processor, t_warm = timed(build)
+            strict, _ = timed(lambda: build(max_idf_drift=0.0))
+
+            target = processor.faqs[len(processor.faqs) // 2]
+            answer_edit = dict(target, answer=target['answer'] + ' (diperbarui)')
+            # reuse words of another FAQ so the edit does not bring unseen terms
+            donor = processor.faqs[0]['questions']
+            question_edit = dict(target, questions=[donor[0] + ' ' + target['questions'][0]] + donor[1:])
+
+            _, t_answer = timed(lambda: copy.copy(processor).upsert_faq(answer_edit))
+            summary, t_question = timed(lambda: copy.copy(processor).upsert_faq(question_edit))
+            strict_summary, t_refit = timed(lambda: copy.copy(strict).upsert_faq(question_edit))
+            assert not summary['refit'] and strict_summary['refit']
+            print(f"{size:>7} {t_cold * 1000:>11.1f} {t_warm * 1000:>11.1f} {t_answer * 1000:>12.2f} "
+                  f"{t_question * 1000:>14.2f} {t_refit * 1000:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""Load generator for the Flask app: /ask latency percentiles and throughput.
+
+Starts the app (gunicorn with gunicorn.conf.py, the ASGI app asgi_app.py
+under uvicorn with --server uvicorn, or the Flask development server with
+--server flask) against a stub admin backend that accepts chat
+logs, then runs --concurrency closed-loop clients for --duration seconds.
+Each request asks a question from data/faq_*.json (as is, with a typo, or
+unrelated words) for an env drawn from --env-mix; unknown envs exercise the
+default-env fallback.
+
+Reports p50/p95/p99 latency and requests per second overall and per env,
+plus the chat logs the stub received. --json writes the results in the
+format of results.py. --url load-tests a server that is already running
+(its admin backend is then whatever it is configured with).
+
+    python benchmarks/bench_load.py --workers 4 --concurrency 16 --duration 20 --json load.json
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_memory import ROOT, free_port, wait_ready  # noqa: E402
+from results import percentiles, write_results  # noqa: E402
+from synthetic_faq import make_queries  # noqa: E402
+
+ENV_FILES = {'stunting': 'faq_stunting.json', 'ppid': 'faq_ppid.json'}
+
+
+class AdminStub(ThreadingHTTPServer):
+    """Admin backend that accepts every chat log (single or {"logs": [...]}) and counts them"""
+    daemon_threads = True
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.received = 0
+        self.lock = threading.Lock()
+        super().__init__(('127.0.0.1', 0), AdminStubHandler)
+
+    def handle_error(self, request, client_address):
+        pass    # connections reset when the app shuts down
+
+    def wait_idle(self, quiet=1.0, timeout=15.0):
+        """Wait until no chat log arrived for quiet seconds (the app's log shipper has drained)"""
+        deadline = time.monotonic() + timeout
+        last = -1
+        while self.received != last and time.monotonic() < deadline:
+            last = self.received
+            time.sleep(quiet)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+class AdminStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            payload = json.loads(body)
+            count = len(payload['logs']) if isinstance(payload, dict) and 'logs' in payload else 1
+        except ValueError:
+            count = 0
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        with self.server.lock:
+            self.server.received += count
+        reply = b'{"success": true}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, *args):
+        pass
+
+
+def load_queries(n_per_env):
+    """env -> list of questions built from that env's FAQ file"""
+    queries = {}
+    for env, name in ENV_FILES.items():
+        with open(os.path.join(ROOT, 'data', name), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        faqs = data['faqs'] if isinstance(data, dict) and 'faqs' in data else data
+        queries[env] = make_queries(faqs, n_per_env, seed=len(env))
+    return queries
+
+
+def parse_mix(text):
+    """'stunting=0.45,ppid=0.45,other=0.1' -> [(env, weight)]"""
+    mix = []
+    for part in text.split(','):
+        env, _, weight = part.partition('=')
+        mix.append((env.strip(), float(weight or 1)))
+    return mix
+
+
+def start_server(kind, port, workers, threads, admin_url, response_cache, extra_env=None):
+    env = dict(os.environ, PORT=str(port), BIND=f'127.0.0.1:{port}', WEB_CONCURRENCY=str(workers),
+               GUNICORN_THREADS=str(threads), ADMIN_BACKEND_URL=admin_url, LOG_SPOOL_DIR='',
+               LOG_LEVEL='WARNING')
+    # all load comes from one IP and a few sessions; rate limits would measure admission control instead
+    env.setdefault('RATE_LIMIT_IP_PER_MIN', '0')
+    env.setdefault('RATE_LIMIT_SESSION_PER_MIN', '0')
+    env.update(extra_env or {})
+    if not response_cache:
+        env['RESPONSE_CACHE_SIZE'] = '0'
+    if kind == 'gunicorn':
+        cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app']
+    elif kind == 'uvicorn':
+        env['ASYNC_WORKER_THREADS'] = str(threads)
+        cmd = [sys.executable, '-m', 'uvicorn', 'asgi_app:app', '--host', '127.0.0.1', '--port', str(port),
+               '--workers', str(workers), '--log-level', 'warning']
+    else:
+        cmd = [sys.executable, 'app.py']
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def client(base_url, queries, mix, deadline, seed, samples):
+    rng = random.Random(seed)
+    envs = [env for env, _ in mix]
+    weights = [weight for _, weight in mix]
+    session = requests.Session()
+    while time.monotonic() < deadline:
+        env = rng.choices(envs, weights)[0]
+        question = rng.choice(queries.get(env) or queries['stunting'])
+        body = {'question': question, 'env': env, 'sessionId': f'load-{seed}'}
+        started = time.perf_counter()
+        try:
+            status = session.post(base_url + '/ask', json=body, timeout=30).status_code
+        except requests.RequestException:
+            status = 0
+        samples.append((env, status, time.perf_counter() - started))
+
+
+def run_load(base_url, queries, mix, concurrency, duration):
+    """[(env, http status, seconds)] of every request made; (samples, elapsed)"""
+    samples = []
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    threads = [threading.Thread(target=client, args=(base_url, queries, mix, deadline, i, samples))
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.monotonic() - started
+
+
+def summarize(samples, elapsed):
+    latencies = [seconds for _, status, seconds in samples if status == 200]
+    metrics = percentiles(latencies)
+    metrics['rps'] = len(latencies) / elapsed
+    metrics['errors'] = sum(1 for _, status, _ in samples if status != 200)
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='load-test this running server instead of starting one')
+    parser.add_argument('--server', choices=['gunicorn', 'uvicorn', 'flask'], default='gunicorn')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn/uvicorn worker processes')
+    parser.add_argument('--threads', type=int, default=1, help='threads per worker (gunicorn threads, ASYNC_WORKER_THREADS)')
+    parser.add_argument('--concurrency', type=int, default=8, help='parallel clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of measured load')
+    parser.add_argument('--warmup', type=float, default=2.0, help='seconds of unmeasured load first')
+    parser.add_argument('--env-mix', default='stunting=0.45,ppid=0.45,other=0.1')
+    parser.add_argument('--admin-delay', type=float, default=0.0, help='stub admin backend latency (s)')
+    parser.add_argument('--no-response-cache', action='store_true', help='start the app with RESPONSE_CACHE_SIZE=0')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.env_mix)
+    queries = load_queries(2000)
+    stub = proc = None
+    base_url = args.url
+    if not base_url:
+        stub = AdminStub(args.admin_delay)
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+        port = free_port()
+        proc = start_server(args.server, port, args.workers, args.threads, stub.url, not args.no_response_cache)
+        base_url = f'http://127.0.0.1:{port}'
+        wait_ready(base_url + '/', proc)
+    try:
+        if args.warmup:
+            run_load(base_url, queries, mix, args.concurrency, args.warmup)
+        if stub:
+            stub.wait_idle()
+        received_before = stub.received if stub else 0
+        samples, elapsed = run_load(base_url, queries, mix, args.concurrency, args.duration)
+        if stub:
+            stub.wait_idle()
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(30)
+        if stub is not None:
+            stub.shutdown()
+
+    records = [{'name': 'ask', 'params': {'env': 'all'}, 'metrics': summarize(samples, elapsed)}]
+    for env, _ in mix:
+        env_samples = [s for s in samples if s[0] == env]
+        if env_samples:
+            records.append({'name': 'ask', 'params': {'env': env}, 'metrics': summarize(env_samples, elapsed)})
+
+    print(f"{'env':>9} {'requests':>9} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for record in records:
+        m = record['metrics']
+        n = sum(1 for s in samples if record['params']['env'] in ('all', s[0]))
+        print(f"{record['params']['env']:>9} {n:>9} {m['rps']:>8.1f} {m.get('p50', 0) * 1000:>8.2f} "
+              f"{m.get('p95', 0) * 1000:>8.2f} {m.get('p99', 0) * 1000:>8.2f} {m['errors']:>7}")
+    if stub:
+        print(f"admin backend received {stub.received - received_before} chat logs for {len(samples)} requests")
+
+    if args.json:
+        write_results(args.json, 'load', vars(args), records)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
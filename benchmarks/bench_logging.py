@@ -0,0 +1,92 @@
+"""Throughput of NLPProcessor.get_response under different logging setups.
+
+- sync:     DEBUG records written by a plain StreamHandler in the request
+            thread (roughly what the old per-request print calls cost)
+- queue:    DEBUG records through the non-blocking queue handler
+- sampled:  queue handler, DEBUG kept for --sample-rate of the requests
+- info:     LOG_LEVEL=INFO, the hot-path debug calls are skipped
+
+Each setup runs twice: writing to a file in a temporary directory, and
+to a sink that stalls --sink-delay seconds per write (a log collector that
+is falling behind). Queries cycle through the questions of the FAQ file.
+
+    python benchmarks/bench_logging.py --requests 5000
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_setup import bind_request, configure_logging  # noqa: E402
+from nlp_processor import NLPProcessor  # noqa: E402
+
+
+class SlowSink:
+    """File wrapper whose writes block like a congested stdout pipe"""
+
+    def __init__(self, f, delay):
+        self.f = f
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return self.f.write(text)
+
+    def flush(self):
+        self.f.flush()
+
+
+def run(processor, queries, requests, sample_rate):
+    start = time.perf_counter()
+    for i in range(requests):
+        bind_request(f'bench-{i}', sample_rate)
+        processor.get_response(queries[i % len(queries)])
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--faq-file', default='faq_stunting.json')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--sample-rate', type=float, default=0.01)
+    parser.add_argument('--sink-delay', type=float, default=0.0001)
+    args = parser.parse_args()
+
+    root = logging.getLogger()
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = open(os.path.join(tmp, 'bench.log'), 'w')
+        root.handlers = []
+        processor = NLPProcessor(faq_file=args.faq_file, index_dir=None)
+        # keyword hits skip scoring; drop a word so queries reach TF-IDF too
+        queries = [' '.join(q.split()[1:]) or q for faq in processor.faqs for q in faq['questions']]
+        processor.get_response(queries[0])  # load Sastrawi before timing
+
+        print(f"{'sink':>5} {'setup':>8} {'req/s':>9} {'vs sync':>8} {'dropped':>8}")
+        for sink_name, sink in [('file', log_file), ('slow', SlowSink(log_file, args.sink_delay))]:
+            results = {}
+            sync_handler = logging.StreamHandler(sink)
+            sync_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s'))
+            root.handlers = [sync_handler]
+            root.setLevel(logging.DEBUG)
+            results['sync'] = (run(processor, queries, args.requests, 1.0), 0)
+
+            for name, level, rate in [('queue', 'DEBUG', 1.0), ('sampled', 'DEBUG', args.sample_rate),
+                                      ('info', 'INFO', 1.0)]:
+                handler = configure_logging(level=level, queue_size=10000, stream=sink)
+                throughput = run(processor, queries, args.requests, rate)
+                handler.stop()
+                results[name] = (throughput, handler.dropped)
+            root.handlers = []
+
+            base = results['sync'][0]
+            for name, (throughput, dropped) in results.items():
+                print(f"{sink_name:>5} {name:>8} {throughput:>9.0f} {throughput / base:>7.2f}x {dropped:>8}")
+        log_file.close()
+
+
+if __name__ == '__main__':
+    main()
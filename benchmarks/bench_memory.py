@@ -0,0 +1,125 @@
+"""Memory per gunicorn worker with and without preload (Linux only).
+
+Starts gunicorn with gunicorn.conf.py for each worker count, sends enough
+/ask requests that every worker has answered some, then reads RSS and PSS
+from /proc/<pid>/smaps_rollup. RSS counts shared pages in full for every
+worker; PSS splits them between the processes sharing them, so the sum of
+PSS over master + workers is the real footprint of the deployment.
+
+    python benchmarks/bench_memory.py --workers 1 4 16
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUESTIONS = [
+    'apa itu stunting',
+    'bagaimana cara mengajukan permohonan informasi',
+    'berapa lama proses keberatan',
+    'makanan bergizi untuk balita',
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def memory_kb(pid):
+    """(rss, pss) in kB from smaps_rollup"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:'):
+                values[parts[0][:-1]] = int(parts[1])
+    return values['Rss'], values['Pss']
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(p) for p in f.read().split()]
+
+
+def post(url, question):
+    body = json.dumps({'question': question, 'env': 'stunting'}).encode('utf-8')
+    req = urllib.request.Request(url, body, {'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=30) as response:
+        response.read()
+
+
+def wait_ready(url, proc, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError('gunicorn exited during startup')
+        try:
+            urllib.request.urlopen(url, timeout=2).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not become ready')
+
+
+def measure(workers, preload, requests_per_worker):
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers),
+               GUNICORN_PRELOAD='1' if preload else '0', LOG_SPOOL_DIR='',
+               ADMIN_BACKEND_URL=f'http://127.0.0.1:{free_port()}')
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base = f'http://127.0.0.1:{port}'
+        wait_ready(base + '/', proc)
+        for i in range(requests_per_worker * workers):
+            post(base + '/ask', QUESTIONS[i % len(QUESTIONS)])
+        time.sleep(0.5)
+        master = memory_kb(proc.pid)
+        per_worker = [memory_kb(pid) for pid in children(proc.pid)]
+    finally:
+        proc.terminate()
+        proc.wait(30)
+    rss = [r for r, _ in per_worker]
+    pss = [p for _, p in per_worker]
+    return {
+        'workers': len(per_worker),
+        'preload': preload,
+        'master_rss_mb': round(master[0] / 1024, 1),
+        'worker_rss_mb': round(sum(rss) / len(rss) / 1024, 1),
+        'worker_pss_mb': round(sum(pss) / len(pss) / 1024, 1),
+        'total_pss_mb': round((master[1] + sum(pss)) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests-per-worker', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    if not args.json:
+        print(f"{'workers':>7} {'preload':>7} {'master RSS':>10} {'worker RSS':>10} "
+              f"{'worker PSS':>10} {'total PSS':>10}   (MB)")
+    for workers in args.workers:
+        for preload in (False, True):
+            row = measure(workers, preload, args.requests_per_worker)
+            results.append(row)
+            if not args.json:
+                print(f"{row['workers']:>7} {str(row['preload']):>7} {row['master_rss_mb']:>10} "
+                      f"{row['worker_rss_mb']:>10} {row['worker_pss_mb']:>10} {row['total_pss_mb']:>10}")
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Micro-benchmarks of the NLPProcessor building blocks on synthetic corpora.
+
+For each corpus size (number of FAQ questions) this times:
+- preprocess_text, check_ppid_category and find_best_answer per query
+  (preprocess cache cleared first; an untimed pass has put the query
+  words in the stemming cache, as Sastrawi takes up to ~0.3 s on a
+  word it has not seen),
+- prepare_corpus and _init_ppid_categories per call (index build).
+
+Per-query operations report mean/p50/p95/p99 latency and ops_per_s; the
+build steps report mean/min over --repeat calls. With --json the results
+are written in the format of results.py, so two runs can be compared:
+
+    python benchmarks/bench_micro.py --sizes 10 1000 100000 --json micro.json
+    python benchmarks/results.py baseline.json micro.json
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nlp_processor  # noqa: E402
+from nlp_processor import NLPProcessor  # noqa: E402
+from results import percentiles, write_results  # noqa: E402
+from synthetic_faq import make_faqs, make_queries, write_faq_file  # noqa: E402
+
+QUESTIONS_PER_FAQ = 3
+
+
+def per_call(fn, args):
+    """Seconds of every fn(arg) call"""
+    samples = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def per_query_metrics(samples):
+    metrics = percentiles(samples)
+    metrics['ops_per_s'] = len(samples) / sum(samples)
+    return metrics
+
+
+def build_metrics(samples):
+    return {'mean': sum(samples) / len(samples), 'min': min(samples)}
+
+
+def bench_size(size, n_queries, repeat, data_dir):
+    faqs = make_faqs(max(1, size // QUESTIONS_PER_FAQ), questions_per_faq=QUESTIONS_PER_FAQ)
+    write_faq_file(os.path.join(data_dir, 'faq_bench.json'), faqs)
+    processor = NLPProcessor(faq_file='faq_bench.json', index_dir=None, data_dir=data_dir)
+    queries = list(dict.fromkeys(make_queries(processor.faqs, n_queries)))
+    results = {}
+    for query in queries:
+        processor.preprocess_text(query)
+
+    nlp_processor.preprocess_cache.clear()
+    results['preprocess_text'] = per_query_metrics(per_call(processor.preprocess_text, queries))
+    results['check_ppid_category'] = per_query_metrics(per_call(processor.check_ppid_category, queries))
+    nlp_processor.preprocess_cache.clear()
+    results['find_best_answer'] = per_query_metrics(per_call(processor.find_best_answer, queries))
+
+    def prepare_corpus(_):
+        nlp_processor.preprocess_cache.clear()
+        processor.prepare_corpus()
+
+    results['prepare_corpus'] = build_metrics(per_call(prepare_corpus, range(repeat)))
+    results['_init_ppid_categories'] = build_metrics(
+        per_call(lambda _: processor._init_ppid_categories(), range(repeat)))
+    return len(processor.processed_questions), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000, 100000],
+                        help='corpus sizes in questions')
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3, help='calls of each build step')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    print(f"{'questions':>9} {'operation':<22} {'mean ms':>9} {'p50/min':>8} {'p99 ms':>8} {'ops/s':>9}")
+    records = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        for size in args.sizes:
+            n_rows, results = bench_size(size, args.queries, args.repeat, data_dir)
+            for name, metrics in results.items():
+                records.append({'name': name, 'params': {'questions': size}, 'metrics': metrics})
+                p50 = metrics.get('p50', metrics.get('min'))
+                p99 = metrics.get('p99', metrics['mean'])
+                ops = metrics.get('ops_per_s', 1 / metrics['mean'])
+                print(f"{n_rows:>9} {name:<22} {metrics['mean'] * 1000:>9.3f} {p50 * 1000:>8.3f} "
+                      f"{p99 * 1000:>8.3f} {ops:>9.0f}")
+
+    if args.json:
+        write_results(args.json, 'micro', vars(args), records)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Question throughput of the scoring pool by number of worker processes.
+
+Answers distinct questions (from data/faq_*.json, as is, with typos or
+unrelated words; see synthetic_faq.make_queries) as fast as possible from
+--threads threads of this process, once with the processors in this
+process (the GIL limits that to about one core) and once through a
+ScoringPool for every --processes count. Each configuration gets questions
+no other configuration asked, so every run starts with cold text caches.
+
+Reports questions per second, speedup over in-process and scaling
+efficiency (speedup / processes; 1.0 is linear). Speedup is bounded by the
+cores of the machine (printed). --json writes the results in the format of
+results.py.
+
+    python benchmarks/bench_pool.py --processes 1 2 4 8 --questions 2000 --json pool.json
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_load import ENV_FILES  # noqa: E402
+from bench_memory import ROOT  # noqa: E402
+from results import write_results  # noqa: E402
+from synthetic_faq import make_queries  # noqa: E402
+from faq_registry import FAQRegistry  # noqa: E402
+from scoring_pool import ScoringPool, PooledProcessor  # noqa: E402
+
+ENV_FAQ_MAP = dict(ENV_FILES)
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+
+def question_slices(n_slices, per_slice):
+    """n_slices lists of (env, question), no question repeated across lists"""
+    queries = {}
+    for env, name in ENV_FAQ_MAP.items():
+        with open(os.path.join(ROOT, 'data', name), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        faqs = data['faqs'] if isinstance(data, dict) and 'faqs' in data else data
+        queries[env] = list(dict.fromkeys(make_queries(faqs, 3 * n_slices * per_slice, seed=len(env))))
+    pairs = [pair for pairs in zip(*([(env, q) for q in qs] for env, qs in queries.items())) for pair in pairs]
+    return [pairs[i * per_slice:(i + 1) * per_slice] for i in range(n_slices)]
+
+
+def run(backend_for, questions, threads):
+    """Answer questions from threads threads; returns questions per second"""
+    position = iter(range(len(questions)))
+    lock = threading.Lock()
+
+    def work():
+        while True:
+            with lock:
+                i = next(position, None)
+            if i is None:
+                return
+            env, question = questions[i]
+            backend_for(env).get_response(question, env=env)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return len(questions) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--questions', type=int, default=1000, help='questions per configuration')
+    parser.add_argument('--threads', type=int, help='client threads (default: 2 x processes)')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    registry = FAQRegistry(ENV_FAQ_MAP)
+    registry.warm_up()
+    slices = question_slices(len(args.processes) + 1, args.questions)
+    print(f"cores: {os.cpu_count()}")
+    print(f"{'backend':>12} {'threads':>8} {'q/s':>9} {'speedup':>8} {'efficiency':>11}")
+
+    threads = args.threads or 2
+    base = run(registry.get, slices[0], threads)
+    print(f"{'in-process':>12} {threads:>8} {base:>9.1f} {1.0:>8.2f} {'':>11}")
+    records = [{'name': 'answer', 'params': {'backend': 'in-process', 'processes': 0, 'threads': threads},
+                'metrics': {'ops_per_s': base}}]
+
+    for n, questions in zip(args.processes, slices[1:]):
+        pool = ScoringPool(ENV_FAQ_MAP, processes=n, health_interval=60)
+        pool.start()
+        deadline = time.monotonic() + 120
+        while pool.stats()['alive'] < n and time.monotonic() < deadline:
+            time.sleep(0.05)
+        threads = args.threads or 2 * n
+        try:
+            qps = run(lambda env: PooledProcessor(pool, registry.get(env)), questions, threads)
+            stats = pool.stats()
+        finally:
+            pool.stop()
+        speedup = qps / base
+        print(f"{f'pool x{n}':>12} {threads:>8} {qps:>9.1f} {speedup:>8.2f} {speedup / n:>11.2f}"
+              + (f"   ({stats['fallbacks']} answered in-process)" if stats['fallbacks'] else ''))
+        records.append({'name': 'answer', 'params': {'backend': 'pool', 'processes': n, 'threads': threads},
+                        'metrics': {'ops_per_s': qps, 'speedup': speedup, 'efficiency': speedup / n}})
+
+    if args.json:
+        write_results(args.json, 'pool', vars(args), records)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Inverted-index prefilter in find_best_answer vs. scoring every question.
+
+For synthetic corpora of increasing size, times find_best_answer (which
+scores only questions sharing a term with the query unless nothing reaches
+the threshold) against a full scan through score_questions, checks both
+pick the same FAQ with the same score, and reports the average share of
+questions that were candidates.
+
+    python benchmarks/bench_retrieval.py --sizes 1000 10000 50000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlp_processor import NLPProcessor  # noqa: E402
+from synthetic_faq import make_faqs, make_queries, write_faq_file  # noqa: E402
+
+
+def full_scan(processor, question):
+    """find_best_answer without the prefilter"""
+    scores = processor.score_questions([processor.preprocess_text(question)])[0]
+    idx = int(np.argmax(scores))
+    score = float(scores[idx])
+    return (processor.question_to_faq[idx] if score >= processor.match_threshold else None), score
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--queries', type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"{'questions':>9} {'candidates':>10} {'full q/s':>9} {'prefilter q/s':>13} {'speedup':>8} identical")
+    with tempfile.TemporaryDirectory() as data_dir:
+        for size in args.sizes:
+            faqs = make_faqs(size)
+            write_faq_file(os.path.join(data_dir, 'faq_bench.json'), faqs)
+            with contextlib.redirect_stdout(io.StringIO()):
+                processor = NLPProcessor(faq_file='faq_bench.json', index_dir=None, data_dir=data_dir)
+                queries = make_queries(processor.faqs, args.queries)
+                shares = [len(processor.score_candidates(processor.preprocess_text(q))[0]) for q in queries]
+                full, t_full = timed(lambda q: full_scan(processor, q), queries)
+                pref, t_pref = timed(processor.find_best_answer, queries)
+            n_rows = len(processor.processed_questions)
+            same = all(a[0] is b[0] and a[1] == b[1] for a, b in zip(full, pref))
+            print(f"{n_rows:>9} {np.mean(shares) / n_rows:>9.1%} {len(queries) / t_full:>9.0f} "
+                  f"{len(queries) / t_pref:>13.0f} {t_full / t_pref:>7.2f}x {same}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Latency and accuracy of the retrieval engines (scorers.py) side by side.
+
+For data/faq_ppid.json, data/faq_stunting.json and synthetic corpora of
+--sizes questions, every engine answers the same labeled queries (see
+synthetic_faq.make_labeled_queries: corpus questions as is, with a typo,
+with a word left out, and unrelated text that should not be answered)
+through find_best_answer, once without and once with spelling correction
+(spelling.py). Keyword categories (check_ppid_category) are not involved:
+they answer before any engine is asked.
+
+Queries are preprocessed once before timing, so the latencies are the
+engines' own (preprocessing is the same for all of them). Reports the
+engine build time, p50/p99 latency per query and p50 of the typo queries,
+accuracy overall and per query kind (right FAQ, or no answer for unrelated
+text) and how often the engines agree with the first one. --json writes
+the results in the format of results.py.
+
+    python benchmarks/bench_scorers.py --sizes 10000 100000 --queries 1000 --json scorers.json
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlp_processor import NLPProcessor  # noqa: E402
+from results import percentiles, write_results  # noqa: E402
+from scorers import SCORERS  # noqa: E402
+from synthetic_faq import DATA_DIR, make_faqs, make_labeled_queries, write_faq_file  # noqa: E402
+
+KINDS = ('exact', 'typo', 'drop', 'unrelated')
+
+
+def evaluate(processor, engine, queries, spelling_index):
+    """Answers and metrics of engine for [(kind, query, expected id)]"""
+    processor.scorer_name = engine
+    processor.spelling_index = spelling_index
+    started = time.perf_counter()
+    processor.scorer
+    build = time.perf_counter() - started
+    answers = []
+    latencies = []
+    for _, query, _ in queries:
+        started = time.perf_counter()
+        faq, _ = processor.find_best_answer(query)
+        latencies.append(time.perf_counter() - started)
+        answers.append(faq.get('id') if faq else None)
+    metrics = percentiles(latencies)
+    metrics['build'] = build
+    correct = [answer == expected for answer, (_, _, expected) in zip(answers, queries)]
+    metrics['accuracy'] = sum(correct) / len(correct)
+    for kind in KINDS:
+        hits = [ok for ok, (k, _, _) in zip(correct, queries) if k == kind]
+        if hits:
+            metrics[f'accuracy_{kind}'] = sum(hits) / len(hits)
+    typo = [latency for latency, (k, _, _) in zip(latencies, queries) if k == 'typo']
+    if typo:
+        metrics['p50_typo'] = percentiles(typo)['p50']
+    return answers, metrics
+
+
+def bench_corpus(processor, n_queries, engines):
+    """[(engine, spelling, metrics)] for one corpus"""
+    queries = make_labeled_queries(processor.faqs, n_queries)
+    if processor.spelling_index is None:
+        processor._build_spelling_index()
+    spelling_index = processor.spelling_index
+    for _, query, _ in queries:
+        processor.preprocess_text(query)
+        processor.preprocess_text(spelling_index.correct(query.lower()))
+    results = []
+    reference = None
+    for engine in engines:
+        for spelling in (False, True):
+            answers, metrics = evaluate(processor, engine, queries, spelling_index if spelling else None)
+            if reference is None:
+                reference = answers
+            metrics['agreement'] = sum(a == b for a, b in zip(answers, reference)) / len(answers)
+            results.append((engine, spelling, metrics))
+    processor.spelling_index = spelling_index
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='*', default=[10000, 100000],
+                        help='synthetic corpus sizes (questions)')
+    parser.add_argument('--queries', type=int, default=1000, help='labeled queries per corpus')
+    parser.add_argument('--engines', nargs='+', default=list(SCORERS), choices=list(SCORERS))
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    records = []
+    print(f"{'corpus':>10} {'engine':>7} {'spell':>5} {'build s':>8} {'p50 ms':>7} {'p99 ms':>7} {'typo ms':>7} "
+          f"{'acc':>6} " + ' '.join(f'{kind:>9}' for kind in KINDS) + f" {'agree':>6}")
+
+    def report(corpus, processor):
+        for engine, spelling, m in bench_corpus(processor, args.queries, args.engines):
+            print(f"{corpus:>10} {engine:>7} {'on' if spelling else 'off':>5} {m['build']:>8.3f} "
+                  f"{m['p50'] * 1000:>7.3f} {m['p99'] * 1000:>7.3f} {m.get('p50_typo', 0) * 1000:>7.3f} "
+                  f"{m['accuracy']:>6.3f} " + ' '.join(f"{m.get(f'accuracy_{k}', 0):>9.3f}" for k in KINDS)
+                  + f" {m['agreement']:>6.3f}")
+            records.append({'name': 'find_best_answer',
+                            'params': {'corpus': corpus, 'engine': engine, 'spelling': spelling},
+                            'metrics': m})
+
+    for name in ('faq_ppid.json', 'faq_stunting.json'):
+        report(name.split('_')[1].split('.')[0], NLPProcessor(faq_file=name, data_dir=DATA_DIR))
+    with tempfile.TemporaryDirectory() as data_dir:
+        for size in args.sizes:
+            write_faq_file(os.path.join(data_dir, 'faq_bench.json'), make_faqs(max(1, size // 3), questions_per_faq=3))
+            processor = NLPProcessor(faq_file='faq_bench.json', index_dir=None, data_dir=data_dir)
+            report(str(len(processor.processed_questions)), processor)
+
+    if args.json:
+        write_results(args.json, 'scorers', vars(args), records)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Cold start of the server: import-time breakdown and time to first answer.
+
+1. Runs `python -X importtime -c "import app"` and sums the import time
+   per top-level package (numpy, scipy, flask, ...), so it is visible what
+   the startup path pulls in.
+2. Starts gunicorn (gunicorn.conf.py, one worker by default) --runs times,
+   each with and without the prebuilt index artifacts (INDEX_DIR=''), and
+   measures the time from launch until GET / reports nlp_ready and until
+   the first /ask is answered, plus the app's own startup breakdown
+   (startup.py).
+
+--target fails the run (exit status 1) when the median time to first
+answer with artifacts exceeds that many seconds; use it as the cold-start
+budget in CI for container autoscaling. --json writes the results in the
+format of results.py.
+
+    python index_artifact.py build
+    python benchmarks/bench_startup.py --runs 5 --target 1.5
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_memory import ROOT, free_port  # noqa: E402
+from results import write_results  # noqa: E402
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)')
+
+
+def import_breakdown():
+    """[(top-level package, seconds)] of `import app`, largest first"""
+    env = dict(os.environ, LOG_SPOOL_DIR='', LOG_LEVEL='WARNING')
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=120)
+    totals = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            package = match.group(4).split('.')[0]
+            totals[package] = totals.get(package, 0) + int(match.group(1)) / 1e6
+    return sorted(totals.items(), key=lambda item: -item[1])
+
+
+def request_json(url, body=None, timeout=2):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(url, data, {'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def cold_start(workers, index_dir, timeout=120):
+    """Seconds from launching gunicorn to ready and to the first answer, and the app's breakdown"""
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), BIND=f'127.0.0.1:{port}', WEB_CONCURRENCY=str(workers),
+               LOG_SPOOL_DIR='', LOG_LEVEL='WARNING', FAQ_WATCH_INTERVAL='0',
+               ADMIN_BACKEND_URL=f'http://127.0.0.1:{free_port()}')
+    if index_dir is not None:
+        env['INDEX_DIR'] = index_dir
+    base = f'http://127.0.0.1:{port}'
+    launched = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = launched + timeout
+        while True:
+            if proc.poll() is not None or time.perf_counter() > deadline:
+                raise RuntimeError('gunicorn did not become ready')
+            try:
+                health = request_json(base + '/')
+                if health.get('nlp_ready'):
+                    break
+            except OSError:
+                pass
+            time.sleep(0.01)
+        ready = time.perf_counter() - launched
+        request_json(base + '/ask', {'question': 'apa itu stunting', 'env': 'stunting'}, timeout=30)
+        first_answer = time.perf_counter() - launched
+        return ready, first_answer, health.get('startup') or {}
+    finally:
+        proc.terminate()
+        proc.wait(30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--target', type=float, help='max median seconds to first answer (with artifacts)')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    breakdown = import_breakdown()
+    print("import app, by top-level package (s):")
+    for package, seconds in breakdown[:12]:
+        print(f"  {package:<20} {seconds:7.3f}")
+    print(f"  {'total':<20} {sum(s for _, s in breakdown):7.3f}")
+
+    records = [{'name': 'import', 'params': {'package': package}, 'metrics': {'seconds': seconds}}
+               for package, seconds in breakdown[:12]]
+    medians = {}
+    print(f"\n{'index':>10} {'ready s':>8} {'first answer s':>15}   app breakdown (last run)")
+    for label, index_dir in (('artifacts', None), ('rebuild', '')):
+        runs = [cold_start(args.workers, index_dir) for _ in range(args.runs)]
+        ready = statistics.median(r[0] for r in runs)
+        first = statistics.median(r[1] for r in runs)
+        medians[label] = first
+        print(f"{label:>10} {ready:>8.3f} {first:>15.3f}   {runs[-1][2]}")
+        records.append({'name': 'cold_start', 'params': {'index': label, 'workers': args.workers},
+                        'metrics': {'ready': ready, 'first_answer': first}})
+
+    if args.json:
+        write_results(args.json, 'startup', vars(args), records)
+        print(f"Results written to {args.json}")
+    if args.target is not None:
+        ok = medians['artifacts'] <= args.target
+        print(f"cold-start target {args.target:.2f}s: {'met' if ok else 'MISSED'} ({medians['artifacts']:.3f}s)")
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""JSON results of benchmark runs, and a comparison of two runs.
+
+bench_micro.py and bench_load.py write their results with --json in this
+layout:
+
+    {
+      "benchmark": "micro",
+      "format": 1,
+      "created_at": "2026-10-17T10:00:00",
+      "git_commit": "3d75a7a...",
+      "environment": {"python": "3.11.4", "platform": "Linux-...", "cpus": 8},
+      "params": {...},                       # command line of the run
+      "results": [
+        {"name": "find_best_answer", "params": {"questions": 1000},
+         "metrics": {"mean": 0.00021, "p50": 0.00019, "p95": 0.0004, "p99": 0.0006}}
+      ]
+    }
+
+Times are in seconds. A result is identified by name + params; its metrics
+are lower-is-better except those in HIGHER_IS_BETTER.
+
+    python benchmarks/results.py baseline.json candidate.json --threshold 0.1
+
+prints every metric side by side and exits with status 1 when a metric got
+worse by more than the threshold (10% by default).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+FORMAT_VERSION = 1
+HIGHER_IS_BETTER = {'rps', 'ops_per_s', 'speedup', 'efficiency', 'agreement', 'accuracy', 'accuracy_exact',
+                    'accuracy_typo', 'accuracy_drop', 'accuracy_unrelated', 'answered',
+                    'answered_per_s', 'coalesced'}
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentiles(samples, points=(50, 95, 99)):
+    """{'mean', 'p50', ...} of a list of numbers (nearest-rank percentiles)"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    values = {'mean': sum(ordered) / len(ordered)}
+    for p in points:
+        rank = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+        values[f'p{p}'] = ordered[rank]
+    return values
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def write_results(path, benchmark, params, results):
+    """Write a results document (see module docstring) to path"""
+    document = {
+        'benchmark': benchmark,
+        'format': FORMAT_VERSION,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'params': params,
+        'results': results
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+        f.write('\n')
+
+
+def _keyed(document):
+    return {(r['name'], json.dumps(r.get('params', {}), sort_keys=True)): r['metrics']
+            for r in document['results']}
+
+
+def compare(baseline, candidate, threshold=0.1):
+    """Rows of (name, params, metric, old, new, relative change, regressed)"""
+    old_results = _keyed(baseline)
+    rows = []
+    for key, metrics in _keyed(candidate).items():
+        old_metrics = old_results.get(key)
+        if old_metrics is None:
+            continue
+        for metric, new in metrics.items():
+            old = old_metrics.get(metric)
+            if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or not old:
+                continue
+            change = (new - old) / abs(old)
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            rows.append((key[0], key[1], metric, old, new, change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative change counted as a regression (default 0.1)')
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding='utf-8') as f:
+        candidate = json.load(f)
+    if baseline.get('benchmark') != candidate.get('benchmark'):
+        sys.exit(f"Different benchmarks: {baseline.get('benchmark')} vs {candidate.get('benchmark')}")
+
+    rows = compare(baseline, candidate, args.threshold)
+    for name, params, metric, old, new, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<24} {params:<28} {metric:>9} {old:>12.6g} {new:>12.6g} {change:>+8.1%}{flag}")
+    regressions = sum(row[-1] for row in rows)
+    print(f"{len(rows)} metrics compared, {regressions} regressed by more than {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Synthetic FAQ corpora for benchmarks.
+
+Questions are built from the vocabulary of the real data/faq_*.json files so
+preprocessing, stemming and keyword matching see realistic Indonesian text.
+"""
+import json
+import os
+import random
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def _load_real_faqs():
+    faqs = []
+    for name in sorted(os.listdir(DATA_DIR)):
+        if name.startswith('faq_') and name.endswith('.json'):
+            with open(os.path.join(DATA_DIR, name), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            faqs.extend(data['faqs'] if isinstance(data, dict) and 'faqs' in data else data)
+    return faqs
+
+
+def _vocabulary(faqs):
+    words = []
+    for faq in faqs:
+        for q in faq.get('questions', []):
+            words.extend(w.strip('?.,!').lower() for w in q.split())
+    return sorted(set(w for w in words if w))
+
+
+def make_faqs(n_faqs, questions_per_faq=3, n_categories=None, seed=0):
+    """Return a list of n_faqs FAQ dicts in the data/faq_*.json format"""
+    rng = random.Random(seed)
+    real = _load_real_faqs()
+    vocab = _vocabulary(real)
+    n_categories = n_categories or max(5, n_faqs // 50)
+    categories = [f"kategori_{i}" for i in range(n_categories)]
+    faqs = []
+    for i in range(n_faqs):
+        questions = []
+        for _ in range(questions_per_faq):
+            length = rng.randint(3, 9)
+            questions.append(' '.join(rng.choice(vocab) for _ in range(length)) + '?')
+        faq = {
+            'id': i + 1,
+            'questions': questions,
+            'answer': rng.choice(real)['answer'],
+            'category': rng.choice(categories)
+        }
+        if rng.random() < 0.3:
+            faq['keywords'] = [' '.join(rng.choice(vocab) for _ in range(rng.randint(1, 3)))
+                               for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.1:
+            faq['links'] = [{'text': rng.choice(vocab).upper(), 'url': 'https://example.go.id/'}]
+        faqs.append(faq)
+    return faqs
+
+
+def make_queries(faqs, n_queries, seed=1):
+    """Mix of corpus questions, typo'd questions and unrelated text"""
+    rng = random.Random(seed)
+    vocab = _vocabulary(faqs)
+    queries = []
+    for _ in range(n_queries):
+        roll = rng.random()
+        q = rng.choice(rng.choice(faqs)['questions'])
+        if roll < 0.4:
+            queries.append(q)
+        elif roll < 0.8:
+            chars = list(q)
+            del chars[rng.randrange(len(chars))]
+            queries.append(''.join(chars))
+        else:
+            queries.append(' '.join(rng.choice(vocab) for _ in range(rng.randint(2, 6))))
+    return queries
+
+
+def make_labeled_queries(faqs, n_queries, seed=1):
+    """[(kind, query, id of the FAQ it should be answered with or None)] for accuracy checks.
+
+    kind is 'exact' (a corpus question), 'typo' (one character deleted),
+    'drop' (one word left out) or 'unrelated' (random corpus words, which
+    should not be answered).
+    """
+    rng = random.Random(seed)
+    vocab = _vocabulary(faqs)
+    faqs = [faq for faq in faqs if faq.get('questions')]
+    queries = []
+    for _ in range(n_queries):
+        roll = rng.random()
+        faq = rng.choice(faqs)
+        q = rng.choice(faq['questions'])
+        words = q.split()
+        if roll < 0.3:
+            queries.append(('exact', q, faq['id']))
+        elif roll < 0.6:
+            chars = list(q)
+            del chars[rng.randrange(len(chars))]
+            queries.append(('typo', ''.join(chars), faq['id']))
+        elif roll < 0.8 and len(words) > 2:
+            del words[rng.randrange(len(words))]
+            queries.append(('drop', ' '.join(words), faq['id']))
+        else:
+            queries.append(('unrelated', ' '.join(rng.choice(vocab) for _ in range(rng.randint(2, 6))), None))
+    return queries
+
+
+def write_faq_file(path, faqs):
+    """Write faqs in the same layout as data/faq_*.json"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(faqs, f, ensure_ascii=False, indent=2)
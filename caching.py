@@ -0,0 +1,285 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Small thread-safe LRU cache with hit/miss/eviction counters.
+
+    Used for the stemming and preprocessing caches in nlp_processor; the
+    counters are exposed through stats() so the sizes can be tuned. With a
+    ttl (seconds) entries older than that count as misses and are dropped.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = float(ttl) if ttl else None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for key (and mark it recently used)"""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if self.ttl is not None:
+                expires, value = value
+                if expires <= time.monotonic():
+                    del self._data[key]
+                    self.expirations += 1
+                    self.misses += 1
+                    return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entries"""
+        if self.maxsize == 0:
+            return
+        if self.ttl is not None:
+            value = (time.monotonic() + self.ttl, value)
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Counters and current size as a plain dict"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; callers with the same key share its outcome.
+
+    The first caller of do(key, ...) runs fn; callers arriving with the
+    same key while it runs wait for it and get the same result (or the same
+    exception) instead of computing it again. Waiting is on a
+    threading.Event, so it works for worker threads of gunicorn and for the
+    executor threads of the ASGI app alike. A caller that has waited
+    timeout seconds (None = no limit) stops waiting and runs fn itself, so
+    a slow or hung first call cannot hold every waiting thread with it.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.max_waiters = 0
+
+    def do(self, key, fn, *args):
+        """(fn(*args), shared): shared is True when another caller's run of fn produced the result"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                leader = True
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, flight.waiters)
+                leader = False
+        if not leader:
+            if not flight.done.wait(self.timeout):
+                with self._lock:
+                    self.timeouts += 1
+                return fn(*args), False
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        try:
+            flight.result = fn(*args)
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+    def __len__(self):
+        return len(self._flights)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._flights),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'errors': self.errors,
+                'timeouts': self.timeouts,
+                'max_waiters': self.max_waiters
+            }
+
+
+class ResponseCache:
+    """Cache of final /ask response dicts.
+
+    Keys are (env, index generation, normalized question): a reloaded or
+    edited index gets a new generation, so its answers never come from the
+    old one. Responses only depend on the lowercased question, and the
+    cached path answers the whitespace-normalized form so every spelling
+    that shares a key gets the same answer. Each entry remembers how long
+    it took to compute; hits add that to saved_seconds.
+
+    Concurrent misses of the same key are coalesced (unless coalesce is
+    False): one request computes the answer, the others wait for it and
+    count as coalesced; the time they did not spend computing is added to
+    saved_seconds. This holds with the cache disabled too (maxsize 0). A
+    request waits at most coalesce_timeout seconds before computing the
+    answer itself.
+
+    Cached dicts are shared between requests and must not be modified.
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600, coalesce=True, coalesce_timeout=None):
+        self._cache = LRUCache(maxsize, ttl=ttl)
+        self._flights = SingleFlight(coalesce_timeout) if coalesce else None
+        self._lock = threading.Lock()
+        self.saved_seconds = 0.0
+        self.compute_seconds = 0.0
+        self.computed = 0
+
+    @staticmethod
+    def normalize(question):
+        return ' '.join(question.lower().split())
+
+    def _key(self, processor, env, question):
+        return (env or '').lower(), processor.generation, self.normalize(question)
+
+    def _record(self, key, response, cost):
+        self._cache.put(key, (response, cost))
+
+    def get_response(self, processor, question, env=None):
+        """processor.get_response(question, env), served from the cache when possible"""
+        key = self._key(processor, env, question)
+        entry = self._cache.get(key)
+        if entry is not None:
+            with self._lock:
+                self.saved_seconds += entry[1]
+            return entry[0]
+        if self._flights is None:
+            return self._compute(processor, key, env)[0]
+        (response, cost), shared = self._flights.do(key, self._compute, processor, key, env)
+        if shared:
+            with self._lock:
+                self.saved_seconds += cost
+        return response
+
+    def _compute(self, processor, key, env):
+        """(response, seconds) for key, recorded in the cache before concurrent callers are released"""
+        started = time.perf_counter()
+        response = processor.get_response(key[2], env=env)
+        cost = time.perf_counter() - started
+        with self._lock:
+            self.compute_seconds += cost
+            self.computed += 1
+        self._record(key, response, cost)
+        return response, cost
+
+    def get_responses(self, processor, questions, env=None):
+        """Batch version: cached answers are reused, the rest go through processor.get_responses"""
+        keys = [self._key(processor, env, q) for q in questions]
+        responses = [None] * len(questions)
+        missing = []
+        saved = 0.0
+        for i, key in enumerate(keys):
+            entry = self._cache.get(key)
+            if entry is None:
+                missing.append(i)
+            else:
+                responses[i] = entry[0]
+                saved += entry[1]
+        if missing:
+            started = time.perf_counter()
+            computed = processor.get_responses([keys[i][2] for i in missing], env=env)
+            cost = time.perf_counter() - started
+            for i, response in zip(missing, computed):
+                responses[i] = response
+                self._record(keys[i], response, cost / len(missing))
+        else:
+            cost = 0.0
+        with self._lock:
+            self.saved_seconds += saved
+            self.compute_seconds += cost
+            self.computed += len(missing)
+        return responses
+
+    def clear(self):
+        self._cache.clear()
+
+    @property
+    def coalesces(self):
+        """True when concurrent identical questions share one computation"""
+        return self._flights is not None
+
+    @property
+    def maxsize(self):
+        return self._cache.maxsize
+
+    @property
+    def coalesce_timeout(self):
+        return self._flights.timeout if self._flights is not None else None
+
+    def stats(self):
+        """LRU counters plus time spent computing and time saved by hits"""
+        stats = self._cache.stats()
+        with self._lock:
+            stats['saved_seconds'] = round(self.saved_seconds, 3)
+            stats['compute_seconds'] = round(self.compute_seconds, 3)
+            stats['avg_compute_ms'] = round(1000 * self.compute_seconds / self.computed, 3) if self.computed else 0.0
+            stats['computed'] = self.computed
+        if self._flights is not None:
+            flights = self._flights.stats()
+            stats['coalesced'] = flights['coalesced']
+            stats['in_flight'] = flights['in_flight']
+            stats['coalesce_timeouts'] = flights['timeouts']
+            stats['max_waiters'] = flights['max_waiters']
+        else:
+            stats.update(coalesced=0, in_flight=0, coalesce_timeouts=0, max_waiters=0)
+        return stats
@@ -0,0 +1,412 @@
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from types import MappingProxyType
+from nlp_processor import NLPProcessor
+import index_artifact
+from caching import SingleFlight
+from static_responses import build_static_responses
+
+logger = logging.getLogger(__name__)
+
+
+def discover_envs(data_dir):
+    """{env: file name} of every faq_<env>.json in data_dir"""
+    try:
+        names = sorted(os.listdir(data_dir))
+    except OSError:
+        return {}
+    return {name[4:-5].lower(): name for name in names
+            if name.startswith('faq_') and name.endswith('.json') and len(name) > 9}
+
+
+class FAQRegistry:
+    """One ready-to-query NLPProcessor per environment.
+
+    Environments come from an env -> FAQ file map, or are discovered from
+    the faq_<env>.json files of the data directory (and re-discovered by
+    the file watcher). The preloaded envs are built when the registry is
+    created; every other env is built on its first request, by one thread
+    while concurrent requests for it wait. Requests are routed to the
+    processor of their environment and never mutate a corpus themselves.
+
+    With a memory budget, loaded envs form an LRU: when the estimated size
+    of all loaded indexes (NLPProcessor.memory_estimate plus the prepared
+    read responses) exceeds the budget, the least recently used envs that
+    were not preloaded are dropped and rebuilt on their next request. A
+    rebuilt env is restored from its index artifact, which the registry
+    writes after building an env from its FAQ file; when the file did not
+    change the env keeps its generation, so cached answers stay valid.
+
+    Reloading (reload(), or the file watcher from start_watching()) builds a
+    complete new processor off to the side and then publishes it by replacing
+    the env -> processor mapping in one assignment. A request that already
+    holds the old processor finishes on it; later requests get the new one.
+    Each published processor carries a generation number and the
+    pre-serialized /faqs, /categories and /stats bodies of that generation
+    (see static_responses.py).
+    """
+
+    def __init__(self, env_faq_map=None, default_env='stunting', env_scorers=None, preload=None,
+                 memory_budget=None, save_artifacts=True, **processor_kwargs):
+        """Build a processor for each preloaded environment.
+
+        Parameters:
+        - env_faq_map: dict of env name -> filename under ./data (None =
+          discover faq_<env>.json files in the data directory)
+        - default_env: env used for unknown/missing env values
+        - env_scorers: dict of env name -> retrieval engine (see scorers.py)
+          for envs that do not use the processors' default
+        - preload: envs built up front and never evicted (None = every env
+          known now; envs discovered later are built on their first request)
+        - memory_budget: estimated bytes of loaded indexes before the least
+          recently used envs are evicted (None or 0 = no limit)
+        - save_artifacts: write an index artifact for envs built from their
+          FAQ file, so that a rebuild after eviction only loads it
+        - processor_kwargs: extra arguments passed to every NLPProcessor
+        """
+        self.data_dir = processor_kwargs.get('data_dir') or os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'data')
+        self.discover = env_faq_map is None
+        self.env_faq_map = MappingProxyType(discover_envs(self.data_dir) if self.discover else dict(env_faq_map))
+        self.default_env = default_env
+        self.env_scorers = dict(env_scorers or {})
+        self.pinned = set(self.env_faq_map) if preload is None else {env.lower() for env in preload}
+        self.memory_budget = int(memory_budget or 0)
+        self.save_artifacts = bool(save_artifacts)
+        self.processor_kwargs = dict(processor_kwargs)
+        self.generation = 0
+        self.evictions = 0
+        self._loads = SingleFlight()
+        self._last_used = {}
+        self._reload_lock = threading.Lock()
+        self._watch_lock = threading.Lock()
+        self._watch_thread = None
+        self._watch_pid = None
+        self._watch_stop = threading.Event()
+        self._signatures = {}
+        self._info = {}
+        self._processors = MappingProxyType({})
+        for env in self.env_faq_map:
+            self._env_info(env)
+        self._reload([env for env in self.env_faq_map if env in self.pinned], only_changed=False)
+
+    def faq_path(self, env):
+        return os.path.join(self.data_dir, self.env_faq_map[env])
+
+    def _file_signature(self, env):
+        try:
+            st = os.stat(self.faq_path(env))
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _env_info(self, env):
+        return self._info.setdefault(env, {'loaded': False, 'pinned': env in self.pinned, 'generation': 0,
+                                           'faq_count': 0, 'build_seconds': None, 'update_seconds': None,
+                                           'loaded_at': None, 'source': None, 'loads': 0, 'evictions': 0,
+                                           'memory_bytes': 0, 'last_error': None})
+
+    def _build(self, env):
+        """Build a processor for env; returns (processor, seconds) or raises"""
+        started = time.perf_counter()
+        kwargs = dict(self.processor_kwargs)
+        if env in self.env_scorers:
+            kwargs['scorer'] = self.env_scorers[env]
+        processor = NLPProcessor(faq_file=self.env_faq_map[env], **kwargs)
+        # build the retrieval engine here rather than on the first request
+        processor.scorer
+        processor.static_responses = build_static_responses(processor, env)
+        seconds = time.perf_counter() - started
+        if self.save_artifacts and processor.index_source == 'built' and processor.index_dir and processor.faqs:
+            directory = index_artifact.artifact_path(processor.index_dir, processor.faq_file)
+            try:
+                os.makedirs(processor.index_dir, exist_ok=True)
+                index_artifact.save_index(processor, directory)
+            except Exception as e:
+                logger.warning(f"Failed to save index artifact {directory}: {e}")
+        return processor, seconds
+
+    @staticmethod
+    def _memory(processor):
+        """Estimated bytes of processor's index and prepared read responses, as env info fields"""
+        memory = processor.memory_estimate()
+        responses = sum(len(body) for prepared in processor.static_responses.values()
+                        for body, _ in prepared.variants.values())
+        return {'memory_bytes': memory['total_bytes'] + responses, 'matrix_bytes': memory['matrix_bytes'],
+                'string_bytes': memory['string_bytes'], 'response_bytes': responses}
+
+    def _evict_over_budget(self, processors, keep):
+        """Drop least recently used envs from processors (not keep, not pinned) until within the budget"""
+        if not self.memory_budget:
+            return []
+        total = sum(self._info[env]['memory_bytes'] for env in processors)
+        # an env whose last reload failed keeps serving its previous FAQ data; rebuilding it would fail
+        candidates = sorted((env for env in processors if env not in keep and env not in self.pinned
+                             and not self._info[env]['last_error']),
+                            key=lambda env: self._last_used.get(env, 0.0))
+        evicted = []
+        for env in candidates:
+            if total <= self.memory_budget:
+                break
+            del processors[env]
+            total -= self._info[env]['memory_bytes']
+            self._info[env].update(loaded=False, evictions=self._info[env]['evictions'] + 1)
+            self.evictions += 1
+            evicted.append(env)
+        if evicted:
+            logger.info(f"Evicted FAQ index of {', '.join(evicted)} to stay within the memory budget "
+                        f"({total / 2**20:.1f} of {self.memory_budget / 2**20:.1f} MiB in use)")
+        return evicted
+
+    def _reload(self, envs, only_changed):
+        """Rebuild envs and publish them; returns the list of envs swapped in"""
+        with self._reload_lock:
+            processors = dict(self._processors)
+            swapped = []
+            for env in envs:
+                if env not in self.env_faq_map:
+                    continue
+                signature = self._file_signature(env)
+                if only_changed and env in self._signatures and signature == self._signatures[env]:
+                    continue
+                # remember what we tried, so a broken file is not rebuilt on every poll
+                self._signatures[env] = signature
+                info = self._env_info(env)
+                try:
+                    processor, seconds = self._build(env)
+                except Exception as e:
+                    logger.error(f"Failed to build NLP processor for env '{env}': {e}")
+                    info['last_error'] = str(e)
+                    continue
+                if not processor.faqs and env in processors and processors[env].faqs:
+                    # load_faq_data swallows bad JSON and yields an empty corpus; keep serving the old one
+                    logger.error(f"Reload of env '{env}' produced no FAQs, keeping generation {info['generation']}")
+                    info['last_error'] = 'reload produced no FAQs'
+                    continue
+                if env not in processors and info['generation'] and info.get('faq_hash') == processor.faq_hash:
+                    # evicted earlier and rebuilt from the same file: same answers, same generation
+                    processor.generation = info['generation']
+                else:
+                    self.generation += 1
+                    processor.generation = self.generation
+                processors[env] = processor
+                info.update(loaded=True, generation=processor.generation, faq_count=len(processor.faqs),
+                            faq_hash=processor.faq_hash, scorer=processor.scorer_name,
+                            build_seconds=round(seconds, 3), source=processor.index_source,
+                            loads=info['loads'] + 1, loaded_at=datetime.now().isoformat(), last_error=None,
+                            **self._memory(processor))
+                self._last_used[env] = time.monotonic()
+                swapped.append(env)
+            if swapped:
+                self._evict_over_budget(processors, keep=set(swapped))
+                # single reference swap: readers see either the old or the new mapping
+                self._processors = MappingProxyType(processors)
+            return swapped
+
+    def reload(self, env=None):
+        """Rebuild env (or every loaded env) from its FAQ file and swap it in; returns the swapped envs"""
+        envs = [self.resolve_env(env)] if env else list(self._processors)
+        return self._reload(envs, only_changed=False)
+
+    def reload_async(self, env=None):
+        """reload() in a background thread"""
+        thread = threading.Thread(target=self.reload, args=(env,), name='faq-reload', daemon=True)
+        thread.start()
+        return thread
+
+    def update_faqs(self, env, upserts=(), deletes=(), persist=True):
+        """Apply FAQ upserts/deletes to env incrementally and swap the result in.
+
+        The change is applied to a copy of the current processor (see
+        NLPProcessor.apply_faq_changes), so requests keep using the old
+        snapshot until the swap. With persist the FAQ file is rewritten too
+        and its new signature recorded, so the file watcher does not rebuild
+        the env again; other workers pick the change up from the file.
+
+        Returns the summary of apply_faq_changes plus the new generation.
+        """
+        env = self.resolve_env(env)
+        self.get(env)
+        with self._reload_lock:
+            current = self._processors.get(env)
+            if current is None:
+                raise LookupError(f"No FAQ index loaded for env '{env}'")
+            started = time.perf_counter()
+            processor = copy.copy(current)
+            summary = processor.apply_faq_changes(upserts, deletes)
+            if not summary['upserted'] and not summary['deleted']:
+                summary['generation'] = current.generation
+                return summary
+            if persist:
+                self._signatures[env] = self._write_faqs(env, processor)
+            processor.scorer
+            processor.static_responses = build_static_responses(processor, env)
+            seconds = time.perf_counter() - started
+
+            self.generation += 1
+            processor.generation = self.generation
+            processors = dict(self._processors)
+            processors[env] = processor
+            self._info[env].update(generation=self.generation, faq_count=len(processor.faqs),
+                                   faq_hash=processor.faq_hash, update_seconds=round(seconds, 4),
+                                   loaded_at=datetime.now().isoformat(), last_error=None,
+                                   **self._memory(processor))
+            self._evict_over_budget(processors, keep={env})
+            self._processors = MappingProxyType(processors)
+        summary['generation'] = processor.generation
+        summary['seconds'] = round(seconds, 4)
+        return summary
+
+    def _write_faqs(self, env, processor):
+        """Atomically rewrite env's FAQ file with processor.faqs; returns its new signature"""
+        path = self.faq_path(env)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        # keep the file's layout: either a bare list or {"faqs": [...], ...}
+        if isinstance(data, dict):
+            data = dict(data, faqs=processor.faqs)
+        else:
+            data = processor.faqs
+        raw = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        processor.faq_hash = index_artifact.content_hash(raw)
+        return self._file_signature(env)
+
+    def check_for_changes(self):
+        """Pick up added/removed FAQ files and reload every loaded env whose file changed; returns the swapped envs"""
+        if self.discover:
+            self._rediscover()
+        changed = [env for env in self._processors if self._file_signature(env) != self._signatures.get(env)]
+        if not changed:
+            return []
+        return self._reload(changed, only_changed=True)
+
+    def _rediscover(self):
+        """Update env_faq_map from the data directory; returns the added envs"""
+        found = discover_envs(self.data_dir)
+        if found == dict(self.env_faq_map):
+            return []
+        with self._reload_lock:
+            added = [env for env in found if env not in self.env_faq_map]
+            removed = [env for env in self.env_faq_map if env not in found]
+            self.env_faq_map = MappingProxyType(found)
+            for env in added:
+                self._env_info(env)
+            for env in removed:
+                self.pinned.discard(env)
+                for state in (self._info, self._signatures, self._last_used):
+                    state.pop(env, None)
+            if any(env in self._processors for env in removed):
+                self._processors = MappingProxyType({env: p for env, p in self._processors.items() if env in found})
+        if added or removed:
+            logger.info(f"FAQ environments changed: added {added or 'none'}, removed {removed or 'none'}")
+        return added
+
+    def start_watching(self, interval=5.0):
+        """Poll the FAQ files every interval seconds in this process (idempotent)"""
+        if interval <= 0:
+            return
+        if self._watch_thread is not None and self._watch_pid == os.getpid() and self._watch_thread.is_alive():
+            return
+        with self._watch_lock:
+            if self._watch_thread is not None and self._watch_pid == os.getpid() and self._watch_thread.is_alive():
+                return
+            self._watch_pid = os.getpid()
+            self._watch_stop.clear()
+            self._watch_thread = threading.Thread(target=self._watch, args=(interval,),
+                                                  name='faq-watcher', daemon=True)
+            self._watch_thread.start()
+
+    def stop_watching(self):
+        self._watch_stop.set()
+
+    def _watch(self, interval):
+        while not self._watch_stop.wait(interval):
+            try:
+                swapped = self.check_for_changes()
+                if swapped:
+                    logger.info(f"Reloaded FAQ data for: {', '.join(swapped)}")
+            except Exception as e:
+                logger.error(f"FAQ file watcher failed: {e}")
+
+    def resolve_env(self, env):
+        """Map a requested env to a known env (unknown envs use the default)"""
+        env = (env or self.default_env).lower()
+        return env if env in self.env_faq_map else self.default_env
+
+    def get(self, env, load=True):
+        """Return the processor for env (built now if it is not loaded and load is set), or None if it failed to load"""
+        env = self.resolve_env(env)
+        processor = self._processors.get(env)
+        if processor is None and load and env in self.env_faq_map:
+            processor = self._loads.do(env, self._load, env)[0]
+        if processor is not None:
+            self._last_used[env] = time.monotonic()
+        return processor
+
+    def _load(self, env):
+        """Build env on its first use; None when it cannot be built"""
+        processor = self._processors.get(env)
+        if processor is not None:
+            return processor
+        info = self._env_info(env)
+        if info['last_error'] and self._signatures.get(env) == self._file_signature(env):
+            # the file that failed has not changed since; do not rebuild it on every request
+            return None
+        self._reload([env], only_changed=False)
+        return self._processors.get(env)
+
+    def loaded(self):
+        """env -> processor of every loaded environment (not counted as a use of them)"""
+        return dict(self._processors)
+
+    def envs(self):
+        """List of configured environment names"""
+        return list(self.env_faq_map.keys())
+
+    def warm_up(self, question='apa itu'):
+        """Load lazily created state (Sastrawi dictionaries etc.) by answering one question per env.
+
+        Called in the gunicorn master before forking so the workers share these
+        pages copy-on-write instead of each building its own copy.
+        """
+        for processor in self._processors.values():
+            processor.get_response(question)
+            # keyword hits skip TF-IDF scoring; build its lazily prepared matrices too
+            processor.find_best_answer(question)
+
+    def is_ready(self):
+        """True when every preloaded environment has a processor (the others load on first use)"""
+        processors = self._processors
+        return bool(self.env_faq_map) and all(env in processors for env in self.pinned if env in self.env_faq_map)
+
+    def status(self):
+        """Generation, FAQ count, load time and estimated memory per env, plus the memory budget"""
+        now = time.monotonic()
+        envs = {}
+        for env, info in list(self._info.items()):
+            envs[env] = dict(info)
+            last_used = self._last_used.get(env)
+            envs[env]['idle_seconds'] = round(now - last_used, 1) if last_used is not None else None
+        return {
+            'generation': self.generation,
+            'loaded': len(self._processors),
+            'known': len(self.env_faq_map),
+            'memory_bytes': sum(info['memory_bytes'] for env, info in envs.items() if info['loaded']),
+            'memory_budget': self.memory_budget,
+            'evictions': self.evictions,
+            'envs': envs
+        }
@@ -0,0 +1,36 @@
+"""Gunicorn settings for multi-worker mode.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+With preload_app (the default here) app.py is imported once in the master:
+the FAQ indexes, Sastrawi dictionaries and keyword matchers are built there
+and the forked workers share those pages copy-on-write. gc.freeze() moves
+everything allocated so far out of the garbage collector's reach, so
+collections in the workers don't write to (and thereby copy) the shared
+objects. Index artifacts (see index_artifact.py) are memory-mapped and live
+in the page cache, so they are shared with or without preload.
+
+Set GUNICORN_PRELOAD=0 to import the app in every worker instead.
+"""
+import gc
+import os
+
+bind = os.environ.get('BIND', f"127.0.0.1:{os.environ.get('PORT', 5000)}")
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1').lower() not in ('0', 'false', 'no')
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    import app
+    import startup
+    with startup.phase('warm_up'):
+        if app.faq_registry is not None:
+            app.faq_registry.warm_up()
+        gc.collect()
+        gc.freeze()
+    startup.mark_ready()
+
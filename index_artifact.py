@@ -0,0 +1,161 @@
+"""Prebuilt index artifacts for fast cold start.
+
+An artifact holds everything NLPProcessor derives from one data/faq_*.json
+file: the preprocessed questions, the fitted TF-IDF vocabulary/IDF, the
+sparse TF-IDF matrix and the keyword/category maps. It is stored as a
+directory per FAQ file:
+
+    index/faq_ppid/
+        meta.json          version, source hash, questions, vocabulary, maps
+        idf.npy            IDF weights
+        tfidf_data.npy     CSR arrays of the TF-IDF matrix
+        tfidf_indices.npy
+        tfidf_indptr.npy
+
+The .npy files are opened memory-mapped, so processes loading the same
+artifact share its pages. An artifact is only used when the SHA-256 of the
+source JSON matches; otherwise NLPProcessor rebuilds in memory.
+
+Build all artifacts offline with:
+
+    python index_artifact.py build [--data-dir data] [--index-dir index]
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from tfidf import TfidfModel
+
+ARTIFACT_VERSION = 1
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INDEX_DIR = os.path.join(BASE_DIR, 'index')
+
+_ARRAYS = ('idf', 'tfidf_data', 'tfidf_indices', 'tfidf_indptr')
+
+
+def content_hash(raw_bytes):
+    """SHA-256 hex digest of the raw FAQ JSON"""
+    return hashlib.sha256(raw_bytes).hexdigest()
+
+
+def artifact_path(index_dir, faq_file):
+    """Artifact directory for a FAQ file name, e.g. index/faq_ppid"""
+    return os.path.join(index_dir, os.path.splitext(os.path.basename(faq_file))[0])
+
+
+def save_index(processor, directory):
+    """Write the prepared index of processor to directory (atomically replaced).
+
+    Several processes may save the same artifact at once (lazily loaded
+    envs, see faq_registry.py): each writes its own temporary directory and
+    a writer that finds the target replaced under it leaves it be.
+    """
+    faq_pos = {id(faq): i for i, faq in enumerate(processor.faqs)}
+    vocabulary = processor.vectorizer.vocabulary_ if processor.tfidf_matrix is not None else {}
+    terms = [None] * len(vocabulary)
+    for term, col in vocabulary.items():
+        terms[col] = term
+    meta = {
+        'version': ARTIFACT_VERSION,
+        'source_file': processor.faq_file,
+        'source_hash': processor.faq_hash,
+        'processed_questions': processor.processed_questions,
+        'question_faq_index': [faq_pos[id(faq)] for faq in processor.question_to_faq],
+        'terms': terms,
+        'ppid_categories': processor.ppid_categories,
+        'keyword_faq_index': {kw: faq_pos[id(faq)] for kw, faq in processor.keyword_to_faq.items()
+                              if id(faq) in faq_pos},
+        'category_faq_index': {cat: [faq_pos[id(faq)] for faq in faqs]
+                               for cat, faqs in processor.category_faqs.items()},
+        'has_matrix': processor.tfidf_matrix is not None
+    }
+    suffix = f'{os.getpid()}-{threading.get_ident()}'
+    tmp_dir = f'{directory}.tmp-{suffix}'
+    os.makedirs(tmp_dir, exist_ok=True)
+    if processor.tfidf_matrix is not None:
+        matrix = processor.tfidf_matrix.tocsr()
+        meta['shape'] = list(matrix.shape)
+        np.save(os.path.join(tmp_dir, 'idf.npy'), np.asarray(processor.vectorizer.idf_))
+        np.save(os.path.join(tmp_dir, 'tfidf_data.npy'), matrix.data)
+        np.save(os.path.join(tmp_dir, 'tfidf_indices.npy'), matrix.indices)
+        np.save(os.path.join(tmp_dir, 'tfidf_indptr.npy'), matrix.indptr)
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    # swap the finished directory in place of the old one
+    old_dir = f'{directory}.old-{suffix}'
+    try:
+        if os.path.isdir(directory):
+            os.replace(directory, old_dir)
+        os.replace(tmp_dir, directory)
+    except OSError:
+        # another process swapped its copy in first
+        pass
+    for leftover in (tmp_dir, old_dir):
+        if os.path.isdir(leftover):
+            for name in os.listdir(leftover):
+                os.remove(os.path.join(leftover, name))
+            os.rmdir(leftover)
+
+
+def load_index(directory, expected_hash, mmap=True):
+    """Load an artifact; returns None if missing, stale or from another version"""
+    meta_path = os.path.join(directory, 'meta.json')
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != ARTIFACT_VERSION or meta.get('source_hash') != expected_hash:
+        return None
+
+    index = dict(meta)
+    index['vectorizer'] = None
+    index['tfidf_matrix'] = None
+    if meta.get('has_matrix'):
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mode) for name in _ARRAYS}
+        index['vectorizer'] = TfidfModel({term: col for col, term in enumerate(meta['terms'])}, arrays['idf'])
+        index['tfidf_matrix'] = csr_matrix(
+            (arrays['tfidf_data'], arrays['tfidf_indices'], arrays['tfidf_indptr']),
+            shape=tuple(meta['shape']), copy=False
+        )
+    return index
+
+
+def build_all(data_dir=None, index_dir=DEFAULT_INDEX_DIR):
+    """Build artifacts for every faq_*.json in data_dir"""
+    from nlp_processor import NLPProcessor
+
+    data_dir = data_dir or os.path.join(BASE_DIR, 'data')
+    built = []
+    for name in sorted(os.listdir(data_dir)):
+        if not (name.startswith('faq_') and name.endswith('.json')):
+            continue
+        processor = NLPProcessor(faq_file=name, index_dir=None, data_dir=data_dir)
+        target = artifact_path(index_dir, name)
+        save_index(processor, target)
+        print(f"Built index for {name} -> {target} ({len(processor.processed_questions)} questions)")
+        built.append(target)
+    return built
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FAQ index artifacts')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='build artifacts for data/faq_*.json')
+    build.add_argument('--data-dir', default=os.path.join(BASE_DIR, 'data'))
+    build.add_argument('--index-dir', default=os.environ.get('INDEX_DIR', DEFAULT_INDEX_DIR))
+    args = parser.parse_args()
+    if args.command == 'build':
+        os.makedirs(args.index_dir, exist_ok=True)
+        build_all(args.data_dir, args.index_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+from bisect import bisect_right
+import sys
+from fuzzywuzzy import fuzz
+from rapidfuzz import fuzz as rf_fuzz
+from rapidfuzz import process as rf_process
+import numpy as np
+
+
+class SubstringIndex:
+    """Finds which of many patterns occur inside a short text.
+
+    Patterns are hashed by their length; a text is checked by taking its
+    substrings of every pattern length it can hold and intersecting them
+    with the pattern set. Memory stays at one dict of patterns (a trie for
+    tens of thousands of FAQ questions would hold millions of nodes), and
+    questions are capped at 500 characters by the API.
+    """
+
+    def __init__(self, patterns):
+        # pattern -> lowest index it appears at
+        self._first = {}
+        for idx, pattern in enumerate(patterns):
+            if pattern:
+                self._first.setdefault(pattern, idx)
+        self._lengths = sorted({len(p) for p in self._first})
+
+    def first_match(self, text):
+        """Lowest index of a pattern contained in text, or None"""
+        size = len(text)
+        substrings = set()
+        for length in self._lengths:
+            if length > size:
+                break
+            substrings.update(text[i:i + length] for i in range(size - length + 1))
+        hits = self._first.keys() & substrings
+        if not hits:
+            return None
+        return min(self._first[h] for h in hits)
+
+
+class KeywordMatcher:
+    """Compiled form of the (category, keyword) scan in check_ppid_category.
+
+    match() returns the same entry the original nested loop would pick: the
+    first keyword, in scan order, that is a substring of the question (or
+    contains it) or whose fuzz.partial_ratio with the question exceeds its
+    threshold. Exact hits come from a SubstringIndex plus one str.find
+    over the joined keywords; only keywords that sit before the
+    first exact hit and survive two pruning stages get the (slow, pure
+    Python) fuzzywuzzy partial_ratio check.
+    """
+
+    _SEPARATOR = '\x00'
+
+    def __init__(self, entries, fuzzy_threshold=85, fuzzy_short_threshold=90):
+        """entries: list of (category, keyword) in scan order"""
+        self.entries = [(cat, kw) for cat, kw in entries if isinstance(kw, str) and kw]
+        self.keywords = [kw.lower() for _, kw in self.entries]
+        self.thresholds = np.array(
+            [fuzzy_short_threshold if len(kw) <= 4 else fuzzy_threshold for kw in self.keywords],
+            dtype=np.float64
+        )
+        self.lengths = np.array([len(kw) for kw in self.keywords], dtype=np.int32)
+
+        # exact pass: keyword in question
+        self._substrings = SubstringIndex(self.keywords)
+        # exact pass: question in keyword (one find over all keywords joined)
+        self._haystack = self._SEPARATOR.join(self.keywords)
+        self._starts = []
+        offset = 0
+        for kw in self.keywords:
+            self._starts.append(offset)
+            offset += len(kw) + 1
+
+        # fuzzy pass pruning: per-keyword character counts
+        alphabet = sorted(set(''.join(self.keywords)))
+        self._char_index = {ch: i for i, ch in enumerate(alphabet)}
+        count_dtype = np.uint8 if self.lengths.max(initial=0) < 256 else np.int32
+        self._char_counts = np.zeros((len(self.keywords), len(alphabet)), dtype=count_dtype)
+        if self.keywords:
+            # vectorized: code points of all keywords -> alphabet column, counted per row
+            points = np.frombuffer(''.join(self.keywords).encode('utf-32-le'), dtype=np.uint32)
+            alphabet_points = np.array([ord(ch) for ch in alphabet], dtype=np.uint32)
+            cols = np.searchsorted(alphabet_points, points)
+            rows = np.repeat(np.arange(len(self.keywords)), self.lengths)
+            flat = np.bincount(rows * len(alphabet) + cols, minlength=self._char_counts.size)
+            self._char_counts[:] = flat.reshape(self._char_counts.shape)
+
+    @classmethod
+    def from_categories(cls, categories, fuzzy_threshold=85, fuzzy_short_threshold=90):
+        """Build from a ppid_categories dict, keeping its iteration order"""
+        entries = []
+        for category, data in categories.items():
+            for keyword in data.get('keywords', []):
+                entries.append((category, keyword))
+        return cls(entries, fuzzy_threshold, fuzzy_short_threshold)
+
+    def memory_estimate(self):
+        """Estimated bytes held by the compiled keywords: {'matrix_bytes', 'string_bytes'}"""
+        arrays = (self.thresholds, self.lengths, self._char_counts)
+        strings = sys.getsizeof(self.keywords) + sum(sys.getsizeof(kw) for kw in self.keywords)
+        strings += sys.getsizeof(self._haystack)
+        return {'matrix_bytes': sum(a.nbytes for a in arrays), 'string_bytes': strings}
+
+    def _first_exact(self, question):
+        best = self._substrings.first_match(question)
+        if self._SEPARATOR not in question:
+            pos = self._haystack.find(question)
+            if pos != -1:
+                idx = bisect_right(self._starts, pos) - 1
+                if best is None or idx < best:
+                    best = idx
+        else:
+            for idx, kw in enumerate(self.keywords[:best]):
+                if question in kw:
+                    best = idx
+                    break
+        return best
+
+    def _fuzzy_candidates(self, question, limit):
+        """Indices below limit whose partial_ratio could exceed the threshold.
+
+        1) Character bound: partial_ratio compares the shorter string (length
+           m) with windows of the longer one, and ratio = 2*matches / (m +
+           window) <= 2*O / (m + O) where O is the multiset character overlap
+           of the two strings, so a score above t needs O >= t*m / (2 - t).
+        2) rapidfuzz's partial_ratio searches every alignment and is never
+           lower than fuzzywuzzy's block-based one, so keywords scoring below
+           the threshold there cannot match either.
+        """
+        if limit <= 0:
+            return []
+        query_counts = np.zeros(self._char_counts.shape[1], dtype=np.int32)
+        for ch in question:
+            i = self._char_index.get(ch)
+            if i is not None:
+                query_counts[i] += 1
+        overlap = np.minimum(self._char_counts[:limit], query_counts).sum(axis=1)
+        shorter = np.minimum(self.lengths[:limit], len(question))
+        t = self.thresholds[:limit] / 100.0
+        candidates = np.flatnonzero(overlap >= t * shorter / (2.0 - t) - 1e-9)
+        if not len(candidates):
+            return []
+
+        scores = rf_process.cdist([question], [self.keywords[i] for i in candidates],
+                                  scorer=rf_fuzz.partial_ratio, dtype=np.float64, workers=1)[0]
+        return candidates[scores >= self.thresholds[candidates]].tolist()
+
+    def _is_fuzzy_match(self, question, idx):
+        kw = self.keywords[idx]
+        thresh = self.thresholds[idx]
+        try:
+            return fuzz.partial_ratio(question, kw) > thresh or fuzz.partial_ratio(kw, question) > thresh
+        except Exception:
+            # if fuzzy matching fails for some token, skip it
+            return False
+
+    def match(self, question_lower):
+        """Index into self.entries of the first matching keyword, or None"""
+        if not question_lower or not self.entries:
+            return None
+        exact = self._first_exact(question_lower)
+        limit = len(self.entries) if exact is None else exact
+        for idx in self._fuzzy_candidates(question_lower, limit):
+            if self._is_fuzzy_match(question_lower, idx):
+                return idx
+        return exact
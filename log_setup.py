@@ -0,0 +1,123 @@
+"""Logging configuration for the chatbot.
+
+- Records go through a bounded in-memory queue to a background listener
+  thread that does the actual writing, so a request never blocks on
+  stdout. When the queue is full records are dropped and counted.
+- Each request binds its sessionId (see bind_request); every record logged
+  while handling it carries that id as ``session_id``.
+- DEBUG/INFO records of a request are sampled: with LOG_SAMPLE_RATE=0.01
+  one request in a hundred logs its full trace. Warnings and errors are
+  always kept. The decision is made once per request, so a sampled
+  request is logged completely.
+- LOG_FORMAT=json writes one JSON object per line; text is the default.
+
+The hot-path debug calls use %-style arguments, so when DEBUG is off they
+cost one level check and nothing is formatted.
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+
+_session_id = contextvars.ContextVar('session_id', default='-')
+_sampled = contextvars.ContextVar('sampled', default=True)
+
+
+def bind_request(session_id=None, sample_rate=None):
+    """Set the correlation id (and, if sample_rate is given, the sampling decision) for the current request/thread"""
+    _session_id.set(session_id or '-')
+    if sample_rate is not None:
+        _sampled.set(sample_rate >= 1.0 or random.random() < sample_rate)
+
+
+class ContextFilter(logging.Filter):
+    """Adds session_id to records and drops unsampled records below WARNING"""
+
+    def filter(self, record):
+        record.session_id = _session_id.get()
+        return record.levelno >= logging.WARNING or _sampled.get()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'session_id': getattr(record, 'session_id', '-'),
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler with a bounded queue that drops instead of blocking.
+
+    The listener thread is started lazily in whichever process logs, so the
+    handler can be installed before gunicorn forks its workers; a forked
+    child gets a fresh queue rather than one whose lock may be held.
+    """
+
+    def __init__(self, target, maxsize=10000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.target = target
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                self.queue = queue.Queue(maxsize=self.maxsize)
+            self._listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        # the queue never leaves the process, so skip QueueHandler's
+        # format-and-copy; the listener thread formats the record once
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self):
+        return {'queued': self.queue.qsize(), 'dropped': self.dropped}
+
+    def stop(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+
+
+def configure_logging(level='INFO', fmt='text', queue_size=10000, stream=None):
+    """Install the queue handler on the root logger; returns it (call .stop() at exit)"""
+    stream_handler = logging.StreamHandler(stream or sys.stdout)
+    if fmt == 'json':
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(levelname)s - %(name)s - [%(session_id)s] %(message)s'))
+
+    handler = NonBlockingQueueHandler(stream_handler, maxsize=queue_size)
+    handler.addFilter(ContextFilter())
+    root_logger = logging.getLogger()
+    root_logger.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    root_logger.handlers = [handler]
+    return handler
@@ -0,0 +1,207 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+import requests
+
+from metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class LogShipper:
+    """Ships chat logs to the admin backend from a background thread.
+
+    /ask only puts the log record on a bounded in-memory queue; a worker
+    thread drains it in batches over a pooled requests.Session. When the
+    queue is full new records are dropped (and counted) instead of blocking
+    the request.
+
+    The worker is started lazily in the process that first submits a record,
+    so the shipper can be created before gunicorn forks its workers.
+
+    With a LogSpool attached, records that fail to send or do not fit in the
+    queue are written to disk instead of being lost (see log_spool).
+    """
+
+    def __init__(self, base_url, log_path='/api/chatbot/log', batch_path=None,
+                 batch_size=20, flush_interval=1.0, max_queue=10000, timeout=5, spool=None):
+        """Parameters:
+        - base_url: admin backend root, e.g. 'http://localhost:3001'
+        - log_path: endpoint accepting a single log record
+        - batch_path: optional endpoint accepting {"logs": [...]}; when unset each
+          record of a batch is posted to log_path on the same pooled connection
+        - batch_size: max records sent per flush
+        - flush_interval: max seconds a record waits before its batch is sent
+        - max_queue: queue capacity; records beyond it are dropped
+        - timeout: HTTP timeout in seconds
+        - spool: optional LogSpool for failed/overflowed records
+        """
+        self.base_url = base_url.rstrip('/')
+        self.log_path = log_path
+        self.batch_path = batch_path
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.timeout = timeout
+        self.spool = spool
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._session = None
+        self._stopped = False
+        self.counters = {
+            'enqueued': 0,
+            'dropped': 0,
+            'sent': 0,
+            'failed': 0,
+            'batches': 0,
+            'spooled': 0
+        }
+
+    def _ensure_worker(self):
+        # threads do not survive fork: (re)start the worker in each process
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._pid = os.getpid()
+            self._session = requests.Session()
+            self._thread = threading.Thread(target=self._run, name='log-shipper', daemon=True)
+            self._thread.start()
+
+    def _count(self, name, n=1):
+        with self._counter_lock:
+            self.counters[name] += n
+
+    def submit(self, record):
+        """Queue a log record without blocking; returns False if it was dropped"""
+        if self._stopped:
+            self._count('dropped')
+            return False
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            if self.spool is not None and self.spool.append([record]):
+                self._count('spooled')
+                return True
+            self._count('dropped')
+            return False
+        self._count('enqueued')
+        return True
+
+    def _next_batch(self):
+        """Collect up to batch_size records, waiting at most flush_interval.
+
+        Returns (batch, stop_requested).
+        """
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if batch:
+                self._ship(batch)
+            if self.spool is not None:
+                self.spool.tick()
+        # drain whatever was queued before the stop marker
+        remaining = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                remaining.append(item)
+        for start in range(0, len(remaining), self.batch_size):
+            self._ship(remaining[start:start + self.batch_size])
+
+    def _ship(self, batch):
+        started = time.perf_counter()
+        failed = self.send_batch(batch)
+        STAGE_SECONDS.observe(time.perf_counter() - started, 'admin_log_send')
+        self._count('batches')
+        self._count('sent', len(batch) - len(failed))
+        self._count('failed', len(failed))
+        if failed:
+            self.on_failed(failed)
+
+    def send_batch(self, batch, session=None):
+        """POST a batch to the admin backend; returns the records that failed"""
+        session = session or self._session or requests.Session()
+        if self.batch_path:
+            try:
+                response = session.post(f"{self.base_url}{self.batch_path}",
+                                        json={'logs': batch}, timeout=self.timeout)
+                if response.status_code == 200:
+                    return []
+                logger.warning(f"Failed to log batch to admin backend: {response.status_code}")
+            except Exception as e:
+                logger.error(f"Error logging batch to admin backend: {e}")
+            return list(batch)
+
+        failed = []
+        for i, record in enumerate(batch):
+            try:
+                response = session.post(f"{self.base_url}{self.log_path}", json=record, timeout=self.timeout)
+                if response.status_code != 200:
+                    logger.warning(f"Failed to log to admin backend: {response.status_code}")
+                    failed.append(record)
+            except requests.exceptions.ConnectionError as e:
+                # backend unreachable: don't wait for a timeout on every remaining record
+                logger.error(f"Error logging to admin backend: {e}")
+                failed.extend(batch[i:])
+                break
+            except Exception as e:
+                logger.error(f"Error logging to admin backend: {e}")
+                failed.append(record)
+        return failed
+
+    def on_failed(self, records):
+        """Called with records that could not be delivered: spool them, or drop"""
+        if self.spool is not None and self.spool.append(records):
+            self._count('spooled', len(records))
+            return
+        logger.warning(f"Dropping {len(records)} chat log(s) that could not be delivered")
+
+    def stop(self, timeout=10):
+        """Flush queued records and stop the worker (used at process exit)"""
+        self._stopped = True
+        thread = self._thread
+        if thread is not None and self._pid == os.getpid() and thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+                thread.join(timeout)
+            except queue.Full:
+                logger.warning("Log shipper queue still full at shutdown")
+        if self.spool is not None:
+            self.spool.close()
+
+    def stats(self):
+        """Counters plus current queue depth"""
+        with self._counter_lock:
+            stats = dict(self.counters)
+        stats['queued'] = self._queue.qsize()
+        stats['queue_capacity'] = self._queue.maxsize
+        return stats
@@ -0,0 +1,319 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows: assume a single process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class LogSpool:
+    """Append-only, segmented on-disk spool for chat logs.
+
+    Records are written as JSON lines to the active segment of the current
+    process (``seg-<time>-<pid>.open``). Writes are flushed to the OS right
+    away but fsync'ed in batches (every fsync_batch records or
+    fsync_interval seconds). A segment is sealed (renamed to ``.jsonl``) when
+    it reaches segment_max_bytes, gets older than segment_max_age, or the
+    process shuts down; only sealed segments are replayed. Segments left
+    ``.open`` by a process that died are sealed by the replayer.
+    """
+
+    def __init__(self, directory, segment_max_bytes=8 * 1024 * 1024, segment_max_age=30.0,
+                 fsync_batch=50, fsync_interval=1.0, max_total_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.segment_max_bytes = int(segment_max_bytes)
+        self.segment_max_age = float(segment_max_age)
+        self.fsync_batch = max(1, int(fsync_batch))
+        self.fsync_interval = float(fsync_interval)
+        self.max_total_bytes = int(max_total_bytes)
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._pid = None
+        self._opened_at = 0.0
+        self._size = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.counters = {'appended': 0, 'dropped': 0, 'fsyncs': 0, 'segments': 0}
+
+    # -- writing ----------------------------------------------------------
+
+    def _open_segment(self):
+        self._pid = os.getpid()
+        name = f"seg-{time.time_ns():020d}-{self._pid}.open"
+        self._path = os.path.join(self.directory, name)
+        self._file = open(self._path, 'ab')
+        self._opened_at = time.monotonic()
+        self._size = 0
+        self.counters['segments'] += 1
+
+    def _sync_locked(self):
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.counters['fsyncs'] += 1
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _seal_locked(self):
+        if self._file is None:
+            return
+        self._sync_locked()
+        self._file.close()
+        if self._size:
+            os.replace(self._path, self._path[:-len('.open')] + '.jsonl')
+        else:
+            os.remove(self._path)
+        self._file = None
+        self._path = None
+
+    def append(self, records):
+        """Append records to the spool; returns how many were written"""
+        if not records:
+            return 0
+        lines = b''.join(json.dumps(r, ensure_ascii=False).encode('utf-8') + b'\n' for r in records)
+        with self._lock:
+            if self._pid != os.getpid():
+                # forked child: the parent's segment is not ours to write
+                self._file = None
+            if self.max_total_bytes and self.total_bytes() + len(lines) > self.max_total_bytes:
+                self.counters['dropped'] += len(records)
+                logger.error(f"Log spool full, dropped {len(records)} chat log(s)")
+                return 0
+            if self._file is None:
+                self._open_segment()
+            self._file.write(lines)
+            self._file.flush()
+            self._size += len(lines)
+            self._unsynced += len(records)
+            self.counters['appended'] += len(records)
+            if self._unsynced >= self.fsync_batch:
+                self._sync_locked()
+            if self._size >= self.segment_max_bytes:
+                self._seal_locked()
+        return len(records)
+
+    def tick(self):
+        """Time-based fsync and segment sealing; call periodically"""
+        with self._lock:
+            if self._file is None or self._pid != os.getpid():
+                return
+            now = time.monotonic()
+            if self._unsynced and now - self._last_sync >= self.fsync_interval:
+                self._sync_locked()
+            if self._size and now - self._opened_at >= self.segment_max_age:
+                self._seal_locked()
+
+    def close(self):
+        """fsync and seal the active segment"""
+        with self._lock:
+            if self._pid == os.getpid():
+                self._seal_locked()
+
+    # -- reading ----------------------------------------------------------
+
+    def total_bytes(self):
+        total = 0
+        for path in glob.glob(os.path.join(self.directory, 'seg-*')):
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def sealed_segments(self):
+        """Sealed segment paths, oldest first (orphaned .open files are sealed here)"""
+        for path in glob.glob(os.path.join(self.directory, 'seg-*.open')):
+            try:
+                pid = int(os.path.basename(path).split('-')[2].split('.')[0])
+            except (IndexError, ValueError):
+                continue
+            if pid != os.getpid() and not _pid_alive(pid):
+                os.replace(path, path[:-len('.open')] + '.jsonl')
+        return sorted(glob.glob(os.path.join(self.directory, 'seg-*.jsonl')))
+
+    @staticmethod
+    def _progress_path(segment):
+        return segment + '.pos'
+
+    def read_progress(self, segment):
+        """Byte offset already replayed from segment"""
+        try:
+            with open(self._progress_path(segment), 'r') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def save_progress(self, segment, offset):
+        tmp = self._progress_path(segment) + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(str(offset))
+        os.replace(tmp, self._progress_path(segment))
+
+    def read_batch(self, segment, offset, max_records):
+        """Read up to max_records starting at offset; returns (records, next_offset)"""
+        records = []
+        with open(segment, 'rb') as f:
+            f.seek(offset)
+            while len(records) < max_records:
+                line = f.readline()
+                if not line:
+                    break
+                if not line.endswith(b'\n'):
+                    # torn write from a crash: nothing more to read
+                    break
+                offset += len(line)
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"Skipping corrupt line in {segment}")
+        return records, offset
+
+    def finish(self, segment):
+        """Delete a fully replayed segment and its progress file"""
+        for path in (segment, self._progress_path(segment)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        stats = dict(self.counters)
+        stats['pending_segments'] = len(glob.glob(os.path.join(self.directory, 'seg-*.jsonl')))
+        stats['bytes'] = self.total_bytes()
+        return stats
+
+
+class SpoolReplayer:
+    """Streams sealed spool segments back to the admin backend.
+
+    Runs in a background thread. Replay is paced to max_rate records per
+    second so a large backlog does not flatten a backend that just came
+    back. While the backend keeps failing the replayer backs off
+    exponentially up to max_backoff seconds. An flock on the spool
+    directory makes sure only one process replays at a time.
+    """
+
+    def __init__(self, spool, send_batch, batch_size=50, max_rate=20.0,
+                 check_interval=5.0, max_backoff=300.0):
+        """Parameters:
+        - spool: LogSpool to drain
+        - send_batch: callable(records, session) returning the records that failed
+        - batch_size: records per send
+        - max_rate: max records per second sent (0 = unlimited)
+        - check_interval: seconds between checks for pending segments
+        - max_backoff: upper bound for the retry delay while the backend is down
+        """
+        self.spool = spool
+        self.send_batch = send_batch
+        self.batch_size = max(1, int(batch_size))
+        self.max_rate = float(max_rate)
+        self.check_interval = float(check_interval)
+        self.max_backoff = float(max_backoff)
+        self._session = None
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.counters = {'replayed': 0, 'failed_attempts': 0, 'respooled': 0}
+
+    def start(self):
+        """Start the background replay thread in this process (idempotent)"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._session = requests.Session()
+            self._thread = threading.Thread(target=self._run, name='log-spool-replayer', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and self._pid == os.getpid():
+            thread.join(timeout)
+
+    def _run(self):
+        delay = self.check_interval
+        while not self._stop.wait(delay):
+            try:
+                ok = self.run_once()
+            except Exception as e:
+                logger.error(f"Log spool replay failed: {e}")
+                ok = False
+            delay = self.check_interval if ok else min(max(delay, self.check_interval) * 2, self.max_backoff)
+
+    def _acquire_dir_lock(self):
+        if fcntl is None:
+            return True, None
+        handle = open(os.path.join(self.spool.directory, 'replay.lock'), 'w')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False, None
+        return True, handle
+
+    def run_once(self):
+        """Replay everything currently sealed. Returns False if the backend failed"""
+        acquired, handle = self._acquire_dir_lock()
+        if not acquired:
+            return True
+        session = self._session or requests.Session()
+        try:
+            for segment in self.spool.sealed_segments():
+                offset = self.spool.read_progress(segment)
+                while not self._stop.is_set():
+                    records, next_offset = self.spool.read_batch(segment, offset, self.batch_size)
+                    if not records:
+                        break
+                    started = time.monotonic()
+                    failed = self.send_batch(records, session)
+                    if len(failed) == len(records):
+                        self.counters['failed_attempts'] += 1
+                        return False
+                    if failed:
+                        # partial failure: move on but keep the failed ones for a later pass
+                        self.spool.append(failed)
+                        self.counters['respooled'] += len(failed)
+                    self.counters['replayed'] += len(records) - len(failed)
+                    offset = next_offset
+                    self.spool.save_progress(segment, offset)
+                    if self.max_rate > 0:
+                        pause = len(records) / self.max_rate - (time.monotonic() - started)
+                        if pause > 0 and self._stop.wait(pause):
+                            return True
+                else:
+                    return True
+                self.spool.finish(segment)
+            return True
+        finally:
+            if handle is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+                handle.close()
+
+    def stats(self):
+        return dict(self.counters)
@@ -0,0 +1,143 @@
+"""In-process counters and histograms rendered in the Prometheus text format.
+
+Kept dependency-free and cheap: observing a value is a bisect plus a few
+additions under a lock, so the /ask hot path can time each stage. Values
+are per process; with several gunicorn workers each one serves its own.
+"""
+import threading
+from bisect import bisect_left
+
+# seconds; /ask stages range from microseconds (cache hits) to seconds (cold stemming)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # labelvalues -> [bucket counts..., +Inf count, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 3)
+            series[i] += 1      # i == len(buckets) is the +Inf bucket
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for labelvalues, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                labels = _format_labels(self.labelnames, labelvalues, ('le', _format_value(float(bound))))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f'{self.name}_sum{labels} {_format_value(series[-2])}')
+            lines.append(f'{self.name}_count{labels} {series[-1]}')
+        return lines
+
+
+class GaugeCallback:
+    """Gauges read at scrape time from callback() -> {labelvalues tuple: value}"""
+
+    def __init__(self, name, documentation, labelnames, callback):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        for labelvalues, value in sorted(self.callback().items()):
+            if value is None:
+                continue
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # re-registering (e.g. module reload) returns the existing metric
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name, documentation, labelnames, callback):
+        with self._lock:
+            metric = GaugeCallback(name, documentation, labelnames, callback)
+            self._metrics[name] = metric
+            return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# Time per /ask processing stage (spelling, preprocess, stopword_removal,
+# stemming, keyword_match, tfidf_scoring, fuzzy_scoring, bm25_scoring,
+# response_build, admin_log)
+STAGE_SECONDS = REGISTRY.histogram(
+    'chatbot_stage_seconds', 'Time spent in each question processing stage', ['stage'])
@@ -1,42 +1,257 @@
-import nltk
 import json
+from collections import Counter
 import re
 import os
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
-from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
-from fuzzywuzzy import fuzz
+import sys
+from Sastrawi.Stemmer.Filter import TextNormalizer
+from rapidfuzz import process as rf_process
+from rapidfuzz.distance import Indel
 import numpy as np
+from scipy.sparse import issparse, vstack
+import threading
+import logging
+from time import perf_counter
+from caching import LRUCache
+from keyword_matcher import KeywordMatcher
+import index_artifact
+from metrics import STAGE_SECONDS
+from tfidf import TfidfModel, normalize_rows
+from scorers import SCORERS, DEFAULT_SCORER
+from spelling import SpellingIndex, WORD_PATTERN
+
+logger = logging.getLogger(__name__)
+
+# Sastrawi dictionaries are large and read-only once built, so every
+# NLPProcessor in the process shares a single stemmer/stopword remover.
+_sastrawi_lock = threading.Lock()
+_sastrawi_components = None
+
+
+def _get_sastrawi_components():
+    """Return the process-wide (stemmer, stopword_remover) pair, building it once"""
+    global _sastrawi_components
+    if _sastrawi_components is None:
+        with _sastrawi_lock:
+            if _sastrawi_components is None:
+                logger.info("Loading Sastrawi components...")
+                from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+                from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
+                _sastrawi_components = (
+                    StemmerFactory().create_stemmer(),
+                    StopWordRemoverFactory().create_stop_word_remover()
+                )
+    return _sastrawi_components
+
+
+# Shared by corpus preparation and query handling of every processor:
+# - stem_cache: single word -> Sastrawi stem
+# - preprocess_cache: normalized text -> fully preprocessed text
+stem_cache = LRUCache(maxsize=int(os.environ.get('STEM_CACHE_SIZE', 50000)))
+preprocess_cache = LRUCache(maxsize=int(os.environ.get('PREPROCESS_CACHE_SIZE', 10000)))
+
+
+def is_dictionary_word(word):
+    """True if the Sastrawi stem of word is in Sastrawi's root word dictionary"""
+    stemmer = _get_sastrawi_components()[0]
+    stemmer = getattr(stemmer, 'delegatedStemmer', stemmer)
+    stemmed = stem_cache.get(word)
+    if stemmed is None:
+        stemmed = stemmer.stem_word(word)
+        stem_cache.put(word, stemmed)
+    return stemmer.dictionary.contains(stemmed)
+
+
+def get_text_cache_stats():
+    """Counters of the shared stemming/preprocessing caches"""
+    return {
+        'stem': stem_cache.stats(),
+        'preprocess': preprocess_cache.stats()
+    }
+
+def batch_fuzzy_ratio(queries, choices):
+    """Fuzzy ratio of every query against every choice, computed in C.
+
+    Returns a float64 array of shape (len(queries), len(choices)) holding
+    fuzz.ratio(query, choice) / 100.0, i.e. the same integer percentages
+    fuzzywuzzy produces, so rankings are unchanged.
+    """
+    if not len(queries) or not len(choices):
+        return np.zeros((len(queries), len(choices)))
+    similarity = rf_process.cdist(queries, choices, scorer=Indel.normalized_similarity,
+                                  dtype=np.float64, workers=1)
+    return np.rint(100 * similarity) / 100.0
+
+def format_answer(faq):
+    """FAQ answer followed by its links, for clients that display plain text"""
+    formatted_answer = faq['answer']
+    if faq.get('links'):
+        formatted_answer += "\n\nLink terkait:"
+        for link in faq['links']:
+            formatted_answer += f"\n• {link['text']}: {link['url']}"
+    return formatted_answer
+
+def _array_bytes(value):
+    """Bytes held by a numpy array or the arrays of a scipy sparse matrix (0 for anything else)"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if issparse(value):
+        return sum(getattr(value, name).nbytes for name in ('data', 'indices', 'indptr') if hasattr(value, name))
+    return 0
+
+
+def _strings_bytes(strings):
+    """Bytes of an iterable of strings, plus the container when it has a size of its own"""
+    total = sys.getsizeof(strings) if isinstance(strings, (list, dict)) else 0
+    return total + sum(sys.getsizeof(s) for s in strings if isinstance(s, str))
+
+
+# Prebuilt index artifacts (see index_artifact.py); set INDEX_DIR='' to always rebuild
+DEFAULT_INDEX_DIR = os.environ.get('INDEX_DIR', index_artifact.DEFAULT_INDEX_DIR) or None
 
 class NLPProcessor:
-    def __init__(self, faq_file=None, fuzzy_threshold=85, fuzzy_short_threshold=90, match_threshold=0.35):
+    def __init__(self, faq_file=None, fuzzy_threshold=85, fuzzy_short_threshold=90, match_threshold=0.35,
+                 index_dir=DEFAULT_INDEX_DIR, data_dir=None, max_idf_drift=0.1, suggestion_threshold=0.2,
+                 scorer=DEFAULT_SCORER, spelling_correction=True):
         """Initialize NLP processor and tunable thresholds.
 
         Parameters:
         - faq_file: filename under ./data to load (default: 'faq_ppid.json')
         - fuzzy_threshold: fuzzy match threshold for medium/long tokens
         - fuzzy_short_threshold: higher fuzzy threshold for short tokens (<=4 chars)
-        - match_threshold: combined score threshold for TF-IDF+fuzzy matching
+        - match_threshold: score threshold for answering with the best match
+        - index_dir: directory of prebuilt index artifacts (None = always rebuild)
+        - data_dir: directory holding the FAQ files (default: ./data)
+        - max_idf_drift: fraction of TF-IDF rows apply_faq_changes may patch
+          before the vectorizer is refitted
+        - suggestion_threshold: minimum score of a FAQ offered as "did you
+          mean" when no answer is found
+        - scorer: retrieval engine, a name from scorers.SCORERS ('tfidf' =
+          TF-IDF cosine + fuzzy ratio, 'bm25')
+        - spelling_correction: correct words that are not in the FAQ
+          vocabulary before matching (see spelling.py)
         """
-        print("Initializing NLP Processor...")
-        self._download_nltk_data()
-        print("Loading Sastrawi components...")
-        self.stemmer = StemmerFactory().create_stemmer()
-        self.stopword_remover = StopWordRemoverFactory().create_stop_word_remover()
-        self.vectorizer = TfidfVectorizer()
+        if scorer not in SCORERS:
+            raise ValueError(f"Unknown scorer '{scorer}' (available: {', '.join(SCORERS)})")
+        logger.info("Initializing NLP Processor...")
+        # fitted TfidfModel (see tfidf.py); None until the corpus is prepared
+        self.vectorizer = None
+        self.tfidf_matrix = None
 
         # file and thresholds
         self.faq_file = faq_file or 'faq_ppid.json'
+        self.data_dir = data_dir or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+        self.index_dir = index_dir
         self.fuzzy_threshold = int(fuzzy_threshold)
         self.fuzzy_short_threshold = int(fuzzy_short_threshold)
         self.match_threshold = float(match_threshold)
+        self.max_idf_drift = float(max_idf_drift)
+        self.suggestion_threshold = float(suggestion_threshold)
+        self.scorer_name = scorer
+        self.spelling_correction = bool(spelling_correction)
+        # bumped by FAQRegistry each time it publishes an index (keys the response cache)
+        self.generation = 0
 
         # load data and prepare models
         self.load_faq_data(self.faq_file)
-        self.prepare_corpus()
-        self._init_ppid_categories()
-        print("NLP Processor initialized successfully!")
+        self._build_index()
+        logger.info("NLP Processor initialized successfully!")
+
+    # Sastrawi is only loaded when text actually has to be stemmed; a
+    # processor restored from an index artifact may never need it.
+    @property
+    def stemmer(self):
+        return _get_sastrawi_components()[0]
+
+    @property
+    def stopword_remover(self):
+        return _get_sastrawi_components()[1]
+
+    @property
+    def word_stemmer(self):
+        """The plain Sastrawi stemmer behind CachedStemmer; words are cached in stem_cache instead"""
+        return getattr(self.stemmer, 'delegatedStemmer', self.stemmer)
+
+    @property
+    def scorer(self):
+        """The retrieval engine (see scorers.py) for the current questions, built on first use"""
+        engine = getattr(self, '_scorer', None)
+        if engine is None or engine.name != self.scorer_name or not engine.is_current(self):
+            engine = SCORERS[self.scorer_name](self)
+            self._scorer = engine
+        return engine
+
+    def _build_index(self):
+        """Load the prebuilt index artifact if it matches the FAQ file, else rebuild"""
+        # rows added/changed/removed by apply_faq_changes since the vectorizer was fitted
+        self.rows_since_fit = 0
+        # 'artifact' when restored from index_dir, 'built' when prepared from the FAQ file
+        self.index_source = 'artifact'
+        if not (self.index_dir and self.faqs and self._load_index_artifact()):
+            self.index_source = 'built'
+            self.prepare_corpus()
+            self._init_ppid_categories()
+        self._build_spelling_index()
+        self._format_answers()
+
+    def _format_answers(self):
+        """Build the formatted_answer (answer + link list) of every FAQ with links once"""
+        self.formatted_answers = {id(faq): format_answer(faq) for faq in self.faqs if faq.get('links')}
+
+    def memory_estimate(self):
+        """Estimated bytes held by this processor's index: numpy/sparse arrays and strings.
+
+        Arrays restored from an index artifact are memory-mapped and count
+        in full although their pages are shared with other processes.
+        """
+        arrays = [self.tfidf_matrix]
+        if self.vectorizer is not None:
+            arrays.append(self.vectorizer.idf_)
+        arrays.extend(getattr(self, '_views', None) or ())
+        scorer = getattr(self, '_scorer', None)
+        if scorer is not None:
+            arrays.extend(vars(scorer).values())
+        strings = _strings_bytes(self.processed_questions) + sys.getsizeof(self.question_to_faq)
+        for faq in self.faqs:
+            strings += _strings_bytes(faq.get('questions') or []) + _strings_bytes(faq.get('keywords') or [])
+            strings += _strings_bytes((faq.get('answer'), faq.get('category')))
+        strings += _strings_bytes(self.keyword_to_faq) + _strings_bytes(self.formatted_answers.values())
+        if self.vectorizer is not None:
+            strings += _strings_bytes(self.vectorizer.vocabulary_)
+        vocabulary = getattr(getattr(self, '_scorer', None), 'vocabulary', None)
+        if isinstance(vocabulary, dict):
+            strings += _strings_bytes(vocabulary)
+        if self.spelling_index is not None:
+            strings += self.spelling_index.memory_estimate()
+        matrices = sum(_array_bytes(value) for value in arrays)
+        matcher = getattr(self, 'keyword_matcher', None)
+        if matcher is not None:
+            matcher_bytes = matcher.memory_estimate()
+            matrices += matcher_bytes['matrix_bytes']
+            strings += matcher_bytes['string_bytes']
+        return {'matrix_bytes': matrices, 'string_bytes': strings, 'total_bytes': matrices + strings}
+
+    def _load_index_artifact(self):
+        directory = index_artifact.artifact_path(self.index_dir, self.faq_file)
+        try:
+            index = index_artifact.load_index(directory, self.faq_hash)
+        except Exception as e:
+            logger.warning(f"Failed to load index artifact {directory}: {e}")
+            return False
+        if index is None:
+            logger.info(f"No up-to-date index artifact for {self.faq_file}, rebuilding")
+            return False
+
+        faqs = self.faqs
+        self.processed_questions = index['processed_questions']
+        self.question_to_faq = [faqs[i] for i in index['question_faq_index']]
+        self.vectorizer = index['vectorizer']
+        self.tfidf_matrix = index['tfidf_matrix']
+        self.ppid_categories = index['ppid_categories']
+        self.keyword_to_faq = {kw: faqs[i] for kw, i in index['keyword_faq_index'].items()}
+        self.category_faqs = {cat: [faqs[i] for i in idx] for cat, idx in index['category_faq_index'].items()}
+        self._compile_keyword_matcher()
+        logger.info(f"Loaded prebuilt index from {directory}")
+        return True
     
     def _init_ppid_categories(self):
         """Initialize PPID information categories.
@@ -46,16 +261,19 @@ class NLPProcessor:
         fall back to the original hard-coded set so behavior remains unchanged.
         """
         # Build categories from both explicit 'keywords' (when present) and
-        # by grouping questions per category. Previously the logic returned
-        # early when any FAQ had explicit 'keywords', which caused FAQs
-        # without keywords to be omitted. To avoid that, always aggregate
-        # both sources and merge them.
-        self.ppid_categories = {}
+        # by grouping questions per category, merging both sources. Everything
+        # is built in a single pass over the FAQs with ordered dicts as
+        # keyword sets, so the cost is O(total questions + keywords).
+        faqs = getattr(self, 'faqs', []) or []
+        keywords = {}       # category -> ordered keyword set (dict with None values)
+        descriptions = {}
         # map individual keyword (lowercased) -> faq dict for precise answers
         self.keyword_to_faq = {}
+        # real FAQ category -> FAQs in file order
+        self.category_faqs = {}
 
         # 1) Add explicit keyword entries first (aggregate per category)
-        for faq in getattr(self, 'faqs', []) or []:
+        for faq in faqs:
             kws = faq.get('keywords') or []
             # also extract link texts as useful keywords (e.g., 'LHKPN')
             links = faq.get('links') or []
@@ -63,75 +281,66 @@ class NLPProcessor:
 
             if kws or link_texts:
                 key = faq.get('category') or f"faq_{faq.get('id')}"
-                if key not in self.ppid_categories:
-                    self.ppid_categories[key] = {
-                        'keywords': [],
-                        'description': faq.get('answer', '')
-                    }
-
-                # extend existing keywords with new ones (avoid duplicates)
-                existing = set(self.ppid_categories[key].get('keywords', []))
+                if key not in keywords:
+                    keywords[key] = {}
+                    descriptions[key] = faq.get('answer', '')
+                bucket = keywords[key]
                 for k in kws:
                     if k is not None:
                         kw = str(k).lower()
-                        existing.add(kw)
-                        # map keyword to originating faq for precise answers
-                        if kw not in self.keyword_to_faq:
-                            self.keyword_to_faq[kw] = faq
+                        bucket[kw] = None
+                        self.keyword_to_faq.setdefault(kw, faq)
                 for lt in link_texts:
                     if lt:
-                        existing.add(lt)
-                        if lt not in self.keyword_to_faq:
-                            self.keyword_to_faq[lt] = faq
-
-                self.ppid_categories[key]['keywords'] = list(existing)
+                        bucket[lt] = None
+                        self.keyword_to_faq.setdefault(lt, faq)
                 # keep description if not already set
-                if not self.ppid_categories[key].get('description'):
-                    self.ppid_categories[key]['description'] = faq.get('answer', '')
+                if not descriptions[key]:
+                    descriptions[key] = faq.get('answer', '')
 
-        # 2) Group remaining FAQs by category and use their questions as keywords
+        # 2) Group FAQs by category and use their questions as keywords.
+        # question_owner remembers the first FAQ of a (real) category that
+        # asks each question, used as the representative answer.
         grouped = {}
-        for faq in getattr(self, 'faqs', []) or []:
-            cat = faq.get('category') or f"faq_{faq.get('id')}"
-            if cat not in grouped:
-                grouped[cat] = {'keywords': set(), 'description': None}
+        grouped_desc = {}
+        question_owner = {}
+        for faq in faqs:
+            real_cat = faq.get('category')
+            cat = real_cat or f"faq_{faq.get('id')}"
+            if real_cat:
+                self.category_faqs.setdefault(real_cat, []).append(faq)
+            bucket = grouped.setdefault(cat, {})
             for q in faq.get('questions', []) or []:
                 if isinstance(q, str) and q.strip():
-                    grouped[cat]['keywords'].add(q.lower())
-            if not grouped[cat]['description']:
-                grouped[cat]['description'] = faq.get('answer', '')
-
-        # Merge grouped keywords into categories that don't already have explicit keywords
-        for cat, data in grouped.items():
-            if data['keywords']:
-                if cat in self.ppid_categories:
-                    # extend existing explicit keywords with grouped questions
-                    existing = set(self.ppid_categories[cat].get('keywords', []))
-                    for q in data['keywords']:
-                        existing.add(q)
-                        # map question-string keyword to originating faq if possible
-                        # find a representative faq for this category/questions by scanning faqs
-                        for faq in getattr(self, 'faqs', []) or []:
-                            if faq.get('category') == cat and q in [qq.lower() for qq in (faq.get('questions') or [])]:
-                                if q not in self.keyword_to_faq:
-                                    self.keyword_to_faq[q] = faq
-                                break
-                    merged = list(existing)
-                    self.ppid_categories[cat]['keywords'] = merged
-                    if not self.ppid_categories[cat].get('description'):
-                        self.ppid_categories[cat]['description'] = data['description'] or f"Informasi tentang {cat}"
-                else:
-                    self.ppid_categories[cat] = {
-                        'keywords': list(data['keywords']),
-                        'description': data['description'] or f"Informasi tentang {cat}"
-                    }
-                    # map grouped question keywords to a representative faq in this category
-                    for q in data['keywords']:
-                        for faq in getattr(self, 'faqs', []) or []:
-                            if faq.get('category') == cat and q in [qq.lower() for qq in (faq.get('questions') or [])]:
-                                if q not in self.keyword_to_faq:
-                                    self.keyword_to_faq[q] = faq
-                                break
+                    q_lower = q.lower()
+                    bucket[q_lower] = None
+                    if real_cat:
+                        question_owner.setdefault((cat, q_lower), faq)
+            if not grouped_desc.get(cat):
+                grouped_desc[cat] = faq.get('answer', '')
+
+        # Merge grouped question keywords into the categories
+        for cat, questions in grouped.items():
+            if not questions:
+                continue
+            if cat in keywords:
+                # extend existing explicit keywords with grouped questions
+                keywords[cat].update(questions)
+                if not descriptions[cat]:
+                    descriptions[cat] = grouped_desc[cat] or f"Informasi tentang {cat}"
+            else:
+                keywords[cat] = dict(questions)
+                descriptions[cat] = grouped_desc[cat] or f"Informasi tentang {cat}"
+            # map question-string keyword to its representative faq
+            for q in questions:
+                owner = question_owner.get((cat, q))
+                if owner is not None:
+                    self.keyword_to_faq.setdefault(q, owner)
+
+        self.ppid_categories = {
+            cat: {'keywords': list(bucket), 'description': descriptions[cat]}
+            for cat, bucket in keywords.items()
+        }
 
         # 3) Final fallback: original hard-coded dictionary to preserve previous behavior
         if not self.ppid_categories:
@@ -241,124 +450,303 @@ class NLPProcessor:
                     "description": "Standar Operasional Prosedur"
                 }
             }
+
+        self._compile_keyword_matcher()
+
+    def _compile_keyword_matcher(self):
+        """Compile the keyword scan used by check_ppid_category"""
+        self.keyword_matcher = KeywordMatcher.from_categories(
+            self.ppid_categories, self.fuzzy_threshold, self.fuzzy_short_threshold
+        )
     
+    def _build_spelling_index(self):
+        """Typo index over the words of the FAQ questions, their stems and the category keywords"""
+        if not self.spelling_correction:
+            self.spelling_index = None
+            return
+        # one regex pass over the joined questions; keywords that are questions add nothing new
+        questions = [q.lower() for faq in self.faqs for q in faq.get('questions', ())]
+        counts = Counter(WORD_PATTERN.findall('\n'.join(questions)))
+        questions = set(questions)
+        counts.update(WORD_PATTERN.findall('\n'.join(kw for kw in self.keyword_matcher.keywords if kw not in questions)))
+        if self.vectorizer is not None:
+            # stems, so that a stem typed as such is not "corrected" (sorted: the
+            # vocabulary's order differs between a fitted and a loaded model)
+            for term in sorted(self.vectorizer.vocabulary_):
+                counts.setdefault(term, 1)
+        # Indonesian words the FAQs happen not to use are left alone ("layanan" is not "makanan")
+        self.spelling_index = SpellingIndex(counts, is_known=is_dictionary_word)
+
+    def correct_spelling(self, text):
+        """text in lowercase, its words that are not in the FAQ vocabulary corrected (see spelling.py)"""
+        text = text.lower()
+        if self.spelling_index is None:
+            return text
+        started = perf_counter()
+        corrected = self.spelling_index.correct(text)
+        STAGE_SECONDS.observe(perf_counter() - started, 'spelling')
+        return corrected
+
     def check_ppid_category(self, question):
-        """Check if question relates to PPID information categories"""
+        """Check if question relates to PPID information categories.
+
+        Returns the first (category, keyword) pair, in ppid_categories order,
+        whose keyword matches the question exactly (substring either way) or
+        fuzzily; see KeywordMatcher for how the scan is compiled.
+        """
         if not question:
             return None
 
-        question_lower = question.lower()
-
-        for category, data in self.ppid_categories.items():
-            for keyword in data.get("keywords", []):
-                if not isinstance(keyword, str) or not keyword:
-                    continue
-                kw = keyword.lower()
-                # direct substring match (fast)
-                if kw in question_lower or question_lower in kw:
-                    result = {
-                        "category": category,
-                        "description": data.get("description"),
-                        "matched_keyword": keyword
-                    }
-                    # if we have an originating faq for this keyword, attach it
-                    faq_obj = self.keyword_to_faq.get(kw)
-                    if faq_obj:
-                        result['faq'] = faq_obj
-                    return result
-
-                # fuzzy match in both directions to handle short/long tokens
-                try:
-                    # pick threshold depending on keyword length: short tokens need higher threshold
-                    thresh = self.fuzzy_short_threshold if len(kw) <= 4 else self.fuzzy_threshold
-                    if fuzz.partial_ratio(question_lower, kw) > thresh or fuzz.partial_ratio(kw, question_lower) > thresh:
-                        result = {
-                            "category": category,
-                            "description": data.get("description"),
-                            "matched_keyword": keyword
-                        }
-                        faq_obj = self.keyword_to_faq.get(kw)
-                        if faq_obj:
-                            result['faq'] = faq_obj
-                        return result
-                except Exception:
-                    # if fuzzy matching fails for some token, skip it
-                    continue
-        return None
-    
-    def _download_nltk_data(self):
-        """Download required NLTK data"""
-        try:
-            nltk.data.find('tokenizers/punkt')
-            print("NLTK punkt tokenizer already downloaded")
-        except LookupError:
-            print("Downloading NLTK punkt tokenizer...")
-            nltk.download('punkt')
-        
-        try:
-            nltk.data.find('corpora/stopwords')
-            print("NLTK stopwords already downloaded")
-        except LookupError:
-            print("Downloading NLTK stopwords...")
-            nltk.download('stopwords')
+        question_lower = self.correct_spelling(question)
+        started = perf_counter()
+        idx = self.keyword_matcher.match(question_lower)
+        STAGE_SECONDS.observe(perf_counter() - started, 'keyword_match')
+        if idx is None:
+            return None
+
+        category, keyword = self.keyword_matcher.entries[idx]
+        result = {
+            "category": category,
+            "description": self.ppid_categories[category].get("description"),
+            "matched_keyword": keyword
+        }
+        # if we have an originating faq for this keyword, attach it
+        faq_obj = self.keyword_to_faq.get(keyword.lower())
+        if faq_obj:
+            result['faq'] = faq_obj
+        return result
     
     def load_faq_data(self, faq_file=None):
         """Load FAQ data from JSON file (default: faq_stunting.json)"""
+        self.faq_hash = None
         try:
-            current_dir = os.path.dirname(os.path.abspath(__file__))
             file_name = faq_file or self.faq_file or 'faq_stunting.json'
-            faq_path = os.path.join(current_dir, 'data', file_name)
-            print(f"Loading FAQ data from: {faq_path}")
-            with open(faq_path, 'r', encoding='utf-8') as file:
-                # Support both array and dict with 'faqs' key
-                data = json.load(file)
-                if isinstance(data, dict) and 'faqs' in data:
-                    self.faqs = data['faqs']
-                else:
-                    self.faqs = data
-            print(f"Loaded {len(self.faqs)} FAQ entries")
+            faq_path = os.path.join(self.data_dir, file_name)
+            logger.info(f"Loading FAQ data from: {faq_path}")
+            with open(faq_path, 'rb') as file:
+                raw = file.read()
+            # the hash identifies the matching prebuilt index artifact
+            self.faq_hash = index_artifact.content_hash(raw)
+            # Support both array and dict with 'faqs' key
+            data = json.loads(raw.decode('utf-8'))
+            if isinstance(data, dict) and 'faqs' in data:
+                self.faqs = data['faqs']
+            else:
+                self.faqs = data
+            logger.info(f"Loaded {len(self.faqs)} FAQ entries")
         except FileNotFoundError:
-            print(f"ERROR: FAQ data file not found! ({faq_file})")
+            logger.error(f"FAQ data file not found! ({faq_file})")
             self.faqs = []
         except json.JSONDecodeError as e:
-            print(f"ERROR: Invalid JSON format: {e}")
+            logger.error(f"Invalid JSON format: {e}")
             self.faqs = []
         except Exception as e:
-            print(f"ERROR: Failed to load FAQ data: {e}")
+            logger.error(f"Failed to load FAQ data: {e}")
             self.faqs = []
     def switch_faq(self, faq_file):
-        """Switch FAQ data to another file and re-prepare corpus"""
+        """Switch FAQ data to another file and re-prepare corpus.
+
+        Not safe while other threads are querying this instance; the server
+        keeps one processor per environment (see faq_registry) instead.
+        """
         self.faq_file = faq_file
         self.load_faq_data(faq_file)
-        self.prepare_corpus()
+        self._build_index()
     
+    def upsert_faq(self, faq):
+        """Add a FAQ, or replace the one with the same id (see apply_faq_changes)"""
+        return self.apply_faq_changes(upserts=[faq])
+
+    def delete_faq(self, faq_id):
+        """Remove the FAQ with faq_id (see apply_faq_changes)"""
+        return self.apply_faq_changes(deletes=[faq_id])
+
+    def apply_faq_changes(self, upserts=(), deletes=()):
+        """Update the index for changed FAQs without rebuilding it.
+
+        Only the questions of upserted FAQs are preprocessed; their TF-IDF rows
+        are computed with the fitted vectorizer and spliced into the matrix
+        next to the untouched rows. The IDF weights are left as they are
+        until either a changed question contains a term the vectorizer has
+        never seen, or the rows changed since the last fit exceed
+        max_idf_drift of the corpus; then the vectorizer is refitted on the
+        already preprocessed questions (no re-stemming). Keyword and category
+        maps are rebuilt with the same single pass used at startup.
+
+        Like switch_faq this changes the processor in place, so it must not
+        be used while other threads query it; FAQRegistry.update_faqs applies
+        it to a copy and swaps that in. Every attribute is replaced rather
+        than mutated, which is what makes such a shallow copy safe.
+
+        Parameters:
+        - upserts: FAQ dicts (with 'id', 'questions', 'answer' and 'category'); an existing
+          FAQ with the same id is replaced in place, others are appended
+        - deletes: ids of FAQs to remove
+
+        Returns a dict with the number of FAQs upserted/deleted, the rows
+        re-preprocessed and whether the vectorizer was refitted.
+        """
+        upserts = list(upserts)
+        for faq in upserts:
+            if not isinstance(faq, dict) or faq.get('id') is None:
+                raise ValueError("FAQ must be an object with an 'id'")
+            questions = faq.get('questions')
+            if not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
+                raise ValueError(f"FAQ {faq.get('id')}: 'questions' must be a list of strings")
+            if not isinstance(faq.get('answer'), str):
+                raise ValueError(f"FAQ {faq.get('id')}: 'answer' must be a string")
+            if not isinstance(faq.get('category'), str):
+                raise ValueError(f"FAQ {faq.get('id')}: 'category' must be a string")
+
+        # rows of the current matrix per FAQ (prepare_corpus keeps them contiguous, in FAQ order)
+        old_rows = {}
+        for row, faq in enumerate(self.question_to_faq):
+            old_rows.setdefault(id(faq), []).append(row)
+
+        pending = {str(faq['id']): faq for faq in upserts}
+        delete_ids = {str(faq_id) for faq_id in deletes}
+        changed = set()
+        faqs = []
+        deleted = 0
+        for faq in self.faqs:
+            key = str(faq.get('id'))
+            if key in delete_ids:
+                deleted += 1
+                continue
+            if key in pending:
+                new_faq = pending.pop(key)
+                if new_faq['questions'] == faq.get('questions'):
+                    # same questions (e.g. only the answer was edited): keep their rows
+                    old_rows[id(new_faq)] = old_rows.get(id(faq), [])
+                else:
+                    changed.add(id(new_faq))
+                faq = new_faq
+            faqs.append(faq)
+        for faq in pending.values():
+            changed.add(id(faq))
+            faqs.append(faq)
+        processed_questions = []
+        question_to_faq = []
+        row_order = []          # old row index, or -1 - k for the k-th new row
+        new_questions = []
+        kept = 0
+        for faq in faqs:
+            if id(faq) in changed:
+                for question in faq['questions']:
+                    processed_q = self.preprocess_text(question)
+                    if processed_q:
+                        row_order.append(-1 - len(new_questions))
+                        new_questions.append(processed_q)
+                        processed_questions.append(processed_q)
+                        question_to_faq.append(faq)
+            else:
+                for row in old_rows.get(id(faq), []):
+                    row_order.append(row)
+                    processed_questions.append(self.processed_questions[row])
+                    question_to_faq.append(faq)
+                    kept += 1
+
+        rows_since_fit = self.rows_since_fit + len(new_questions) + (len(self.question_to_faq) - kept)
+        refit = self.tfidf_matrix is None or not processed_questions
+        if not refit:
+            analyzer = self.vectorizer.build_analyzer()
+            vocabulary = self.vectorizer.vocabulary_
+            unseen = any(term not in vocabulary for text in new_questions for term in analyzer(text))
+            refit = unseen or rows_since_fit > self.max_idf_drift * len(processed_questions)
+
+        if refit:
+            vectorizer = None
+            tfidf_matrix = None
+            if processed_questions:
+                try:
+                    vectorizer, tfidf_matrix = TfidfModel.fit(processed_questions)
+                except Exception as e:
+                    logger.error(f"Failed to create TF-IDF matrix: {e}")
+            rows_since_fit = 0
+        else:
+            vectorizer = self.vectorizer
+            order = np.array(row_order, dtype=np.int64)
+            if new_questions:
+                stacked = vstack([self.tfidf_matrix, vectorizer.transform(new_questions)], format='csr')
+                order[order < 0] = self.tfidf_matrix.shape[0] - 1 - order[order < 0]
+            else:
+                stacked = self.tfidf_matrix
+            tfidf_matrix = stacked[order]
+
+        self.faqs = faqs
+        self.processed_questions = processed_questions
+        self.question_to_faq = question_to_faq
+        self.vectorizer = vectorizer
+        self.tfidf_matrix = tfidf_matrix
+        self.rows_since_fit = rows_since_fit
+        self._init_ppid_categories()
+        self._build_spelling_index()
+        self._format_answers()
+        return {
+            'upserted': len(upserts),
+            'deleted': deleted,
+            'preprocessed_rows': len(new_questions),
+            'refit': refit
+        }
+
     def preprocess_text(self, text):
-        """Preprocess Indonesian text"""
+        """Preprocess Indonesian text (results are memoized in preprocess_cache)"""
         if not text:
             return ""
+        started = perf_counter()
         text = text.lower()
         text = re.sub(r'[^\w\s]', ' ', text)
         text = re.sub(r'\s+', ' ', text).strip()
+
+        cached = preprocess_cache.get(text)
+        if cached is not None:
+            STAGE_SECONDS.observe(perf_counter() - started, 'preprocess')
+            return cached
+
+        processed = text
+        step = perf_counter()
         try:
-            text = self.stopword_remover.remove(text)
+            processed = self.stopword_remover.remove(processed)
         except Exception as e:
-            print(f"Warning: Stopword removal failed: {e}")
+            logger.warning(f"Stopword removal failed: {e}")
+        now = perf_counter()
+        STAGE_SECONDS.observe(now - step, 'stopword_removal')
+        step = now
         try:
-            text = self.stemmer.stem(text)
+            processed = self.stem(processed)
         except Exception as e:
-            print(f"Warning: Stemming failed: {e}")
-        
-        return text
+            logger.warning(f"Stemming failed: {e}")
+        now = perf_counter()
+        STAGE_SECONDS.observe(now - step, 'stemming')
+
+        preprocess_cache.put(text, processed)
+        STAGE_SECONDS.observe(perf_counter() - started, 'preprocess')
+        return processed
+
+    def stem(self, text):
+        """Stem text word by word, same output as Sastrawi's stemmer.stem().
+
+        Each word's stem is looked up in the bounded stem_cache first, so
+        Sastrawi only runs for words that have not been seen recently.
+        """
+        stems = []
+        for word in TextNormalizer.normalize_text(text).split(' '):
+            stemmed = stem_cache.get(word)
+            if stemmed is None:
+                stemmed = self.word_stemmer.stem_word(word)
+                stem_cache.put(word, stemmed)
+            stems.append(stemmed)
+        return ' '.join(stems)
     
     def prepare_corpus(self):
         """Prepare corpus for TF-IDF"""
         if not self.faqs:
-            print("No FAQ data available for corpus preparation")
+            logger.warning("No FAQ data available for corpus preparation")
             self.processed_questions = []
             self.question_to_faq = []
             return
         
-        print("Preparing corpus for TF-IDF...")
+        logger.info("Preparing corpus for TF-IDF...")
         
         self.processed_questions = []
         self.question_to_faq = []
@@ -370,55 +758,196 @@ class NLPProcessor:
                     self.processed_questions.append(processed_q)
                     self.question_to_faq.append(faq)
         
-        print(f"Processed {len(self.processed_questions)} questions")
+        logger.info(f"Processed {len(self.processed_questions)} questions")
         
         if self.processed_questions:
             try:
-                self.tfidf_matrix = self.vectorizer.fit_transform(self.processed_questions)
-                print("TF-IDF matrix created successfully")
+                self.vectorizer, self.tfidf_matrix = TfidfModel.fit(self.processed_questions)
+                logger.info("TF-IDF matrix created successfully")
             except Exception as e:
-                print(f"ERROR: Failed to create TF-IDF matrix: {e}")
+                logger.error(f"Failed to create TF-IDF matrix: {e}")
                 self.tfidf_matrix = None
         else:
             self.tfidf_matrix = None
     
+    def _scoring_views(self):
+        """(term -> rows postings matrix, question lengths) for tfidf_matrix.
+
+        The postings matrix is the row-normalized TF-IDF matrix transposed
+        to CSR: row t lists the questions containing term t, i.e. an
+        inverted index over the stemmed tokens. cosine_similarity used to
+        normalize and transpose the whole corpus matrix on every call;
+        multiplying a query with this prepared matrix gives the same
+        numbers. Rebuilt lazily whenever tfidf_matrix is replaced.
+        """
+        views = getattr(self, '_views', None)
+        if views is None or views[0] is not self.tfidf_matrix:
+            normalized = normalize_rows(self.tfidf_matrix)
+            lengths = np.array([len(q) for q in self.processed_questions], dtype=np.float64)
+            views = (self.tfidf_matrix, normalized.T.tocsr(), lengths)
+            self._views = views
+        return views[1], views[2]
+
+    def _query_tfidf(self, processed_queries):
+        return normalize_rows(self.vectorizer.transform(processed_queries))
+
+    def score_questions(self, processed_queries):
+        """Combined TF-IDF cosine + fuzzy scores of preprocessed queries.
+
+        Returns an array of shape (len(processed_queries), n_questions):
+        one sparse product against tfidf_matrix and one batched fuzzy call
+        for the whole batch.
+        """
+        started = perf_counter()
+        postings, _ = self._scoring_views()
+        similarities = (self._query_tfidf(processed_queries) @ postings).toarray()
+        step = perf_counter()
+        STAGE_SECONDS.observe(step - started, 'tfidf_scoring')
+        fuzzy_scores = batch_fuzzy_ratio(processed_queries, self.processed_questions)
+        STAGE_SECONDS.observe(perf_counter() - step, 'fuzzy_scoring')
+        return 0.7 * similarities + 0.3 * fuzzy_scores
+
+    def candidate_similarities(self, processed_query):
+        """Cosine similarity of processed_query with the questions sharing a term with it.
+
+        Walks the postings of the query's terms only. Returns (rows,
+        similarities) with rows ascending; every other question has cosine
+        0, so its combined score is at most 0.3 (the fuzzy weight).
+        """
+        postings, _ = self._scoring_views()
+        query = self._query_tfidf([processed_query])
+        spans = [(postings.indptr[t], postings.indptr[t + 1], w) for t, w in zip(query.indices, query.data)]
+        if not spans:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        rows = np.concatenate([postings.indices[start:end] for start, end, _ in spans])
+        weights = np.concatenate([postings.data[start:end] * w for start, end, w in spans])
+        # accumulated term by term in query order, like the sparse product in score_questions
+        similarities = np.bincount(rows, weights=weights, minlength=len(self.processed_questions))
+        rows = np.flatnonzero(np.bincount(rows, minlength=len(similarities)))
+        return rows, similarities[rows]
+
+    def score_candidates(self, processed_query):
+        """Combined scores of the questions sharing a term with processed_query: (rows, scores)"""
+        rows, similarities = self.candidate_similarities(processed_query)
+        fuzzy_scores = batch_fuzzy_ratio([processed_query], [self.processed_questions[i] for i in rows])[0]
+        return rows, 0.7 * similarities + 0.3 * fuzzy_scores
+
+    def _best_row(self, processed_query, rows, similarities, seed=32):
+        """Highest combined score among rows (ascending) as (row, score).
+
+        The fuzzy ratio of two strings is at most 2*min(len) / (sum of
+        lengths), so 0.7*cosine + 0.3*that bound caps each row's score.
+        The fuzzy ratio is computed for the seed rows with the highest caps
+        first, then only for rows whose cap still reaches the best score
+        found; ties go to the lowest row, as with argmax over all rows.
+        """
+        _, lengths = self._scoring_views()
+        size = lengths[rows] + len(processed_query)
+        bound = np.rint(100 * 2 * np.minimum(lengths[rows], len(processed_query)) / size) / 100.0
+        upper = 0.7 * similarities + 0.3 * bound
+
+        def combined(positions):
+            fuzzy_scores = batch_fuzzy_ratio([processed_query], [self.processed_questions[rows[i]] for i in positions])
+            return 0.7 * similarities[positions] + 0.3 * fuzzy_scores[0]
+
+        if len(rows) > seed:
+            top = np.argpartition(-upper, seed)[:seed]
+            floor = combined(top).max()
+            keep = np.flatnonzero(upper >= floor)
+        else:
+            keep = np.arange(len(rows))
+        scores = combined(keep)
+        pos = int(np.argmax(scores))
+        return int(rows[keep[pos]]), float(scores[pos])
+
     def find_best_answer(self, user_question, threshold=None):
         """Find the best answer for user question.
 
         If threshold is None, use the instance's configured match_threshold.
         Returns (faq_obj, score) or (None, score).
         """
-        if not self.processed_questions or self.tfidf_matrix is None:
-            print("No processed questions available")
+        scorer = self.scorer
+        if not scorer.ready():
+            logger.debug("No processed questions available")
             return None, 0
 
-        processed_user_q = self.preprocess_text(user_question)
+        processed_user_q = self.preprocess_text(self.correct_spelling(user_question))
         if not processed_user_q:
-            print("Processed user question is empty")
+            logger.debug("Processed user question is empty")
             return None, 0
 
         try:
-            user_tfidf = self.vectorizer.transform([processed_user_q])
-            similarities = cosine_similarity(user_tfidf, self.tfidf_matrix).flatten()
-            fuzzy_scores = []
-            for q in self.processed_questions:
-                fuzzy_score = fuzz.ratio(processed_user_q, q) / 100.0
-                fuzzy_scores.append(fuzzy_score)
-
-            combined_scores = 0.7 * similarities + 0.3 * np.array(fuzzy_scores)
-            best_idx = int(np.argmax(combined_scores))
-            best_score = float(combined_scores[best_idx])
-
             th = threshold if threshold is not None else self.match_threshold
-            print(f"Best match score: {best_score:.3f} (threshold used: {th})")
+            best_idx, best_score = scorer.best(processed_user_q, th)
+
+            logger.debug("Best match score: %.3f (threshold used: %s)", best_score, th)
 
-            if best_score >= th:
+            if best_idx is not None and best_score >= th:
                 return self.question_to_faq[best_idx], best_score
             return None, best_score
 
         except Exception as e:
-            print(f"Error in finding best answer: {e}")
+            logger.error(f"Error in finding best answer: {e}")
             return None, 0
+
+    def find_top_answers(self, user_question, k=5, threshold=0.0):
+        """Top k FAQs for user question as [(faq_obj, score), ...], best first.
+
+        Ranks the questions sharing a term with the query (see the
+        scorer's candidates); each FAQ appears once, with the score of its
+        best question. FAQs scoring below threshold are left out.
+        """
+        scorer = self.scorer
+        if not scorer.ready() or k <= 0:
+            return []
+        processed_user_q = self.preprocess_text(self.correct_spelling(user_question))
+        if not processed_user_q:
+            return []
+        rows, scores = scorer.candidates(processed_user_q)
+        results = []
+        seen = set()
+        # stable sort: equal scores keep corpus order, like argmax
+        for pos in np.argsort(-scores, kind='stable').tolist():
+            score = float(scores[pos])
+            if score < threshold:
+                break
+            faq = self.question_to_faq[rows[pos]]
+            if id(faq) in seen:
+                continue
+            seen.add(id(faq))
+            results.append((faq, score))
+            if len(results) == k:
+                break
+        return results
+
+    def find_best_answers(self, user_questions, threshold=None, max_cells=4_000_000):
+        """Batch version of find_best_answer: one (faq_obj, score) per question.
+
+        Questions are scored in chunks so that the dense score matrix stays
+        below max_cells entries even for large corpora.
+        """
+        results = [(None, 0)] * len(user_questions)
+        scorer = self.scorer
+        if not scorer.ready():
+            logger.debug("No processed questions available")
+            return results
+
+        th = threshold if threshold is not None else self.match_threshold
+        processed = [(i, self.preprocess_text(self.correct_spelling(q))) for i, q in enumerate(user_questions)]
+        processed = [(i, pq) for i, pq in processed if pq]
+        chunk = max(1, max_cells // len(self.processed_questions))
+        for start in range(0, len(processed), chunk):
+            part = processed[start:start + chunk]
+            try:
+                scores = scorer.score_all([pq for _, pq in part])
+            except Exception as e:
+                logger.error(f"Error in finding best answers: {e}")
+                continue
+            best_idx = np.argmax(scores, axis=1)
+            best_scores = scores[np.arange(len(part)), best_idx]
+            for (i, _), idx, score in zip(part, best_idx.tolist(), best_scores.tolist()):
+                results[i] = (self.question_to_faq[idx], score) if score >= th else (None, score)
+        return results
     
     def generate_ppid_response(self, ppid_info):
         """Generate response for PPID information query"""
@@ -449,18 +978,16 @@ class NLPProcessor:
             }]
         }
     
-    def get_response(self, user_question, env=None):
-        """Get response for user question, with env-aware fallback"""
-        print(f"Processing question: {user_question}")
-        
-        # Check for PPID information categories first
-        ppid_info = self.check_ppid_category(user_question)
-        if ppid_info:
-            print(f"PPID category detected: {ppid_info['category']} (keyword: {ppid_info['matched_keyword']})")
-            return self.generate_ppid_response(ppid_info)
-        
-        # Continue with regular FAQ matching
-        best_faq, confidence = self.find_best_answer(user_question)
+    def suggest(self, user_question, k=3):
+        """FAQs to offer as "did you mean" for an unanswered question"""
+        return [faq for faq, _ in self.find_top_answers(user_question, k, self.suggestion_threshold)]
+
+    def build_answer_response(self, best_faq, confidence, env=None, suggestions=None):
+        """Response dict for a TF-IDF match (best_faq) or the env fallback (None).
+
+        suggestions: FAQs from suggest(); when given they replace the static
+        topic list of the fallback.
+        """
         if best_faq:
             response = {
                 'answer': best_faq['answer'],
@@ -473,74 +1000,124 @@ class NLPProcessor:
             # Include links if available
             if 'links' in best_faq and best_faq['links']:
                 response['links'] = best_faq['links']
-                
-                # Optional: Format answer with clickable links for HTML display
-                formatted_answer = best_faq['answer']
-                if best_faq['links']:
-                    formatted_answer += "\n\nLink terkait:"
-                    for link in best_faq['links']:
-                        formatted_answer += f"\n• {link['text']}: {link['url']}"
-                
-                response['formatted_answer'] = formatted_answer
-            
-            print(f"Answer found with confidence: {confidence:.3f}")
+                # answer with the links appended for plain-text display (built at index time)
+                formatted_answer = self.formatted_answers.get(id(best_faq))
+                response['formatted_answer'] = formatted_answer or format_answer(best_faq)
+            return response
+
+        # Fallback sesuai env
+        env_key = env or self.faq_file.replace('.json','')
+        if suggestions:
+            fallback_answers = [
+                "Maaf, saya tidak dapat menemukan jawaban yang tepat untuk pertanyaan Anda.",
+                "Mungkin yang Anda maksud:"
+            ]
+            fallback_answers += [f"• {faq['questions'][0]}" for faq in suggestions if faq.get('questions')]
+            fallback_answers += [
+                "",
+                "Silakan pilih salah satu pertanyaan di atas atau ajukan pertanyaan dengan kata kunci yang lebih spesifik."
+            ]
+        elif 'ppid' in env_key:
+            fallback_answers = [
+                "Maaf, saya tidak dapat menemukan jawaban yang tepat untuk pertanyaan Anda.",
+                "Berikut beberapa topik yang bisa saya bantu:",
+                "• Apa itu PPID?",
+                "• Cara permohonan informasi publik",
+                "• Prosedur pengajuan keberatan",
+                "• Jenis informasi publik",
+                "• Layanan website PPID",
+                "• Kontak dan alamat PPID",
+                "",
+                "Silakan ajukan pertanyaan dengan kata kunci yang lebih spesifik, atau hubungi petugas PPID untuk informasi lebih lanjut."
+            ]
+        else:
+            fallback_answers = [
+                "Maaf, saya tidak dapat menemukan jawaban yang tepat untuk pertanyaan Anda.",
+                "Berikut beberapa topik yang bisa saya bantu:",
+                "• Apa itu stunting?",
+                "• Penyebab dan cara mencegah stunting",
+                "• Gizi ibu hamil dan ASI eksklusif", 
+                "• MPASI dan nutrisi anak",
+                "• Imunisasi dan posyandu",
+                "",
+                "Silakan ajukan pertanyaan dengan kata kunci yang lebih spesifik, atau hubungi petugas kesehatan untuk informasi lebih lanjut."
+            ]
+        response = {
+            'answer': "\n".join(fallback_answers),
+            'confidence': float(confidence),
+            'category': 'unknown',
+            'faq_id': None,
+            'status': 'not_found'
+        }
+        if suggestions:
+            response['suggestions'] = [
+                {'faq_id': faq.get('id'), 'question': faq['questions'][0]}
+                for faq in suggestions if faq.get('questions')
+            ]
+        return response
+    
+    def get_response(self, user_question, env=None):
+        """Get response for user question, with env-aware fallback"""
+        logger.debug("Processing question: %s", user_question)
+        
+        # Check for PPID information categories first
+        ppid_info = self.check_ppid_category(user_question)
+        if ppid_info:
+            logger.debug("PPID category detected: %s (keyword: %s)", ppid_info['category'], ppid_info['matched_keyword'])
+            started = perf_counter()
+            response = self.generate_ppid_response(ppid_info)
+            STAGE_SECONDS.observe(perf_counter() - started, 'response_build')
+            return response
+        
+        # Continue with regular FAQ matching
+        best_faq, confidence = self.find_best_answer(user_question)
+        started = perf_counter()
+        suggestions = None if best_faq else self.suggest(user_question)
+        response = self.build_answer_response(best_faq, confidence, env, suggestions)
+        STAGE_SECONDS.observe(perf_counter() - started, 'response_build')
+        if best_faq:
+            logger.debug("Answer found with confidence: %.3f", confidence)
             if 'links' in response:
-                print(f"Including {len(response['links'])} links in response")
+                logger.debug("Including %d links in response", len(response['links']))
         else:
-            # Fallback sesuai env
-            env_key = env or self.faq_file.replace('.json','')
-            if 'ppid' in env_key:
-                fallback_answers = [
-                    "Maaf, saya tidak dapat menemukan jawaban yang tepat untuk pertanyaan Anda.",
-                    "Berikut beberapa topik yang bisa saya bantu:",
-                    "• Apa itu PPID?",
-                    "• Cara permohonan informasi publik",
-                    "• Prosedur pengajuan keberatan",
-                    "• Jenis informasi publik",
-                    "• Layanan website PPID",
-                    "• Kontak dan alamat PPID",
-                    "",
-                    "Silakan ajukan pertanyaan dengan kata kunci yang lebih spesifik, atau hubungi petugas PPID untuk informasi lebih lanjut."
-                ]
-            else:
-                fallback_answers = [
-                    "Maaf, saya tidak dapat menemukan jawaban yang tepat untuk pertanyaan Anda.",
-                    "Berikut beberapa topik yang bisa saya bantu:",
-                    "• Apa itu stunting?",
-                    "• Penyebab dan cara mencegah stunting",
-                    "• Gizi ibu hamil dan ASI eksklusif", 
-                    "• MPASI dan nutrisi anak",
-                    "• Imunisasi dan posyandu",
-                    "",
-                    "Silakan ajukan pertanyaan dengan kata kunci yang lebih spesifik, atau hubungi petugas kesehatan untuk informasi lebih lanjut."
-                ]
-            response = {
-                'answer': "\n".join(fallback_answers),
-                'confidence': float(confidence),
-                'category': 'unknown',
-                'faq_id': None,
-                'status': 'not_found'
-            }
-            print(f"No suitable answer found. Confidence: {confidence:.3f}")
+            logger.debug("No suitable answer found. Confidence: %.3f", confidence)
         return response
+
+    def get_responses(self, user_questions, env=None):
+        """Batch version of get_response: one response dict per question, same shape.
+
+        Keyword categories are checked for every question first; the rest
+        are preprocessed together and scored with a single TF-IDF product.
+        """
+        responses = [None] * len(user_questions)
+        remaining = []
+        for i, question in enumerate(user_questions):
+            ppid_info = self.check_ppid_category(question)
+            if ppid_info:
+                responses[i] = self.generate_ppid_response(ppid_info)
+            else:
+                remaining.append(i)
+
+        matches = self.find_best_answers([user_questions[i] for i in remaining])
+        for i, (best_faq, confidence) in zip(remaining, matches):
+            suggestions = None if best_faq else self.suggest(user_questions[i])
+            responses[i] = self.build_answer_response(best_faq, confidence, env, suggestions)
+        logger.debug("Processed batch of %d questions (%d keyword matches)",
+                     len(user_questions), len(user_questions) - len(remaining))
+        return responses
     
     def get_all_categories(self):
         """Get all available categories"""
         if not self.faqs:
             return []
         
-        categories = list(set(faq['category'] for faq in self.faqs))
-        return sorted(categories)
+        return sorted(self.category_faqs)
     
     def get_questions_by_category(self, category):
         """Get all questions for a specific category"""
-        if not self.faqs:
-            return []
-        
         questions = []
-        for faq in self.faqs:
-            if faq['category'] == category:
-                questions.extend(faq['questions'])
+        for faq in self.category_faqs.get(category, []):
+            questions.extend(faq['questions'])
         
         return questions
 
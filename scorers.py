@@ -0,0 +1,218 @@
+"""Retrieval engines that score a query against an NLPProcessor's questions.
+
+NLPProcessor answers through one engine, chosen per processor (and so per
+environment) by name:
+
+- 'tfidf': 0.7 * TF-IDF cosine + 0.3 * fuzzy ratio of the preprocessed
+  strings (the original scorer; its helpers live on NLPProcessor).
+- 'bm25': Okapi BM25 over the same preprocessed (stemmed, stopword-free)
+  tokens. The weight of every (term, question) pair is computed once into
+  a term -> questions postings matrix, so scoring a query is a gather of
+  its terms' postings and a bincount.
+
+An engine is built from a processor's current questions and sees them
+read-only; NLPProcessor.scorer builds a new one whenever they are
+replaced. Every engine returns scores in [0, 1], comparable with the
+processor's match and suggestion thresholds:
+
+- best(processed_query, threshold) -> (row or None, score): the best
+  question; exact for scores >= threshold, and the best score overall
+  otherwise (it is reported as the confidence of "not found" answers)
+- candidates(processed_query) -> (rows, scores): the questions that can
+  score above 0.3 for the query, rows ascending (used for top-k)
+- score_all(processed_queries) -> array (n_queries, n_questions)
+"""
+import math
+from abc import ABC, abstractmethod
+from time import perf_counter
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from metrics import STAGE_SECONDS
+from tfidf import analyze
+
+
+class Scorer(ABC):
+    """Base class of the engines; subclasses set name and implement the three scoring methods"""
+    name = None
+
+    def __init__(self, processor):
+        self.processor = processor
+        self.processed_questions = processor.processed_questions
+
+    def is_current(self, processor):
+        """True while this engine was built for processor's current questions"""
+        return self.processor is processor and self.processed_questions is processor.processed_questions
+
+    def ready(self):
+        return bool(self.processed_questions)
+
+    @abstractmethod
+    def best(self, processed_query, threshold):
+        """(row or None, score) of the best question for processed_query"""
+
+    @abstractmethod
+    def candidates(self, processed_query):
+        """(rows, scores) of the questions that can score above 0.3"""
+
+    @abstractmethod
+    def score_all(self, processed_queries):
+        """Scores of every question for every query, shape (n_queries, n_questions)"""
+
+
+class TfidfFuzzyScorer(Scorer):
+    """0.7 * TF-IDF cosine + 0.3 * fuzzy ratio (see NLPProcessor.score_questions)"""
+    name = 'tfidf'
+
+    def __init__(self, processor):
+        super().__init__(processor)
+        if processor.tfidf_matrix is not None:
+            processor._scoring_views()
+
+    def ready(self):
+        return bool(self.processed_questions) and self.processor.tfidf_matrix is not None
+
+    def best(self, processed_query, threshold):
+        """Best question for processed_query.
+
+        Only questions sharing a term with the query are scored first. When
+        the best of them reaches the threshold it is the overall best (the
+        rest score at most 0.3); otherwise every question is scored, so the
+        reported score is the same as a full scan.
+        """
+        processor = self.processor
+        best_idx, best_score = None, 0.0
+        if threshold > 0.3:
+            started = perf_counter()
+            rows, similarities = processor.candidate_similarities(processed_query)
+            step = perf_counter()
+            STAGE_SECONDS.observe(step - started, 'tfidf_scoring')
+            if len(rows):
+                best_idx, best_score = processor._best_row(processed_query, rows, similarities)
+                STAGE_SECONDS.observe(perf_counter() - step, 'fuzzy_scoring')
+                if best_score < threshold:
+                    best_idx = None
+        if best_idx is None:
+            started = perf_counter()
+            postings, _ = processor._scoring_views()
+            similarities = (processor._query_tfidf([processed_query]) @ postings).toarray()[0]
+            step = perf_counter()
+            STAGE_SECONDS.observe(step - started, 'tfidf_scoring')
+            best_idx, best_score = processor._best_row(processed_query, np.arange(len(similarities)), similarities)
+            STAGE_SECONDS.observe(perf_counter() - step, 'fuzzy_scoring')
+        return best_idx, best_score
+
+    def candidates(self, processed_query):
+        return self.processor.score_candidates(processed_query)
+
+    def score_all(self, processed_queries):
+        return self.processor.score_questions(processed_queries)
+
+
+class BM25Scorer(Scorer):
+    """Okapi BM25 with precomputed term weights, normalized by the query's own score.
+
+    weight(t, q) = idf(t) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(q) / avg len))
+    idf(t) = ln(1 + (N - df + 0.5) / (df + 0.5))
+
+    A query's raw score is divided by the score a question identical to the
+    query would get (terms missing from the corpus count with the idf of
+    df = 0), so a verbatim question scores 1.0 and unknown words lower the
+    score instead of being ignored. Scores are capped at 1.0.
+    """
+    name = 'bm25'
+
+    def __init__(self, processor, k1=1.2, b=0.75):
+        super().__init__(processor)
+        self.k1 = k1
+        self.b = b
+        vocabulary = {}
+        terms = []
+        rows = []
+        lengths = []
+        for row, question in enumerate(self.processed_questions):
+            tokens = analyze(question)
+            lengths.append(len(tokens))
+            for token in tokens:
+                terms.append(vocabulary.setdefault(token, len(vocabulary)))
+                rows.append(row)
+        n_questions = len(lengths)
+        lengths = np.asarray(lengths, dtype=np.float64)
+        # term-major: row t lists the questions containing term t; duplicate entries sum to tf
+        tf = csr_matrix((np.ones(len(terms)), (np.asarray(terms, dtype=np.int64), np.asarray(rows, dtype=np.int64))),
+                        shape=(len(vocabulary), n_questions))
+        tf.sum_duplicates()
+        df = np.diff(tf.indptr)
+        self.avg_length = float(lengths.mean()) if n_questions and lengths.sum() else 1.0
+        self.idf = np.log(1.0 + (n_questions - df + 0.5) / (df + 0.5))
+        self.unseen_idf = math.log(1.0 + (n_questions + 0.5) / 0.5)
+        norm = k1 * (1.0 - b + b * lengths[tf.indices] / self.avg_length)
+        tf.data = np.repeat(self.idf, df) * tf.data * (k1 + 1.0) / (tf.data + norm)
+        self.postings = tf
+        self.vocabulary = vocabulary
+
+    def _query(self, processed_query):
+        """(term ids of the query's known terms, score of a question identical to the query)"""
+        tokens = analyze(processed_query)
+        if not tokens:
+            return [], 0.0
+        columns = []
+        idf_sum = 0.0
+        for token in dict.fromkeys(tokens):
+            column = self.vocabulary.get(token)
+            if column is None:
+                idf_sum += self.unseen_idf
+            else:
+                columns.append(column)
+                idf_sum += self.idf[column]
+        saturation = (self.k1 + 1.0) / (1.0 + self.k1 * (1.0 - self.b + self.b * len(tokens) / self.avg_length))
+        return columns, idf_sum * saturation
+
+    def candidates(self, processed_query):
+        started = perf_counter()
+        columns, self_score = self._query(processed_query)
+        postings = self.postings
+        spans = [(postings.indptr[t], postings.indptr[t + 1]) for t in columns]
+        if not spans or self_score <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        rows = np.concatenate([postings.indices[start:end] for start, end in spans])
+        weights = np.concatenate([postings.data[start:end] for start, end in spans])
+        scores = np.bincount(rows, weights=weights, minlength=postings.shape[1])
+        rows = np.flatnonzero(np.bincount(rows, minlength=postings.shape[1]))
+        scores = np.minimum(scores[rows] / self_score, 1.0)
+        STAGE_SECONDS.observe(perf_counter() - started, 'bm25_scoring')
+        return rows, scores
+
+    def best(self, processed_query, threshold):
+        # questions without a query term score 0, so the candidates hold the overall best
+        rows, scores = self.candidates(processed_query)
+        if not len(rows):
+            return None, 0.0
+        pos = int(np.argmax(scores))
+        return int(rows[pos]), float(scores[pos])
+
+    def score_all(self, processed_queries):
+        started = perf_counter()
+        columns = []
+        indptr = [0]
+        self_scores = []
+        for processed_query in processed_queries:
+            query_columns, self_score = self._query(processed_query)
+            columns.extend(query_columns)
+            indptr.append(len(columns))
+            self_scores.append(self_score)
+        queries = csr_matrix((np.ones(len(columns)), np.asarray(columns, dtype=np.int64), np.asarray(indptr)),
+                             shape=(len(processed_queries), self.postings.shape[0]))
+        scores = (queries @ self.postings).toarray()
+        self_scores = np.asarray(self_scores)
+        scores = np.divide(scores, self_scores[:, None], out=np.zeros_like(scores), where=self_scores[:, None] > 0)
+        STAGE_SECONDS.observe(perf_counter() - started, 'bm25_scoring')
+        return np.minimum(scores, 1.0)
+
+
+SCORERS = {
+    TfidfFuzzyScorer.name: TfidfFuzzyScorer,
+    BM25Scorer.name: BM25Scorer,
+}
+DEFAULT_SCORER = TfidfFuzzyScorer.name
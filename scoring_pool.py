@@ -0,0 +1,367 @@
+"""Answer questions in a pool of worker processes with warm FAQ indexes.
+
+Preprocessing (Sastrawi stemming) and the fuzzy/keyword loops of
+NLPProcessor are Python code and hold the GIL, so one web process answers
+on one core. A ScoringPool starts SCORING_PROCESSES worker processes that
+each load the FAQ indexes they serve once (from the index artifacts when
+they match, see index_artifact.py) and keep them, with their text caches,
+warm (within the registry's memory budget, see faq_registry.py). The
+web process sends a question or a batch over the worker's pipe and blocks
+(without the GIL) until the answer comes back, so threads of one web
+process keep several cores busy.
+
+Workers are separate interpreters (python -m scoring_pool) connected by
+a socketpair; they never inherit state or held locks from the web
+process and do not re-import its main module. Protocol: pickled tuples
+(multiprocessing.connection framing), one request in flight per worker.
+
+    ('answer', env, faq_hash, question)       -> ('ok', response) | ('stale', None)
+    ('answer_many', env, faq_hash, questions) -> ('ok', [response, ...]) | ('stale', None)
+    ('ping',)                                  -> ('pong', {'pid', 'requests', 'hashes'})
+    ('stop',)                                  -> the worker exits
+
+Every request names the content hash of the FAQ file the web process's
+processor was built from (NLPProcessor.faq_hash). A worker whose index for
+that env differs answers 'stale' and reloads changed FAQ files in the
+background; the web process then answers that request itself. Answers
+therefore always come from the same FAQ data as the web process serves,
+also while a hot reload or an incremental update (which rewrites the
+file) propagates.
+
+A monitor thread pings idle workers every health_interval seconds.
+Workers that died, stopped answering pings or exceeded the request
+timeout are killed and replaced (with backoff if they keep crashing);
+requests meanwhile fall back to the web process.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Connection
+
+from faq_registry import FAQRegistry
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(conn, env_faq_map, default_env, registry_kwargs):
+    """Entry point of a worker process: load the preloaded envs, then serve requests until stopped"""
+    registry = FAQRegistry(env_faq_map, default_env=default_env, **registry_kwargs)
+    registry.warm_up()
+    refreshing = threading.Event()
+    requests = 0
+
+    def refresh():
+        try:
+            registry.check_for_changes()
+        except Exception as e:
+            logger.error(f"Scoring worker {os.getpid()} failed to reload FAQ data: {e}")
+        finally:
+            refreshing.clear()
+
+    def processor_for(env, faq_hash):
+        processor = registry.get(env)
+        if processor is not None and processor.faq_hash == faq_hash:
+            return processor
+        if not refreshing.is_set():
+            refreshing.set()
+            threading.Thread(target=refresh, name='faq-refresh', daemon=True).start()
+        return None
+
+    conn.send(('ready', os.getpid()))
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        op = message[0]
+        if op == 'stop':
+            return
+        try:
+            if op == 'ping':
+                hashes = {env: processor.faq_hash for env, processor in registry.loaded().items()}
+                reply = ('pong', {'pid': os.getpid(), 'requests': requests, 'hashes': hashes})
+            elif op in ('answer', 'answer_many'):
+                requests += 1
+                _, env, faq_hash, questions = message
+                processor = processor_for(env, faq_hash)
+                if processor is None:
+                    reply = ('stale', None)
+                elif op == 'answer':
+                    reply = ('ok', processor.get_response(questions, env=env))
+                else:
+                    reply = ('ok', processor.get_responses(questions, env=env))
+            else:
+                reply = ('error', f'unknown request {op!r}')
+        except Exception as e:
+            reply = ('error', str(e))
+        conn.send(reply)
+
+
+class _Worker:
+    """Web-side handle of one worker process"""
+
+    def __init__(self, slot, process, conn):
+        self.slot = slot
+        self.process = process
+        self.conn = conn
+        self.started_at = time.monotonic()
+        self.requests = 0
+        self.last_ping_ms = None
+        self.retired = False
+
+
+class ScoringPool:
+    """A fixed number of worker processes answering questions for the web process.
+
+    start() is called in the process that serves requests (not in the
+    gunicorn master: the connections belong to the process that created them).
+    """
+
+    def __init__(self, env_faq_map, default_env='stunting', processes=2, timeout=10.0,
+                 health_interval=5.0, start_timeout=120.0, **registry_kwargs):
+        """Parameters:
+        - env_faq_map, default_env, registry_kwargs: passed to the workers' FAQRegistry
+        - processes: number of worker processes
+        - timeout: seconds to wait for a free worker and for its answer
+        - health_interval: seconds between pings of idle workers
+        - start_timeout: seconds a new worker may take to load its indexes
+        """
+        self.env_faq_map = dict(env_faq_map) if env_faq_map is not None else None
+        self.default_env = default_env
+        self.registry_kwargs = dict(registry_kwargs)
+        self.processes = int(processes)
+        self.timeout = float(timeout)
+        self.health_interval = float(health_interval)
+        self.start_timeout = float(start_timeout)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._stop = threading.Event()
+        self._idle = queue.Queue()
+        self._workers = {}
+        self._backoff = {}
+        self._stats = {'dispatched': 0, 'fallbacks': 0, 'stale': 0, 'failures': 0, 'restarts': 0}
+
+    def start(self):
+        """Start the workers and the health monitor in this process (idempotent)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._idle = queue.Queue()
+            self._workers = {slot: None for slot in range(self.processes)}
+        for slot in range(self.processes):
+            self._start_slot(slot, 0.0)
+        threading.Thread(target=self._monitor, name='scoring-monitor', daemon=True).start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            workers = [w for w in self._workers.values() if w is not None]
+        for worker in workers:
+            try:
+                worker.conn.send(('stop',))
+            except (OSError, ValueError):
+                pass
+        for worker in workers:
+            try:
+                worker.process.wait(1)
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+
+    def _start_slot(self, slot, delay):
+        threading.Thread(target=self._spawn, args=(slot, delay), name=f'scoring-start-{slot}', daemon=True).start()
+
+    def _spawn(self, slot, delay):
+        if delay and self._stop.wait(delay):
+            return
+        parent, child = socket.socketpair()
+        config = {'env_faq_map': self.env_faq_map, 'default_env': self.default_env,
+                  'registry_kwargs': self.registry_kwargs}
+        process = None
+        conn = Connection(parent.detach())
+        try:
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'scoring_pool', str(child.fileno()), json.dumps(config)],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                pass_fds=(child.fileno(),)
+            )
+            child.close()
+            if not conn.poll(self.start_timeout):
+                raise TimeoutError(f'not ready after {self.start_timeout:.0f}s')
+            conn.recv()
+        except Exception as e:
+            logger.error(f"Scoring worker {slot} failed to start: {e}")
+            child.close()
+            if process is not None and process.poll() is None:
+                process.kill()
+            conn.close()
+            self._schedule_restart(slot, started_at=time.monotonic())
+            return
+        worker = _Worker(slot, process, conn)
+        with self._lock:
+            if self._stop.is_set():
+                process.kill()
+                return
+            self._workers[slot] = worker
+        self._idle.put(worker)
+        logger.info(f"Scoring worker {slot} ready (pid {process.pid})")
+
+    def _schedule_restart(self, slot, started_at):
+        # a worker that dies young is restarted with growing delays (0.5 s .. 30 s)
+        lived = time.monotonic() - started_at
+        delay = 0.0 if lived > 60 else min(30.0, max(0.5, 2 * self._backoff.get(slot, 0.0)))
+        self._backoff[slot] = delay
+        if not self._stop.is_set():
+            self._start_slot(slot, delay)
+
+    def _retire(self, worker, reason):
+        """Kill a failed worker and start a replacement (once per worker)"""
+        with self._lock:
+            if worker.retired:
+                return
+            worker.retired = True
+            self._workers[worker.slot] = None
+            self._stats['restarts'] += 1
+        logger.warning(f"Restarting scoring worker {worker.slot} (pid {worker.process.pid}): {reason}")
+        if worker.process.poll() is None:
+            worker.process.kill()
+        worker.process.wait()
+        worker.conn.close()
+        self._schedule_restart(worker.slot, worker.started_at)
+
+    def _acquire(self):
+        """An idle worker, or None if none becomes free within timeout (or none is running)"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._lock:
+                if not any(self._workers.values()):
+                    return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                worker = self._idle.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if not worker.retired:
+                return worker
+
+    def _call(self, worker, message, timeout):
+        """Send message to worker and return its reply; retires the worker and returns None on failure"""
+        try:
+            worker.conn.send(message)
+            if not worker.conn.poll(timeout):
+                raise TimeoutError(f'no reply within {timeout:.1f}s')
+            return worker.conn.recv()
+        except (OSError, EOFError, TimeoutError) as e:
+            self._retire(worker, e)
+            return None
+
+    def answer(self, env, faq_hash, question=None, questions=None):
+        """Response for question (or list of responses for questions), or None to answer locally"""
+        if self._pid != os.getpid() or faq_hash is None:
+            return None
+        worker = self._acquire()
+        if worker is None:
+            self._count('fallbacks')
+            return None
+        self._count('dispatched')
+        if questions is None:
+            reply = self._call(worker, ('answer', env, faq_hash, question), self.timeout)
+        else:
+            reply = self._call(worker, ('answer_many', env, faq_hash, questions), self.timeout)
+        if reply is None:
+            self._count('failures')
+            return None
+        worker.requests += 1
+        self._idle.put(worker)
+        status, result = reply
+        if status == 'ok':
+            return result
+        self._count('stale' if status == 'stale' else 'failures')
+        if status == 'error':
+            logger.error(f"Scoring worker {worker.slot} failed to answer: {result}")
+        return None
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _monitor(self):
+        while not self._stop.wait(self.health_interval):
+            with self._lock:
+                workers = [w for w in self._workers.values() if w is not None]
+            for worker in workers:
+                if worker.process.poll() is not None:
+                    self._retire(worker, f'exited with code {worker.process.returncode}')
+            # ping the workers that are idle right now; busy ones are covered by the request timeout
+            idle = []
+            while True:
+                try:
+                    idle.append(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+            for worker in idle:
+                if worker.retired:
+                    continue
+                started = time.perf_counter()
+                reply = self._call(worker, ('ping',), min(self.timeout, 5.0))
+                if reply is not None:
+                    worker.last_ping_ms = round(1000 * (time.perf_counter() - started), 3)
+                    self._idle.put(worker)
+
+    def stats(self):
+        with self._lock:
+            workers = [w for w in self._workers.values() if w is not None]
+            stats = dict(self._stats)
+        stats.update(
+            processes=self.processes,
+            alive=sum(1 for w in workers if w.process.poll() is None),
+            idle=self._idle.qsize(),
+            workers=[{'slot': w.slot, 'pid': w.process.pid, 'requests': w.requests,
+                      'last_ping_ms': w.last_ping_ms} for w in workers]
+        )
+        return stats
+
+
+class PooledProcessor:
+    """Stand-in for an NLPProcessor that answers through a ScoringPool.
+
+    Has what ResponseCache needs (generation, get_response, get_responses);
+    answers come from a worker when one is available with the same FAQ
+    data, otherwise from the processor itself.
+    """
+
+    def __init__(self, pool, processor):
+        self.pool = pool
+        self.processor = processor
+        self.generation = processor.generation
+
+    def get_response(self, user_question, env=None):
+        response = self.pool.answer(env, self.processor.faq_hash, question=user_question)
+        if response is None:
+            response = self.processor.get_response(user_question, env=env)
+        return response
+
+    def get_responses(self, user_questions, env=None):
+        responses = self.pool.answer(env, self.processor.faq_hash, questions=list(user_questions))
+        if responses is None:
+            responses = self.processor.get_responses(user_questions, env=env)
+        return responses
+
+
+if __name__ == '__main__':
+    from log_setup import configure_logging
+    configure_logging(level=os.environ.get('LOG_LEVEL', 'INFO'), fmt=os.environ.get('LOG_FORMAT', 'text'))
+    worker_config = json.loads(sys.argv[2])
+    _worker_main(Connection(int(sys.argv[1])), worker_config['env_faq_map'], worker_config['default_env'],
+                 worker_config['registry_kwargs'])
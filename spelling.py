@@ -0,0 +1,112 @@
+"""Typo correction by symmetric delete (as in SymSpell) over a fixed vocabulary.
+
+Every vocabulary word is stored under each string obtained by deleting up
+to max_distance characters from its first prefix_length characters. Two
+words within edit distance d share such a delete string, so the candidates
+for a misspelled word are found by generating its own deletes and looking
+them up in a dict; only those candidates get an edit distance computed. No
+word of the vocabulary is compared with the query character by character
+the way a fuzzy scan does.
+"""
+import re
+import sys
+from itertools import combinations
+
+from rapidfuzz.distance import OSA
+
+from caching import LRUCache
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def _deletes(word, max_distance):
+    """word and every string obtained by deleting up to max_distance of its characters"""
+    deletes = {word}
+    for n in range(1, min(max_distance, len(word)) + 1):
+        for positions in combinations(range(len(word)), n):
+            deletes.add(''.join(ch for i, ch in enumerate(word) if i not in positions))
+    return deletes
+
+
+class SpellingIndex:
+    """Corrects words that are not in a vocabulary to the closest word that is.
+
+    Words shorter than min_length, words with digits, vocabulary words and
+    words accepted by is_known are left as they are. Words up to short_length characters are corrected
+    within edit distance 1, longer ones within max_distance (restricted
+    Damerau-Levenshtein: insert, delete, substitute, swap neighbours). Ties
+    go to the more frequent word, then to the word seen first.
+    """
+
+    def __init__(self, counts, max_distance=2, short_length=5, min_length=3, prefix_length=7, cache_size=4096,
+                 is_known=None):
+        """
+        Parameters:
+        - counts: mapping of vocabulary word -> number of occurrences
+        - max_distance: largest edit distance corrected (for long words)
+        - short_length: words up to this length are corrected within distance 1
+        - min_length: shorter words are never corrected
+        - prefix_length: only this many leading characters are indexed
+        - cache_size: corrections remembered per index
+        - is_known: optional predicate for words outside the vocabulary that
+          must not be corrected (e.g. words of a dictionary)
+        """
+        self.max_distance = int(max_distance)
+        self.short_length = int(short_length)
+        self.min_length = int(min_length)
+        self.prefix_length = int(prefix_length)
+        self.counts = dict(counts)
+        self._rank = {word: i for i, word in enumerate(self.counts)}
+        self._index = {}
+        for word in self.counts:
+            for delete in _deletes(word[:self.prefix_length], self.max_distance):
+                self._index.setdefault(delete, []).append(word)
+        self._cache = LRUCache(cache_size)
+        self.is_known = is_known
+
+    def __len__(self):
+        return len(self.counts)
+
+    def memory_estimate(self):
+        """Estimated bytes held by the vocabulary and its delete index"""
+        total = sys.getsizeof(self.counts) + sum(sys.getsizeof(word) for word in self.counts)
+        total += sys.getsizeof(self._index)
+        for delete, words in self._index.items():
+            total += sys.getsizeof(delete) + sys.getsizeof(words)
+        return total
+
+    def distance_limit(self, word):
+        return 1 if len(word) <= self.short_length else self.max_distance
+
+    def correct_word(self, word):
+        """The vocabulary word closest to word, or word itself"""
+        if word in self.counts or len(word) < self.min_length or not word.isalpha():
+            return word
+        cached = self._cache.get(word)
+        if cached is not None:
+            return cached
+        if self.is_known is not None and self.is_known(word):
+            self._cache.put(word, word)
+            return word
+        limit = self.distance_limit(word)
+        best = None
+        best_key = None
+        seen = set()
+        for delete in _deletes(word[:self.prefix_length], limit):
+            for candidate in self._index.get(delete, ()):
+                if candidate in seen or abs(len(candidate) - len(word)) > limit:
+                    continue
+                seen.add(candidate)
+                distance = OSA.distance(word, candidate, score_cutoff=limit)
+                if distance > limit:
+                    continue
+                key = (distance, -self.counts[candidate], self._rank[candidate])
+                if best_key is None or key < best_key:
+                    best, best_key = candidate, key
+        corrected = best or word
+        self._cache.put(word, corrected)
+        return corrected
+
+    def correct(self, text):
+        """text with every word replaced by correct_word(word)"""
+        return WORD_PATTERN.sub(lambda m: self.correct_word(m.group()), text)
@@ -0,0 +1,71 @@
+"""Where the server process spent its startup time.
+
+Phases are recorded as the app starts (imports, index loading, warm-up)
+and reported by GET / and /metrics. With gunicorn's preload_app the
+workers inherit the breakdown of the master that did the work.
+
+Times are measured from the start of the process (read from /proc on
+Linux), so they include the interpreter's own startup.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+_phases = {}
+_ready = None
+
+
+def _uptime():
+    with open('/proc/uptime') as f:
+        return float(f.read().split()[0])
+
+
+def _process_started():
+    """Start time of this process in seconds since boot, or None where /proc is not available"""
+    try:
+        with open('/proc/self/stat') as f:
+            # the command name can contain spaces; fields after it are space separated
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        return start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+_started = _process_started()
+
+
+def since_process_start():
+    """Seconds since this process started (None if unknown)"""
+    if _started is None:
+        return None
+    try:
+        return _uptime() - _started
+    except (OSError, ValueError):
+        return None
+
+
+def record(name, seconds):
+    _phases[name] = round(seconds, 4) if seconds is not None else None
+
+
+@contextmanager
+def phase(name):
+    """Record the duration of the with-block as startup phase name"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+def mark_ready():
+    """Record that the app can answer; the last call wins (e.g. after a warm-up)"""
+    global _ready
+    _ready = since_process_start()
+
+
+def report():
+    return {
+        'phases': dict(_phases),
+        'ready_seconds': round(_ready, 4) if _ready is not None else None
+    }
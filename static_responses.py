@@ -0,0 +1,96 @@
+"""Pre-serialized bodies of the read-only endpoints (/faqs, /categories, /stats).
+
+Their content only changes when a new index generation is published, so
+FAQRegistry builds them once per generation: the JSON bytes (encoded the
+way Flask's jsonify would), a gzip and, when the optional ``brotli``
+package is installed, a brotli variant. Each body has a strong ETag derived
+from its content, so every worker hands out the same tag for the same data
+and a client polling with If-None-Match gets a 304 until the FAQs change.
+"""
+import gzip
+import hashlib
+import json
+
+try:
+    import brotli
+except ImportError:  # optional; without it only gzip is offered
+    brotli = None
+
+# bodies smaller than this are sent as is
+MIN_COMPRESS_SIZE = 512
+
+# Deskripsi kategori generik
+CATEGORY_DESCRIPTIONS = {
+    'umum': 'Informasi umum',
+    'prosedur': 'Prosedur permohonan dan keberatan',
+    'informasi': 'Jenis informasi publik',
+    'kontak': 'Informasi kontak',
+    'layanan': 'Layanan website',
+    # kategori stunting
+    'definisi': 'Pengertian dan definisi stunting',
+    'penyebab': 'Faktor penyebab terjadinya stunting',
+    'gejala': 'Ciri-ciri dan tanda-tanda stunting',
+    'pencegahan': 'Cara mencegah stunting',
+    'dampak': 'Akibat dan dampak stunting',
+    'asi': 'ASI eksklusif dan menyusui',
+    'mpasi': 'Makanan pendamping ASI',
+    'gizi_ibu': 'Gizi dan nutrisi ibu hamil',
+    'posyandu': 'Posyandu dan pemantauan',
+    'periode_emas': '1000 hari pertama kehidupan'
+}
+
+
+def json_bytes(payload):
+    """payload serialized like flask.jsonify (sorted keys, ASCII, compact, trailing newline)"""
+    return (json.dumps(payload, ensure_ascii=True, sort_keys=True, separators=(',', ':')) + '\n').encode('ascii')
+
+
+class PreparedResponse:
+    """A JSON body with its compressed variants and ETags"""
+
+    def __init__(self, payload):
+        self.body = json_bytes(payload)
+        digest = hashlib.blake2b(self.body, digest_size=16).hexdigest()
+        # one strong tag per representation: identity, gzip, br
+        self.variants = {None: (self.body, digest)}
+        if len(self.body) >= MIN_COMPRESS_SIZE:
+            self.variants['gzip'] = (gzip.compress(self.body, compresslevel=6, mtime=0), digest + '-gz')
+            if brotli is not None:
+                self.variants['br'] = (brotli.compress(self.body, quality=5), digest + '-br')
+        self.etags = frozenset(tag for _, tag in self.variants.values())
+
+    def select(self, accept_encodings):
+        """(content encoding or None, body, etag) for a client accepting the given encodings"""
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and encoding in accept_encodings:
+                return (encoding,) + self.variants[encoding]
+        return (None,) + self.variants[None]
+
+
+def category_list(processor):
+    """[{'category', 'description'}] for the categories of processor's FAQs"""
+    if not processor.faqs:
+        return []
+    return [
+        {'category': cat, 'description': CATEGORY_DESCRIPTIONS.get(cat, cat.replace('_', ' ').title())}
+        for cat in processor.get_all_categories()
+    ]
+
+
+def faq_stats(processor, env):
+    return {
+        'total_faqs': len(processor.faqs),
+        'total_questions': sum(len(faq['questions']) for faq in processor.faqs),
+        'categories': len(processor.get_all_categories()),
+        'env': env,
+        'status': 'active'
+    }
+
+
+def build_static_responses(processor, env):
+    """PreparedResponse per read endpoint ('faqs', 'categories', 'stats') of env's processor"""
+    return {
+        'faqs': PreparedResponse({'faqs': processor.faqs}),
+        'categories': PreparedResponse({'categories': category_list(processor)}),
+        'stats': PreparedResponse(faq_stats(processor, env))
+    }
@@ -0,0 +1,165 @@
+import importlib.util
+import json
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from log_shipper import LogShipper
+
+
+class StubAdminBackend:
+    """Admin backend on a local port that records every POST body by path.
+
+    While blocked (block()), requests are held until release() so tests can
+    keep the shipper's worker busy for as long as they need.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.received = threading.Event()
+        self._open = threading.Event()
+        self._open.set()
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stub._lock:
+                    stub.requests.append((self.path, body))
+                stub.received.set()
+                stub._open.wait(10)
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def block(self):
+        self._open.clear()
+
+    def release(self):
+        self._open.set()
+
+    def bodies(self, path):
+        with self._lock:
+            return [body for p, body in self.requests if p == path]
+
+    def close(self):
+        self.release()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class LogShipperTest(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = StubAdminBackend()
+        self.addCleanup(self.backend.close)
+
+    def shipper(self, **kwargs):
+        shipper = LogShipper(self.backend.url, **kwargs)
+        self.addCleanup(shipper.stop, 1)
+        return shipper
+
+    def test_records_are_sent_in_batches(self):
+        shipper = self.shipper(batch_path='/api/chatbot/logs', batch_size=5, flush_interval=0.2)
+        records = [{'sessionId': str(i)} for i in range(12)]
+        for record in records:
+            self.assertTrue(shipper.submit(record))
+        shipper.stop()
+
+        batches = [body['logs'] for body in self.backend.bodies('/api/chatbot/logs')]
+        self.assertEqual([len(batch) for batch in batches], [5, 5, 2])
+        self.assertEqual([record for batch in batches for record in batch], records)
+        stats = shipper.stats()
+        self.assertEqual((stats['sent'], stats['batches'], stats['dropped']), (12, 3, 0))
+
+    def test_without_batch_path_each_record_is_posted(self):
+        shipper = self.shipper(batch_size=5, flush_interval=0.2)
+        records = [{'sessionId': str(i)} for i in range(7)]
+        for record in records:
+            shipper.submit(record)
+        shipper.stop()
+
+        self.assertEqual(self.backend.bodies('/api/chatbot/log'), records)
+        self.assertEqual(shipper.stats()['batches'], 2)
+
+    def test_records_are_dropped_when_the_queue_is_full(self):
+        self.backend.block()
+        shipper = self.shipper(batch_size=1, flush_interval=0.05, max_queue=2)
+        self.assertTrue(shipper.submit({'sessionId': 'in-flight'}))
+        self.assertTrue(self.backend.received.wait(5))
+
+        started = time.perf_counter()
+        accepted = [shipper.submit({'sessionId': str(i)}) for i in range(5)]
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(accepted, [True, True, False, False, False])
+        self.assertLess(elapsed, 0.5)  # a full queue never blocks the caller
+        stats = shipper.stats()
+        self.assertEqual((stats['enqueued'], stats['dropped'], stats['queued']), (3, 3, 2))
+
+        self.backend.release()
+        shipper.stop()
+        self.assertEqual([body['sessionId'] for body in self.backend.bodies('/api/chatbot/log')],
+                         ['in-flight', '0', '1'])
+
+
+@unittest.skipIf(importlib.util.find_spec('flask') is None, 'Flask and the NLP dependencies are not installed')
+class AskLatencyTest(unittest.TestCase):
+    """/ask answers without waiting for the admin backend, however slow it is"""
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault('LOG_SPOOL_DIR', '')
+        os.environ.setdefault('FAQ_WATCH_INTERVAL', '0')
+        import app
+        cls.app = app
+
+    def setUp(self):
+        self.backend = StubAdminBackend()
+        self.addCleanup(self.backend.close)
+
+    def ask(self, client, question):
+        started = time.perf_counter()
+        response = client.post('/ask', json={'question': question, 'env': 'stunting', 'sessionId': 'test'})
+        return response, time.perf_counter() - started
+
+    def test_ask_does_not_wait_for_a_slow_backend(self):
+        shipper = LogShipper(self.backend.url, batch_size=1, flush_interval=0.05, timeout=10)
+        self.addCleanup(shipper.stop, 1)
+        client = self.app.app.test_client()
+        with mock.patch.object(self.app, 'log_shipper', shipper):
+            # warm up the index and the text caches first
+            self.ask(client, 'apa itu stunting')
+            self.assertTrue(self.backend.received.wait(5))
+
+            self.backend.block()
+            self.backend.received.clear()
+            latencies = []
+            for question in ('apa itu stunting', 'bagaimana mencegah stunting', 'berapa tinggi badan normal balita'):
+                response, elapsed = self.ask(client, question)
+                self.assertEqual(response.status_code, 200)
+                latencies.append(elapsed)
+            self.assertTrue(self.backend.received.wait(5))
+
+        # the backend held the logs until now; no answer waited for it
+        self.assertLess(max(latencies), 1.0)
+        self.backend.release()
+        shipper.stop()
+        self.assertEqual(shipper.stats()['sent'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import glob
+import json
+import os
+import unittest
+
+import numpy as np
+
+from tfidf import TfidfModel
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+except ImportError:
+    TfidfVectorizer = None
+
+
+def faq_questions(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    faqs = data.get('faqs', []) if isinstance(data, dict) else data
+    return [q for faq in faqs for q in faq.get('questions', [])]
+
+
+@unittest.skipIf(TfidfVectorizer is None, 'scikit-learn is not installed')
+class TfidfModelTest(unittest.TestCase):
+    """TfidfModel.transform must give exactly the matrix a fitted TfidfVectorizer gives"""
+
+    QUERIES = ['apa itu ppid', 'Stunting pada balita?', 'cara cara CARA mengajukan permohonan', 'xyz', '']
+
+    def assert_same_matrix(self, expected, actual):
+        self.assertEqual(expected.shape, actual.shape)
+        np.testing.assert_array_equal(expected.indptr, actual.indptr)
+        np.testing.assert_array_equal(expected.indices, actual.indices)
+        # bitwise, not approximately
+        np.testing.assert_array_equal(expected.data.view(np.int64), actual.data.view(np.int64))
+
+    def test_transform_matches_sklearn_on_faq_files(self):
+        paths = sorted(glob.glob(os.path.join(DATA_DIR, 'faq_*.json')))
+        self.assertTrue(paths)
+        for path in paths:
+            with self.subTest(path=os.path.basename(path)):
+                questions = faq_questions(path)
+                vectorizer = TfidfVectorizer().fit(questions)
+                model = TfidfModel(vectorizer.vocabulary_, vectorizer.idf_)
+                texts = questions + self.QUERIES
+                self.assert_same_matrix(vectorizer.transform(texts), model.transform(texts))
+
+    def test_fit_returns_sklearn_state(self):
+        questions = faq_questions(os.path.join(DATA_DIR, 'faq_ppid.json'))
+        model, matrix = TfidfModel.fit(questions)
+        vectorizer = TfidfVectorizer().fit(questions)
+        self.assertEqual(model.vocabulary_, vectorizer.vocabulary_)
+        np.testing.assert_array_equal(model.idf_, vectorizer.idf_)
+        self.assertEqual(matrix.shape, (len(questions), len(vectorizer.vocabulary_)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""TF-IDF vectors for queries without importing scikit-learn.
+
+Answering a question only needs the fitted vocabulary and IDF weights:
+tokenize, count, weight and L2-normalize the query. TfidfModel does
+what a fitted sklearn TfidfVectorizer (default settings) does for that,
+and stores each row's entries in the order sklearn leaves them (columns
+descending, from its sparse product with the IDF diagonal), so squares
+are summed in the same order and the vectors are bit-identical; see
+tests/test_tfidf.py. scikit-learn
+(~0.6 s of imports) is only loaded by fit(), i.e. when an index is built
+from the FAQ text; a process serving from index artifacts never imports it.
+"""
+import re
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# TfidfVectorizer defaults: lowercase, token_pattern r"(?u)\b\w\w+\b", unigrams
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+def analyze(text):
+    """Tokens of text as TfidfVectorizer().build_analyzer() returns them"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def normalize_rows(matrix, copy=True):
+    """L2-normalize the rows of a sparse matrix like sklearn.preprocessing.normalize.
+
+    Squares are summed per row in stored order, as sklearn's
+    inplace_csr_row_normalize_l2 does; all-zero rows are left as they are.
+    """
+    matrix = matrix.tocsr()
+    matrix = matrix.astype(np.float64, copy=copy or matrix.dtype != np.float64)
+    data, indptr = matrix.data, matrix.indptr
+    counts = np.diff(indptr)
+    sums = np.zeros(len(counts))
+    for k in range(int(counts.max(initial=0))):
+        rows = np.flatnonzero(counts > k)
+        values = data[indptr[rows] + k]
+        sums[rows] += values * values
+    norms = np.sqrt(sums)
+    norms[norms == 0.0] = 1.0
+    data /= np.repeat(norms, counts)
+    return matrix
+
+
+class TfidfModel:
+    """The fitted state of a TfidfVectorizer (vocabulary_, idf_) and its transform"""
+
+    def __init__(self, vocabulary, idf):
+        self.vocabulary_ = vocabulary
+        self.idf_ = np.asarray(idf, dtype=np.float64)
+
+    @classmethod
+    def fit(cls, texts):
+        """Fit on texts with scikit-learn; returns (model, TF-IDF matrix of texts)"""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        vectorizer = TfidfVectorizer()
+        matrix = vectorizer.fit_transform(texts)
+        return cls(vectorizer.vocabulary_, vectorizer.idf_), matrix
+
+    def build_analyzer(self):
+        return analyze
+
+    def transform(self, texts):
+        """L2-normalized TF-IDF rows (CSR) of texts, as TfidfVectorizer.transform"""
+        vocabulary = self.vocabulary_
+        columns = []
+        values = []
+        indptr = [0]
+        for text in texts:
+            counts = {}
+            for term in analyze(text):
+                column = vocabulary.get(term)
+                if column is not None:
+                    counts[column] = counts.get(column, 0) + 1
+            for column in sorted(counts, reverse=True):
+                columns.append(column)
+                values.append(counts[column])
+            indptr.append(len(columns))
+        matrix = csr_matrix(
+            (np.asarray(values, dtype=np.float64), np.asarray(columns, dtype=np.int32), np.asarray(indptr)),
+            shape=(len(indptr) - 1, len(self.idf_))
+        )
+        matrix.data *= self.idf_[matrix.indices]
+        return normalize_rows(matrix, copy=False)